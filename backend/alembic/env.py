@@ -19,6 +19,9 @@ sys.path.insert(0, APP_DIR)
 from app.database import Base # Import Base from your database setup
 from app.models import user # Import user model module
 from app.models import project # Import project model module
+from app.models import data_source, segment, code, job # Transcripts, segments, codebook and jobs
+from app.models import llm_cache # Persistent LLM response cache
+from app.models import analytics # Materialized code analytics
 # ---
 
 # this is the Alembic Config object, which provides
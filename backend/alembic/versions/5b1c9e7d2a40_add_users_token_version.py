@@ -0,0 +1,29 @@
+"""Add users token_version
+
+Revision ID: 5b1c9e7d2a40
+Revises: d3aee0638646
+Create Date: 2026-10-18 11:02:47.215934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1c9e7d2a40'
+down_revision: Union[str, None] = 'd3aee0638646'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bumped to revoke all of a user's tokens
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,30 @@
+"""Add segments content_hash
+
+Revision ID: 9e4d7b3f1c62
+Revises: 5b1c9e7d2a40
+Create Date: 2026-10-18 11:41:09.582761
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4d7b3f1c62'
+down_revision: Union[str, None] = '5b1c9e7d2a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('segments', sa.Column('content_hash', sa.String(length=32), nullable=True))
+    # Same value as app.coding.segmenter.content_hash (md5 of the UTF-8 text)
+    op.execute("UPDATE segments SET content_hash = md5(text)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('segments', 'content_hash')
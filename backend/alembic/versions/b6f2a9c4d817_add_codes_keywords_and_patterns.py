@@ -0,0 +1,30 @@
+"""Add codes keywords and patterns
+
+Revision ID: b6f2a9c4d817
+Revises: 9e4d7b3f1c62
+Create Date: 2026-10-18 12:20:44.118307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6f2a9c4d817'
+down_revision: Union[str, None] = '9e4d7b3f1c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('codes', sa.Column('keywords', sa.JSON(), server_default='[]', nullable=False))
+    op.add_column('codes', sa.Column('patterns', sa.JSON(), server_default='[]', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('codes', 'patterns')
+    op.drop_column('codes', 'keywords')
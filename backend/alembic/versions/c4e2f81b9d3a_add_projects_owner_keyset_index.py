@@ -0,0 +1,29 @@
+"""Add projects owner keyset index
+
+Revision ID: c4e2f81b9d3a
+Revises: a87cb79c890f
+Create Date: 2026-10-18 10:05:12.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e2f81b9d3a'
+down_revision: Union[str, None] = 'a87cb79c890f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Composite index for GET /projects/: filter by owner, keyset on (created_at, id)
+    op.create_index('ix_projects_owner_id_created_at_id', 'projects', ['owner_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_projects_owner_id_created_at_id', table_name='projects')
@@ -0,0 +1,43 @@
+"""Add segments text search indexes
+
+Revision ID: e1c7d5a3b942
+Revises: b6f2a9c4d817
+Create Date: 2026-10-18 13:02:17.540921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1c7d5a3b942'
+down_revision: Union[str, None] = 'b6f2a9c4d817'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # 'simple': no stemming or stop words, so concordance searches find exactly the words typed
+    op.add_column('segments', sa.Column(
+        'text_search', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple'::regconfig, text)", persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_segments_text_search', 'segments', ['text_search'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'ix_segments_text_trgm', 'segments', ['text'], unique=False,
+        postgresql_using='gin', postgresql_ops={'text': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_segments_text_trgm', table_name='segments')
+    op.drop_index('ix_segments_text_search', table_name='segments')
+    op.drop_column('segments', 'text_search')
+    # pg_trgm stays installed: other schemas in the database may use it
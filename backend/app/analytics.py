@@ -0,0 +1,187 @@
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models.analytics import AnalyticsCodeCount, AnalyticsCodePair, ProjectAnalytics
+from .models.code import SegmentCode
+from .models.project import Project
+from .models.segment import Segment
+
+# Code frequencies, co-occurrence and per-interview breakdowns are kept as
+# materialized aggregates (app/models/analytics.py). They're built once per
+# project from a sparse segment x code matrix, then updated with deltas inside
+# the transactions that apply or remove codes:
+#
+#     async with track_code_changes(db, project_id, segment_ids):
+#         ... insert/delete SegmentCode rows ...
+#     await db.commit()
+
+INSERT_CHUNK_ROWS = 1000
+SPARSE_MIN_ASSIGNMENTS = 2000 # Below this, plain Python counting beats building matrices
+
+# Local-model candidates are suggestions, not applied codes
+_applied = SegmentCode.source != "model"
+
+Assignment = tuple[int, int, int] # (segment id, data source id, code id)
+
+def _aggregate_sparse(assignments: list[Assignment]) -> tuple[Counter, Counter]:
+    """From the binary segment x code matrix X: counts = S^T X with S the
+    segment x source indicator, pairs = upper triangle of X^T X."""
+    # Imported on the first large build, so API workers only load them if they need them
+    import numpy as np
+    from scipy import sparse
+
+    rows = np.array(assignments, dtype=np.int64).reshape(-1, 3)
+    if not len(rows):
+        return Counter(), Counter()
+    segment_ids, segment_index = np.unique(rows[:, 0], return_inverse=True)
+    code_ids, code_index = np.unique(rows[:, 2], return_inverse=True) # Sorted, so index order is id order
+    source_ids, source_index = np.unique(rows[:, 1], return_inverse=True)
+
+    ones = np.ones(len(rows), dtype=np.int32)
+    x = sparse.csr_matrix((ones, (segment_index, code_index)), shape=(len(segment_ids), len(code_ids)))
+    x.data[:] = 1 # Duplicate assignments collapse to one
+    # Each segment belongs to one data source
+    first = np.unique(segment_index, return_index=True)[1]
+    s = sparse.csr_matrix(
+        (np.ones(len(segment_ids), dtype=np.int32), (np.arange(len(segment_ids)), source_index[first])),
+        shape=(len(segment_ids), len(source_ids)),
+    )
+
+    per_source = (s.T @ x).tocoo()
+    counts = Counter({
+        (int(source_ids[i]), int(code_ids[j])): int(n) for i, j, n in zip(per_source.row, per_source.col, per_source.data) if n
+    })
+    co = sparse.triu(x.T @ x, k=1).tocoo()
+    pairs = Counter({
+        (int(code_ids[i]), int(code_ids[j])): int(n) for i, j, n in zip(co.row, co.col, co.data) if n
+    })
+    return counts, pairs
+
+def _aggregate_python(assignments: list[Assignment]) -> tuple[Counter, Counter]:
+    codes_by_segment: dict[int, set[int]] = {}
+    source_of: dict[int, int] = {}
+    for segment_id, source_id, code_id in assignments:
+        codes_by_segment.setdefault(segment_id, set()).add(code_id)
+        source_of[segment_id] = source_id # Each segment belongs to one data source
+    counts: Counter = Counter()
+    pairs: Counter = Counter()
+    for segment_id, code_ids in codes_by_segment.items():
+        ordered = sorted(code_ids)
+        for i, code_a in enumerate(ordered):
+            counts[(source_of[segment_id], code_a)] += 1
+            for code_b in ordered[i + 1:]:
+                pairs[(code_a, code_b)] += 1
+    return counts, pairs
+
+def aggregate(assignments: Iterable[Assignment]) -> tuple[Counter, Counter]:
+    """Per-(data source, code) segment counts and per-(code a, code b) co-occurring
+    segment counts (a < b). Deltas (a few segments) are counted in plain Python;
+    full builds use sparse matrices."""
+    assignments = list(assignments)
+    if len(assignments) < SPARSE_MIN_ASSIGNMENTS:
+        return _aggregate_python(assignments)
+    return _aggregate_sparse(assignments)
+
+async def applied_codes(db: AsyncSession, segment_ids: list[int]) -> list[Assignment]:
+    result = await db.execute(
+        select(SegmentCode.segment_id, Segment.data_source_id, SegmentCode.code_id)
+        .join(Segment, Segment.id == SegmentCode.segment_id)
+        .where(SegmentCode.segment_id.in_(segment_ids))
+        .where(_applied)
+    )
+    return [tuple(row) for row in result]
+
+# --- Maintenance ---
+
+async def bump_version(db: AsyncSession, project_id: int) -> Optional[int]:
+    """Mark the project's analytics as changed. None if they were never built."""
+    result = await db.execute(
+        update(ProjectAnalytics)
+        .where(ProjectAnalytics.project_id == project_id)
+        .values(version=ProjectAnalytics.version + 1)
+        .returning(ProjectAnalytics.version)
+    )
+    return result.scalar_one_or_none()
+
+async def _upsert(db: AsyncSession, project_id: int, counts: Counter, pairs: Counter):
+    count_rows = [
+        {"project_id": project_id, "data_source_id": source_id, "code_id": code_id, "segments": n}
+        for (source_id, code_id), n in counts.items() if n
+    ]
+    pair_rows = [
+        {"project_id": project_id, "code_a_id": a, "code_b_id": b, "segments": n}
+        for (a, b), n in pairs.items() if n
+    ]
+    for model, rows, keys in (
+        (AnalyticsCodeCount, count_rows, ["data_source_id", "code_id"]),
+        (AnalyticsCodePair, pair_rows, ["code_a_id", "code_b_id"]),
+    ):
+        for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+            stmt = pg_insert(model).values(rows[start:start + INSERT_CHUNK_ROWS])
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=keys,
+                set_={"segments": model.segments + stmt.excluded.segments},
+            ))
+
+async def apply_delta(db: AsyncSession, project_id: int, before: list[Assignment], after: list[Assignment]):
+    """Update the aggregates by the difference between two snapshots of the same segments."""
+    if sorted(before) == sorted(after):
+        return
+    if await bump_version(db, project_id) is None:
+        return # Not built yet: the first read builds them from scratch
+    counts_before, pairs_before = aggregate(before)
+    counts, pairs = aggregate(after)
+    counts.subtract(counts_before)
+    pairs.subtract(pairs_before)
+    await _upsert(db, project_id, counts, pairs)
+    for model in (AnalyticsCodeCount, AnalyticsCodePair):
+        await db.execute(delete(model).where(model.project_id == project_id).where(model.segments <= 0))
+
+async def _lock_project(db: AsyncSession, project_id: int):
+    # Serializes tracked changes and the first build per project, until commit.
+    # The project row is locked rather than the aggregates' row since it exists
+    # before the first build; NO KEY UPDATE doesn't block inserts referencing it.
+    await db.execute(select(Project.id).where(Project.id == project_id).with_for_update(key_share=True))
+
+@asynccontextmanager
+async def track_code_changes(db: AsyncSession, project_id: int, segment_ids: list[int]) -> AsyncIterator[None]:
+    """Apply the code changes made to `segment_ids` inside the block to the aggregates
+    (in the same transaction; the caller commits)."""
+    # Lock before taking the snapshot: otherwise two transactions changing codes
+    # of the same segment each see only their own change, and the pairs between
+    # them are never counted; and a build running concurrently could read the
+    # assignments before this change commits while this one still sees the
+    # aggregates as unbuilt, losing it
+    await _lock_project(db, project_id)
+    before = await applied_codes(db, segment_ids)
+    yield
+    await apply_delta(db, project_id, before, await applied_codes(db, segment_ids))
+
+async def build(db: AsyncSession, project_id: int):
+    """Compute a project's aggregates from scratch (if nobody else has) and commit."""
+    await _lock_project(db, project_id) # No tracked change commits between the read below and ours
+    claimed = await db.execute(
+        pg_insert(ProjectAnalytics)
+        .values(project_id=project_id, version=1)
+        .on_conflict_do_nothing()
+        .returning(ProjectAnalytics.project_id)
+    )
+    if claimed.first() is None:
+        await db.rollback() # Built concurrently (we waited for that transaction)
+        return
+    await db.execute(delete(AnalyticsCodeCount).where(AnalyticsCodeCount.project_id == project_id))
+    await db.execute(delete(AnalyticsCodePair).where(AnalyticsCodePair.project_id == project_id))
+    result = await db.execute(
+        select(SegmentCode.segment_id, Segment.data_source_id, SegmentCode.code_id)
+        .join(Segment, Segment.id == SegmentCode.segment_id)
+        .where(Segment.project_id == project_id)
+        .where(_applied)
+    )
+    counts, pairs = aggregate(tuple(row) for row in result)
+    await _upsert(db, project_id, counts, pairs)
+    await db.commit()
@@ -0,0 +1,21 @@
+from celery import Celery
+
+from .config import settings
+
+# Task modules are only imported by the worker (via `include`); the API enqueues
+# tasks by name through app/task_queue.py, which imports this module on first use.
+celery_app = Celery(
+    "qdas",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.tasks.coding", "app.tasks.ingestion", "app.tasks.inference"],
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_acks_late=True, # Re-run a job if the worker dies mid-way
+    worker_prefetch_multiplier=1, # Jobs are long; don't hoard them on one worker
+    task_ignore_result=True, # Progress and results are stored on the Job row
+)
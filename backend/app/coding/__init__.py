@@ -0,0 +1 @@
+# Transcript segmentation and LLM coding, run by the Celery worker (see app/tasks/)
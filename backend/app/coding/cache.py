@@ -0,0 +1,127 @@
+import hashlib
+import json
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.llm_cache import LLMCacheEntry
+
+LOOKUP_CHUNK = 1000 # Keys per MGET / IN (...) query
+
+_WHITESPACE = re.compile(r"\s+")
+
+# --- Keys ---
+
+def normalize_segment_text(text: str) -> str:
+    # Whitespace/Unicode-form differences don't change what the model sees meaningfully
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+def codebook_version(codebook: list[tuple[str, str | None]]) -> str:
+    """Content fingerprint of a codebook, so identical codebooks share cache entries
+    and any edit to a code's name or description invalidates them."""
+    canonical = json.dumps(sorted([name, description or ""] for name, description in codebook))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+def cache_key(text: str, prompt_version: str, codebook_version: str, model: str, temperature: float) -> str:
+    material = "\x1f".join([normalize_segment_text(text), prompt_version, codebook_version, model, repr(float(temperature))])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+@dataclass(frozen=True)
+class CachedCoding:
+    codes: list[str]
+    prompt_tokens: int
+    completion_tokens: int
+
+    def to_json(self) -> str:
+        return json.dumps([self.codes, self.prompt_tokens, self.completion_tokens])
+
+    @classmethod
+    def from_json(cls, raw: bytes | str) -> "CachedCoding":
+        codes, prompt_tokens, completion_tokens = json.loads(raw)
+        return cls(codes, prompt_tokens, completion_tokens)
+
+# --- Tiers ---
+
+# Keeps the hot tier at most ARGV[1] entries by dropping the least recently used
+# (tracked in a sorted set scored by last access time).
+_TRIM_LUA = """
+local excess = redis.call('ZCARD', KEYS[1]) - tonumber(ARGV[1])
+if excess <= 0 then
+    return 0
+end
+local evicted = redis.call('ZPOPMIN', KEYS[1], excess)
+for i = 1, #evicted, 2 do
+    redis.call('DEL', ARGV[2] .. evicted[i])
+end
+return excess
+"""
+
+class LLMResponseCache:
+    """Two-tier cache of per-segment coding results.
+
+    Redis is the hot tier (bounded to `max_hot_entries`, LRU eviction); Postgres
+    keeps every entry. Lookups go Redis -> Postgres, and Postgres hits are
+    promoted back into Redis.
+    """
+
+    prefix = "llmcache:"
+    lru_key = "llmcache:lru"
+
+    def __init__(self, redis_client, max_hot_entries: int):
+        self._redis = redis_client # redis.asyncio.Redis
+        self._trim = redis_client.register_script(_TRIM_LUA)
+        self.max_hot_entries = max_hot_entries
+
+    async def get_many(self, db: AsyncSession, keys: list[str]) -> dict[str, CachedCoding]:
+        found: dict[str, CachedCoding] = {}
+        now = time.time()
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            values = await self._redis.mget([self.prefix + key for key in chunk])
+            hot_hits = {key: CachedCoding.from_json(raw) for key, raw in zip(chunk, values) if raw is not None}
+            if hot_hits:
+                await self._redis.zadd(self.lru_key, {key: now for key in hot_hits}) # Touch for LRU
+            found.update(hot_hits)
+
+            missing = [key for key in chunk if key not in hot_hits]
+            if missing:
+                result = await db.execute(select(LLMCacheEntry).where(LLMCacheEntry.key.in_(missing)))
+                cold_hits = {
+                    entry.key: CachedCoding(entry.codes, entry.prompt_tokens, entry.completion_tokens)
+                    for entry in result.scalars()
+                }
+                if cold_hits:
+                    await self._put_hot(cold_hits)
+                found.update(cold_hits)
+        return found
+
+    async def put_many(self, db: AsyncSession, model: str, entries: dict[str, CachedCoding]):
+        if not entries:
+            return
+        rows = [
+            {
+                "key": key,
+                "model": model,
+                "codes": entry.codes,
+                "prompt_tokens": entry.prompt_tokens,
+                "completion_tokens": entry.completion_tokens,
+            }
+            for key, entry in entries.items()
+        ]
+        for start in range(0, len(rows), LOOKUP_CHUNK):
+            await db.execute(pg_insert(LLMCacheEntry).values(rows[start:start + LOOKUP_CHUNK]).on_conflict_do_nothing())
+        await db.commit()
+        await self._put_hot(entries)
+
+    async def _put_hot(self, entries: dict[str, CachedCoding]):
+        now = time.time()
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.mset({self.prefix + key: entry.to_json() for key, entry in entries.items()})
+            pipe.zadd(self.lru_key, {key: now for key in entries})
+            await pipe.execute()
+        await self._trim(keys=[self.lru_key], args=[self.max_hot_entries, self.prefix])
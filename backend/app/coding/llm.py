@@ -0,0 +1,112 @@
+import json
+from dataclasses import dataclass, field
+
+# Bump when the prompt or response format changes
+PROMPT_VERSION = "1"
+
+SYSTEM_PROMPT = (
+    "You are a qualitative research assistant coding interview transcripts. "
+    "Apply every code from the codebook that fits each segment, using the code names exactly as given. "
+    "A segment may have no codes. "
+    'Respond with JSON only: {"segments": [{"id": <segment id>, "codes": ["<code name>", ...]}, ...]}'
+)
+
+@dataclass(frozen=True)
+class SegmentInput:
+    id: int
+    text: str
+    token_count: int
+
+@dataclass
+class Usage:
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def add(self, other: "Usage"):
+        self.requests += other.requests
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+
+@dataclass
+class BatchResult:
+    codes: dict[int, list[str]] = field(default_factory=dict) # segment id -> code names
+    usage: Usage = field(default_factory=Usage)
+
+# --- Request packing ---
+
+def pack_batches(segments: list[SegmentInput], token_budget: int, max_items: int) -> list[list[SegmentInput]]:
+    """Greedily pack segments into requests of at most `token_budget` segment
+    tokens and `max_items` segments (a larger segment gets a request of its own)."""
+    batches: list[list[SegmentInput]] = []
+    current: list[SegmentInput] = []
+    current_tokens = 0
+    for segment in segments:
+        if current and (current_tokens + segment.token_count > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(segment)
+        current_tokens += segment.token_count
+    if current:
+        batches.append(current)
+    return batches
+
+# --- Prompt ---
+
+def format_codebook(codebook: list[tuple[str, str | None]]) -> str:
+    return "\n".join(f"- {name}: {description}" if description else f"- {name}" for name, description in codebook)
+
+def build_messages(codebook: list[tuple[str, str | None]], batch: list[SegmentInput]) -> list[dict]:
+    segments = "\n\n".join(f"[{segment.id}] {segment.text}" for segment in batch)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Codebook:\n{format_codebook(codebook)}\n\nSegments:\n{segments}"},
+    ]
+
+def estimate_request_tokens(codebook_tokens: int, batch: list[SegmentInput]) -> int:
+    # Prompt (system + codebook + segments) plus a rough allowance for the JSON reply
+    segment_tokens = sum(segment.token_count for segment in batch)
+    return 100 + codebook_tokens + segment_tokens + 20 * len(batch)
+
+def parse_response(content: str, batch: list[SegmentInput], code_names: set[str]) -> dict[int, list[str]]:
+    """Map the model's JSON reply to {segment id: [code names]}, dropping ids not
+    in the batch and names not in the codebook (matched case-insensitively)."""
+    by_lower = {name.lower(): name for name in code_names}
+    batch_ids = {segment.id for segment in batch}
+    try:
+        items = json.loads(content).get("segments", [])
+    except (ValueError, AttributeError):
+        items = []
+
+    results: dict[int, list[str]] = {segment.id: [] for segment in batch}
+    for item in items:
+        try:
+            segment_id = int(item.get("id"))
+        except (TypeError, ValueError, AttributeError):
+            continue
+        if segment_id not in batch_ids:
+            continue
+        names = []
+        for name in item.get("codes") or []:
+            matched = by_lower.get(str(name).strip().lower())
+            if matched and matched not in names:
+                names.append(matched)
+        results[segment_id] = names
+    return results
+
+# --- API call ---
+
+async def code_batch(client, model: str, temperature: float, codebook: list[tuple[str, str | None]], batch: list[SegmentInput]) -> BatchResult:
+    """Send one packed request. `client` is an openai.AsyncOpenAI instance."""
+    response = await client.chat.completions.create(
+        model=model,
+        temperature=temperature,
+        messages=build_messages(codebook, batch),
+        response_format={"type": "json_object"},
+    )
+    content = response.choices[0].message.content or ""
+    usage = Usage(requests=1)
+    if response.usage is not None:
+        usage.prompt_tokens = response.usage.prompt_tokens
+        usage.completion_tokens = response.usage.completion_tokens
+    return BatchResult(codes=parse_response(content, batch, {name for name, _ in codebook}), usage=usage)
@@ -0,0 +1,70 @@
+import asyncio
+
+# Two token buckets (requests/min and tokens/min) checked and debited atomically.
+# Both refill continuously; if either lacks capacity nothing is debited and the
+# script returns how many milliseconds to wait. Uses the Redis clock so all
+# workers agree on time.
+#
+# KEYS[1] = requests bucket, KEYS[2] = tokens bucket
+# ARGV[1] = requests per minute, ARGV[2] = tokens per minute, ARGV[3] = tokens wanted
+_TOKEN_BUCKET_LUA = """
+redis.replicate_commands()
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local function level(key, capacity)
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local current = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    return math.min(capacity, current + (now - ts) * capacity / 60000.0)
+end
+
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local wanted = math.min(tonumber(ARGV[3]), tpm)
+local requests = level(KEYS[1], rpm)
+local tokens = level(KEYS[2], tpm)
+
+local wait = 0
+if requests < 1 then
+    wait = math.max(wait, (1 - requests) * 60000.0 / rpm)
+end
+if tokens < wanted then
+    wait = math.max(wait, (wanted - tokens) * 60000.0 / tpm)
+end
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - wanted
+end
+
+redis.call('HSET', KEYS[1], 'level', requests, 'ts', now)
+redis.call('HSET', KEYS[2], 'level', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+redis.call('PEXPIRE', KEYS[2], 120000)
+return math.ceil(wait)
+"""
+
+class RedisTokenBucket:
+    """Provider rate limits (RPM and TPM) shared by every worker process."""
+
+    def __init__(self, redis_client, name: str, requests_per_minute: int, tokens_per_minute: int):
+        self._redis = redis_client # redis.asyncio.Redis
+        self._script = redis_client.register_script(_TOKEN_BUCKET_LUA)
+        self._keys = [f"llm_ratelimit:{name}:requests", f"llm_ratelimit:{name}:tokens"]
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+    async def acquire(self, tokens: int) -> float:
+        """Wait until one request of `tokens` tokens fits in both limits.
+        Returns the total time spent waiting, in seconds."""
+        waited = 0.0
+        while True:
+            wait_ms = await self._script(
+                keys=self._keys,
+                args=[self.requests_per_minute, self.tokens_per_minute, tokens],
+            )
+            if not wait_ms:
+                return waited
+            delay = int(wait_ms) / 1000
+            waited += delay
+            await asyncio.sleep(delay)
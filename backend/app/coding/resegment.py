@@ -0,0 +1,144 @@
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Optional
+
+from sqlalchemy import Integer, column, delete, insert, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..analytics import applied_codes, apply_delta
+from ..config import settings
+from ..models import DataSource, Segment, SegmentCode
+from ..tasks.common import segment_rows
+from .segmenter import SegmentSpan, content_hash, segment_text
+
+# Incremental re-segmentation of an edited transcript. The new text is
+# segmented from scratch (cheap), then its segments are matched against the
+# stored ones by content hash, so only the segments around an edit are
+# replaced; the rest keep their ids, codes and search index rows and at most
+# have their position/offsets shifted.
+
+UPDATE_CHUNK_ROWS = 1000
+
+@dataclass(frozen=True)
+class StoredSegment:
+    id: int
+    position: int
+    start_offset: int
+    end_offset: int
+    content_hash: Optional[str]
+
+@dataclass
+class SegmentDiff:
+    unchanged: int = 0
+    moved: list[tuple[int, int, SegmentSpan]] = field(default_factory=list) # (segment id, new position, span)
+    replaced: list[tuple[int, int, SegmentSpan]] = field(default_factory=list) # (old segment id, new position, new span)
+    added: list[tuple[int, SegmentSpan]] = field(default_factory=list) # (new position, span)
+    removed: list[int] = field(default_factory=list) # Segment ids
+
+def diff_segments(old: list[StoredSegment], new: list[SegmentSpan]) -> SegmentDiff:
+    """Match new spans to stored segments (both in position order) by content hash.
+
+    Edited segments are paired with the old segments they replace, in order, so
+    manual codes can follow a typo fix; the surplus is added or removed.
+    """
+    diff = SegmentDiff()
+    old_hashes = [segment.content_hash for segment in old]
+    new_hashes = [content_hash(span.text) for span in new]
+
+    # A typical edit leaves a long common prefix and suffix; only the middle needs matching
+    prefix = 0
+    while prefix < min(len(old), len(new)) and old_hashes[prefix] == new_hashes[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < min(len(old), len(new)) - prefix and old_hashes[-1 - suffix] == new_hashes[-1 - suffix]:
+        suffix += 1
+
+    def keep(i: int, j: int):
+        segment, span = old[i], new[j]
+        if (segment.position, segment.start_offset, segment.end_offset) == (j, span.start, span.end):
+            diff.unchanged += 1
+        else:
+            diff.moved.append((segment.id, j, span))
+
+    for i in range(prefix):
+        keep(i, i)
+    # autojunk off: repeated short turns ("Yes.") must still match
+    matcher = SequenceMatcher(None, old_hashes[prefix:len(old) - suffix], new_hashes[prefix:len(new) - suffix], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        i1, i2, j1, j2 = i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                keep(i1 + offset, j1 + offset)
+            continue
+        paired = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+        for offset in range(paired):
+            diff.replaced.append((old[i1 + offset].id, j1 + offset, new[j1 + offset]))
+        diff.removed.extend(segment.id for segment in old[i1 + paired:i2])
+        diff.added.extend((j, new[j]) for j in range(j1 + paired, j2))
+    for offset in range(suffix, 0, -1):
+        keep(len(old) - offset, len(new) - offset)
+    return diff
+
+def _row(project_id: int, source_id: int, position: int, span: SegmentSpan) -> dict:
+    return segment_rows(project_id, source_id, [span], first_position=position)[0]
+
+async def resegment_source(db: AsyncSession, source: DataSource, content: str) -> tuple[SegmentDiff, list[int]]:
+    """Replace the source's content and update its segments by diff, in the
+    caller's transaction (which should hold a lock on the source row).
+    Returns the diff and the ids of the new segments, which need coding."""
+    result = await db.execute(
+        select(Segment.id, Segment.position, Segment.start_offset, Segment.end_offset, Segment.content_hash)
+        .where(Segment.data_source_id == source.id)
+        .order_by(Segment.position)
+    )
+    old = [StoredSegment(*row) for row in result]
+    diff = diff_segments(old, segment_text(content, settings.SEGMENT_MAX_CHARS))
+
+    # Kept segments: shift positions and offsets
+    for start in range(0, len(diff.moved), UPDATE_CHUNK_ROWS):
+        moves = values(
+            column("id", Integer), column("position", Integer), column("start_offset", Integer), column("end_offset", Integer),
+            name="moves",
+        ).data([(segment_id, position, span.start, span.end) for segment_id, position, span in diff.moved[start:start + UPDATE_CHUNK_ROWS]])
+        await db.execute(
+            update(Segment)
+            .where(Segment.id == moves.c.id)
+            .values(position=moves.c.position, start_offset=moves.c.start_offset, end_offset=moves.c.end_offset)
+            .execution_options(synchronize_session=False)
+        )
+
+    # Edited and removed segments are replaced by new rows (new ids, so the
+    # search index treats them as new); manual codes carry over to the edit
+    replaced_ids = [segment_id for segment_id, _, _ in diff.replaced]
+    gone_ids = replaced_ids + diff.removed
+    before = await applied_codes(db, gone_ids) if gone_ids else []
+    manual = {}
+    if replaced_ids:
+        result = await db.execute(
+            select(SegmentCode.segment_id, SegmentCode.code_id)
+            .where(SegmentCode.segment_id.in_(replaced_ids))
+            .where(SegmentCode.source == "manual")
+        )
+        for segment_id, code_id in result:
+            manual.setdefault(segment_id, []).append(code_id)
+    if gone_ids:
+        await db.execute(delete(Segment).where(Segment.id.in_(gone_ids))) # Their codes go too (ON DELETE CASCADE)
+
+    new_ids: list[int] = []
+    rows = [_row(source.project_id, source.id, position, span) for _, position, span in diff.replaced]
+    rows += [_row(source.project_id, source.id, position, span) for position, span in diff.added]
+    if rows:
+        result = await db.execute(insert(Segment).returning(Segment.id, sort_by_parameter_order=True), rows)
+        new_ids = list(result.scalars())
+    carried = [
+        {"segment_id": new_id, "code_id": code_id, "source": "manual"}
+        for (old_id, _, _), new_id in zip(diff.replaced, new_ids)
+        for code_id in manual.get(old_id, ())
+    ]
+    if carried:
+        await db.execute(insert(SegmentCode), carried)
+
+    await db.execute(update(DataSource).where(DataSource.id == source.id).values(content=content))
+    if gone_ids:
+        await apply_delta(db, source.project_id, before, await applied_codes(db, new_ids))
+    return diff, new_ids
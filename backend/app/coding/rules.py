@@ -0,0 +1,223 @@
+import hashlib
+import json
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+try:
+    from re import _constants as _sre_constants, _parser as _sre_parser # Python 3.11+
+except ImportError:
+    import sre_constants as _sre_constants
+    import sre_parse as _sre_parser
+
+# Keyword and regex rules of a codebook, applied as codes (source "rule")
+# before LLM coding: phrases that always signal a code ("too expensive" ->
+# Price) don't need a model.
+#
+# All keywords of a codebook compile into one Aho-Corasick automaton (a DFA
+# over UTF-8 bytes), and a batch of segments is joined and scanned in a single
+# pass however many rules there are. Regexes take part in the same pass: each
+# one's required literal (the longest run of plain characters every match
+# contains) goes into the automaton, and the regex itself only runs on the
+# segments where that literal occurs. Regexes without one are combined into a
+# single alternation that rules them out together.
+#
+# Keywords match whole words, case-insensitively and whatever the whitespace
+# between their words; a trailing "*" matches any word starting with the
+# keyword ("cost*": "costs", "costly"). Patterns are Python regexes, also
+# case-insensitive, run on the original text.
+
+COMPILED_CACHE_SIZE = 32 # Compiled codebooks kept per worker process
+MIN_LITERAL_LENGTH = 3 # Shorter required literals would let too many segments through
+
+_SEPARATOR = b"\x00" # Between segments in a scan; Postgres text can't contain it
+_WHITESPACE = re.compile(r"\s+") # Collapsed to one space, as normalize_keyword does
+# What str.split() counts as whitespace, as bytes (a regex over the haystack is far slower)
+_ASCII_SPACE_BYTES = b"\t\n\v\f\r\x1c\x1d\x1e\x1f"
+_ASCII_SPACES = bytes.maketrans(_ASCII_SPACE_BYTES, b" " * len(_ASCII_SPACE_BYTES))
+_UNICODE_SPACES = tuple(
+    chr(code).encode() for code in (0x85, 0xA0, 0x1680, *range(0x2000, 0x200B), 0x2028, 0x2029, 0x202F, 0x205F, 0x3000)
+)
+_ASCII_WORD_BYTES = frozenset(b"abcdefghijklmnopqrstuvwxyz0123456789") # The haystack is casefolded
+
+def _haystack(texts: Sequence[str]) -> bytes:
+    """The texts joined for a scan: casefolded, UTF-8, whitespace runs as one space."""
+    haystack = "\x00".join(texts).casefold().encode()
+    if any(space in haystack for space in _ASCII_SPACE_BYTES): # Single-byte searches are cheap
+        haystack = haystack.translate(_ASCII_SPACES)
+    if not haystack.isascii():
+        for space in _UNICODE_SPACES:
+            if space in haystack:
+                haystack = haystack.replace(space, b" ")
+    while b"  " in haystack:
+        haystack = haystack.replace(b"  ", b" ")
+    return haystack
+
+def _is_word_char_before(haystack: bytes, position: int) -> bool:
+    """Whether the character ending just before byte `position` is a letter or digit."""
+    if position == 0:
+        return False
+    byte = haystack[position - 1]
+    if byte < 0x80:
+        return byte in _ASCII_WORD_BYTES
+    start = position - 1
+    while start > 0 and position - start < 4 and 0x80 <= haystack[start] < 0xC0: # UTF-8 continuation bytes
+        start -= 1
+    return haystack[start:position].decode(errors="replace").isalnum()
+
+def _is_word_char_at(haystack: bytes, position: int) -> bool:
+    """Whether the character starting at byte `position` is a letter or digit."""
+    if position >= len(haystack):
+        return False
+    byte = haystack[position]
+    if byte < 0x80:
+        return byte in _ASCII_WORD_BYTES
+    length = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+    return haystack[position:position + length].decode(errors="replace").isalnum()
+
+@dataclass(frozen=True)
+class CodeRules:
+    code_id: int
+    keywords: tuple[str, ...] = ()
+    patterns: tuple[str, ...] = ()
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(keyword.split()).casefold()
+
+def validate_pattern(pattern: str) -> str:
+    # Compiled as part of an alternation, so global flags like "(?i)" must not appear
+    re.compile(f"(?:{pattern})")
+    return pattern
+
+def required_literal(pattern: str) -> Optional[str]:
+    """Longest run of literal characters in the top-level sequence of `pattern`
+    (so every match contains it), casefolded; None if there's no usable one."""
+    try:
+        parsed = _sre_parser.parse(pattern)
+    except re.error:
+        return None
+    longest = run = ""
+    for op, value in parsed:
+        if op == _sre_constants.LITERAL:
+            run += chr(value)
+        else:
+            longest, run = max(longest, run, key=len), ""
+    longest = max(longest, run, key=len)
+    # Non-ASCII case folding differs between re.IGNORECASE and str.casefold
+    if len(longest) < MIN_LITERAL_LENGTH or not longest.isascii():
+        return None
+    return longest.casefold()
+
+def rules_version(rules: Sequence[CodeRules]) -> str:
+    """Content fingerprint of a codebook's rules: compiled rule sets are reused
+    until a keyword or pattern changes."""
+    canonical = json.dumps(sorted([rule.code_id, sorted(rule.keywords), sorted(rule.patterns)] for rule in rules))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+@dataclass(frozen=True)
+class _Needle:
+    """What a match of one automaton needle means."""
+    bounded_start: bool # Must start at a word boundary (keywords starting with a letter or digit)
+    bounded_end: bool
+    exact: frozenset[int] # Code ids of keywords matching the whole word
+    prefix: frozenset[int] # ... and of "keyword*" rules
+    triggers: tuple[int, ...] # Patterns (indexes) worth running on the segment
+
+class RuleSet:
+    """A codebook's rules compiled for scanning (see compile_rules)."""
+
+    def __init__(self, rules: Sequence[CodeRules]):
+        self._patterns = [
+            (rule.code_id, re.compile(pattern, re.IGNORECASE)) for rule in rules for pattern in rule.patterns
+        ]
+        self.pattern_count = len(self._patterns)
+
+        # needle -> (whole-word code ids, prefix code ids, triggered patterns)
+        needles: dict[str, tuple[set[int], set[int], set[int]]] = {}
+        for rule in rules:
+            for keyword in rule.keywords:
+                prefix = keyword.rstrip().endswith("*")
+                word = normalize_keyword(keyword.rstrip().rstrip("*"))
+                if word:
+                    needles.setdefault(word, (set(), set(), set()))[prefix].add(rule.code_id)
+        self.keyword_count = len(needles)
+        untriggered = []
+        for index, (_, pattern) in enumerate(self._patterns):
+            literal = required_literal(pattern.pattern)
+            if literal is None:
+                untriggered.append(index)
+            else:
+                # Whitespace in the literal is collapsed like the haystack's
+                needles.setdefault(_WHITESPACE.sub(" ", literal), (set(), set(), set()))[2].add(index)
+
+        self._needles = [
+            _Needle(word[0].isalnum(), word[-1].isalnum(), frozenset(exact), frozenset(prefix), tuple(sorted(triggers)))
+            for word, (exact, prefix, triggers) in needles.items()
+        ]
+        self._automaton = None
+        if needles:
+            import ahocorasick_rs # Rust extension; only the worker scans
+
+            self._automaton = ahocorasick_rs.BytesAhoCorasick(
+                [word.encode() for word in needles], implementation=ahocorasick_rs.Implementation.DFA,
+            )
+
+        self._untriggered = untriggered
+        self._any_untriggered: Optional[re.Pattern] = None
+        if untriggered:
+            try:
+                self._any_untriggered = re.compile(
+                    "|".join(f"(?:{self._patterns[index][1].pattern})" for index in untriggered), re.IGNORECASE,
+                )
+            except re.error:
+                pass # E.g. the same group name in two patterns; each is then tried on its own
+
+    def __bool__(self) -> bool:
+        return bool(self.keyword_count or self.pattern_count)
+
+    def match_many(self, texts: Sequence[str]) -> list[set[int]]:
+        """Code ids whose rules match each text."""
+        matches: list[set[int]] = [set() for _ in texts]
+        triggered: dict[int, set[int]] = {} # text index -> patterns to run on it
+        if self._automaton is not None and texts:
+            haystack = _haystack(texts)
+            starts = [0]
+            starts.extend(match.end() for match in re.finditer(_SEPARATOR, haystack))
+            for needle_index, start, end in self._automaton.find_matches_as_indexes(haystack, overlapping=True):
+                needle = self._needles[needle_index]
+                index = bisect_right(starts, start) - 1
+                if needle.triggers:
+                    triggered.setdefault(index, set()).update(needle.triggers)
+                if needle.bounded_start and _is_word_char_before(haystack, start):
+                    continue
+                found = matches[index]
+                if needle.prefix:
+                    found.update(needle.prefix)
+                if needle.exact and not (needle.bounded_end and _is_word_char_at(haystack, end)):
+                    found.update(needle.exact)
+        if self._patterns:
+            for index, (text, found) in enumerate(zip(texts, matches)):
+                candidates = triggered.get(index, set())
+                if self._untriggered and (self._any_untriggered is None or self._any_untriggered.search(text)):
+                    candidates = candidates | set(self._untriggered)
+                for pattern_index in sorted(candidates):
+                    code_id, pattern = self._patterns[pattern_index]
+                    if code_id not in found and pattern.search(text):
+                        found.add(code_id)
+        return matches
+
+_compiled: "OrderedDict[str, RuleSet]" = OrderedDict()
+
+def compile_rules(rules: Sequence[CodeRules]) -> RuleSet:
+    """The codebook's RuleSet, compiled only when its rules changed (LRU per process)."""
+    version = rules_version(rules)
+    ruleset = _compiled.get(version)
+    if ruleset is None:
+        ruleset = _compiled[version] = RuleSet(rules)
+        if len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    else:
+        _compiled.move_to_end(version)
+    return ruleset
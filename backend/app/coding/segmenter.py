@@ -0,0 +1,94 @@
+import hashlib
+import math
+import re
+from dataclasses import dataclass
+
+# Paragraphs / speaker turns are separated by one or more line breaks
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n|\r?\n")
+# Sentence ends: punctuation followed by whitespace
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+@dataclass(frozen=True)
+class SegmentSpan:
+    start: int # Offsets into the source text
+    end: int
+    text: str
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; good enough for packing requests
+    return max(1, math.ceil(len(text) / 4))
+
+def content_hash(text: str) -> str:
+    """Hex md5 of a segment's text, the same as Postgres md5(text). Stored with
+    each segment so an edited transcript can be re-segmented incrementally."""
+    return hashlib.md5(text.encode()).hexdigest()
+
+def _paragraph_spans(text: str):
+    start = 0
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        yield start, match.start()
+        start = match.end()
+    yield start, len(text)
+
+def _split_long(text: str, start: int, end: int, max_chars: int):
+    """Split an over-long paragraph at sentence ends (hard-cut over-long sentences)."""
+    sentences = []
+    sentence_start = start
+    for match in _SENTENCE_END.finditer(text, start, end):
+        sentences.append((sentence_start, match.start()))
+        sentence_start = match.end()
+    sentences.append((sentence_start, end))
+
+    chunk_start = chunk_end = None
+    for sentence_start, sentence_end in sentences:
+        while sentence_end - sentence_start > max_chars:
+            if chunk_start is not None:
+                yield chunk_start, chunk_end
+                chunk_start = None
+            yield sentence_start, sentence_start + max_chars
+            sentence_start += max_chars
+        if chunk_start is not None and sentence_end - chunk_start <= max_chars:
+            chunk_end = sentence_end
+        else:
+            if chunk_start is not None:
+                yield chunk_start, chunk_end
+            chunk_start, chunk_end = sentence_start, sentence_end
+    if chunk_start is not None:
+        yield chunk_start, chunk_end
+
+def segment_text(text: str, max_chars: int) -> list[SegmentSpan]:
+    """Split a transcript into segments of at most ~max_chars.
+
+    Segments follow paragraph / speaker-turn boundaries; short consecutive
+    paragraphs are merged and long ones are split at sentence ends. Because
+    boundaries only depend on nearby text, a local edit only changes the
+    segments around it.
+    """
+    spans: list[SegmentSpan] = []
+    current_start = current_end = None
+
+    def flush():
+        if current_start is not None:
+            spans.append(SegmentSpan(current_start, current_end, text[current_start:current_end]))
+
+    for para_start, para_end in _paragraph_spans(text):
+        # Trim surrounding whitespace so offsets point at real content
+        while para_start < para_end and text[para_start].isspace():
+            para_start += 1
+        while para_end > para_start and text[para_end - 1].isspace():
+            para_end -= 1
+        if para_start == para_end:
+            continue
+
+        if para_end - para_start > max_chars:
+            flush()
+            current_start = current_end = None
+            for piece_start, piece_end in _split_long(text, para_start, para_end, max_chars):
+                spans.append(SegmentSpan(piece_start, piece_end, text[piece_start:piece_end]))
+        elif current_start is not None and para_end - current_start <= max_chars:
+            current_end = para_end # Merge into the current segment
+        else:
+            flush()
+            current_start, current_end = para_start, para_end
+    flush()
+    return spans
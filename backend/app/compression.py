@@ -0,0 +1,147 @@
+import gzip
+import zlib
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError: # Optional: without it responses are only gzipped
+    brotli = None
+
+# Response compression, negotiated from Accept-Encoding: Brotli when installed
+# and accepted, else gzip. Only text-like bodies are compressed (JSON, CSV);
+# downloads that already are compressed (XLSX, Parquet, .gz) pass through.
+#
+# A response sent in one piece is compressed whole if it's at least
+# `minimum_size` bytes. A streamed one (exports) is compressed chunk by chunk,
+# each chunk flushed as it is sent, so nothing is held back waiting for more
+# data. Server-sent events are never compressed: every event must reach the
+# client as soon as it's written.
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/xml", "application/javascript", "image/svg+xml")
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+THREADPOOL_MIN_BYTES = 256 * 1024 # Larger bodies are compressed off the event loop
+
+def negotiate(accept_encoding: str, brotli_enabled: bool = True) -> Optional[str]:
+    """"br", "gzip" or None from an Accept-Encoding header (q=0 refuses a coding)."""
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        accepted[coding.strip()] = quality
+    for coding in (("br", "gzip") if brotli_enabled and brotli is not None else ("gzip",)):
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+class _Encoder:
+    """Incremental compressor of one response body."""
+
+    def __init__(self, coding: str, gzip_level: int, brotli_quality: int):
+        if coding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality, mode=brotli.MODE_TEXT)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31) # wbits 31: gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compressed `data`, flushed so the client can decode it right away."""
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+def compress(body: bytes, coding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    """A whole body in one go."""
+    if coding == "br":
+        return brotli.compress(body, quality=brotli_quality, mode=brotli.MODE_TEXT)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "").lower()
+    return (
+        "content-encoding" not in headers
+        and "content-range" not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith(UNCOMPRESSED_TYPES)
+    )
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses as they are sent (see above)."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4, brotli_enabled: bool = True):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.brotli_enabled = brotli_enabled
+
+    async def _run(self, fn, data: bytes, *args) -> bytes:
+        if len(data) >= THREADPOOL_MIN_BYTES:
+            return await run_in_threadpool(fn, data, *args)
+        return fn(data, *args)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.brotli_enabled)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None # The response head, held until the first body message shows how it's sent
+        encoder: Optional[_Encoder] = None
+
+        async def send_wrapper(message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or (start is None and encoder is None):
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                head, start = start, None
+                headers = MutableHeaders(raw=list(head.get("headers", [])))
+                streamed = more_body
+                if not _compressible(headers) or (not streamed and len(body) < self.minimum_size):
+                    await send(head)
+                    await send(message)
+                    return
+                if streamed:
+                    encoder = _Encoder(coding, self.gzip_level, self.brotli_quality)
+                    body = await self._run(encoder.chunk, body)
+                    del headers["content-length"]
+                else:
+                    body = await self._run(compress, body, coding, self.gzip_level, self.brotli_quality)
+                    headers["content-length"] = str(len(body))
+                headers["content-encoding"] = coding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag is not None and not etag.startswith("W/"):
+                    headers["etag"] = "W/" + etag # The compressed bytes differ, so a strong tag no longer holds
+                await send({**head, "headers": headers.raw})
+                await send({**message, "body": body})
+                return
+
+            # Later chunks of a streamed response
+            body = await self._run(encoder.chunk if more_body else encoder.finish, body)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
+from typing import Optional
 
 class Settings(BaseSettings):
     # Load environment variables from .env file if it exists, case_sensitive=True
@@ -8,12 +9,130 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(case_sensitive=True, extra='ignore')
 
     # Database
-    DATABASE_URL: str
+    DATABASE_URL: str # Sync URL (used by Alembic); the app derives the asyncpg URL from it
+
+    # Connection pool (per uvicorn worker)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0 # Max wait for a connection before erroring
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_STATEMENT_TIMEOUT_MS: int = 30000 # Postgres statement_timeout for app connections
+
+    # Read replicas (sync URLs like DATABASE_URL; JSON list in the env). List and analytics reads
+    # go to them round robin, each with a pool sized like the primary's; empty reads from the primary.
+    DATABASE_REPLICA_URLS: list[str] = []
+    DB_REPLICA_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    DB_REPLICA_RETRY_SECONDS: float = 30.0 # An unreachable replica is skipped this long
+    READ_YOUR_WRITES_SECONDS: float = 10.0 # A user's reads stay on the primary this long after their commits (keep above replica lag)
 
     # JWT Authentication (placeholders - generate strong secrets later)
     SECRET_KEY: str = "## CHANGE ME IN PRODUCTION ##"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_MINUTES: int = 24 * 60 # Refresh tokens are single use; each refresh issues a new pair
+    # Signing keys by key id, for rotation (JSON in the env: {"2026-10": "..."}). Tokens are
+    # signed with JWT_ACTIVE_KID and verified with whichever key their `kid` header names.
+    # To rotate: add the new key, then make it active, then drop the old one once
+    # REFRESH_TOKEN_EXPIRE_MINUTES have passed. Empty signs with SECRET_KEY.
+    JWT_KEYS: dict[str, str] = {}
+    JWT_ACTIVE_KID: str = ""
+    TOKEN_REVOCATION_BACKEND: str = "memory" # "memory" or "redis" (shared by all API workers)
+
+    # Password hashing (bcrypt runs in a dedicated process pool)
+    BCRYPT_ROUNDS: int = 12 # Raising this rehashes passwords on next login
+    PASSWORD_HASH_WORKERS: int = 2 # 0 runs hashing in the default threadpool instead
+    PASSWORD_HASH_MAX_PENDING: int = 32 # Hashes in flight before auth routes answer 503
+
+    # Redis (the `broker` service in docker-compose)
+    REDIS_URL: str = "redis://broker:6379/1"
+
+    # Job progress events (Redis stream + pub/sub, streamed to clients over SSE)
+    JOB_EVENTS_STREAM_MAXLEN: int = 500 # Events kept per job for Last-Event-ID resume (approximate)
+    JOB_EVENTS_TTL_SECONDS: int = 24 * 3600 # A job's stream expires this long after its last event
+    JOB_EVENTS_MIN_INTERVAL_SECONDS: float = 0.25 # Per client; updates in between are coalesced into the latest
+    JOB_EVENTS_KEEPALIVE_SECONDS: float = 15.0 # SSE comment sent when no event arrived, so proxies keep the connection
+
+    # Per subscription tier (User.subscription_tier) limits, enforced in Redis (app/limits.py). JSON in
+    # the env; unknown tiers get the "free" limits, 0 means unlimited. Request limits apply per user
+    # and route over a sliding minute; LLM token quotas per user and UTC day/month.
+    TIER_LIMITS: dict[str, dict[str, int]] = {
+        "free": {"requests_per_minute": 120, "llm_tokens_per_day": 100_000, "llm_tokens_per_month": 1_000_000},
+        "pro": {"requests_per_minute": 600, "llm_tokens_per_day": 2_000_000, "llm_tokens_per_month": 30_000_000},
+        "enterprise": {"requests_per_minute": 3000, "llm_tokens_per_day": 0, "llm_tokens_per_month": 0},
+    }
+    RATE_LIMIT_BACKEND: str = "redis" # "redis" (shared) or "memory" (per process, e.g. for tests)
+
+    # Celery (LLM coding and other background jobs)
+    CELERY_BROKER_URL: str = "redis://broker:6379/0"
+    CELERY_RESULT_BACKEND: str = "redis://broker:6379/0"
+
+    # LLM coding
+    OPENAI_API_KEY: str = ""
+    OPENAI_BASE_URL: Optional[str] = None # Point at a fake/local OpenAI-compatible server for testing
+    LLM_MODEL: str = "gpt-4-turbo"
+    LLM_TEMPERATURE: float = 0.0
+    LLM_BATCH_TOKEN_BUDGET: int = 3000 # Segment tokens packed into one request
+    LLM_MAX_SEGMENTS_PER_REQUEST: int = 20
+    LLM_MAX_CONCURRENCY: int = 4 # In-flight requests per worker process
+    LLM_REQUESTS_PER_MINUTE: int = 500 # Provider limits, shared by all workers via Redis
+    LLM_TOKENS_PER_MINUTE: int = 150000
+    SEGMENT_MAX_CHARS: int = 1200
+    LLM_PROMPT_COST_PER_1K_TOKENS: float = 0.01 # USD, used to report savings
+    LLM_COMPLETION_COST_PER_1K_TOKENS: float = 0.03
+    LLM_CACHE_REDIS_MAX_ENTRIES: int = 200000 # Hot tier size; least recently used entries are evicted
+
+    # Bulk project endpoints (POST/PATCH /projects/bulk)
+    BULK_MAX_ITEMS: int = 1000
+    BULK_MAX_BYTES: int = 2 * 1024 * 1024 # Request body
+    BULK_CHUNK_ROWS: int = 500 # Rows per INSERT/UPDATE statement
+
+    # Project export (GET /projects/{id}/export)
+    EXPORT_CHUNK_ROWS: int = 5000 # Rows fetched from the cursor per round trip; also the Parquet row group size
+
+    # Uploads and ingestion (UPLOAD_DIR must be shared by the API and the worker)
+    UPLOAD_DIR: str = "uploads"
+    MAX_UPLOAD_BYTES: int = 200 * 1024 * 1024
+    INGEST_BATCH_ROWS: int = 200 # Spreadsheet rows written (and progress reported) per transaction
+    INGEST_CHUNK_CHARS: int = 1_000_000 # Document text segmented and written per transaction
+
+    # Local inference on CPU (embeddings and zero-shot pre-coding, in the worker)
+    INFERENCE_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2" # Hugging Face id or local path
+    INFERENCE_THREADS: int = 0 # torch intra-op threads per worker process; 0 keeps torch's default
+    INFERENCE_QUANTIZE: bool = False # int8 dynamic quantization of Linear layers
+    INFERENCE_MAX_LENGTH: int = 256 # Tokens per segment (longer segments are truncated)
+    INFERENCE_MAX_BATCH_TOKENS: int = 8192 # Padded tokens per forward pass
+    INFERENCE_MAX_BATCH_SIZE: int = 64
+    PRECODING_THRESHOLD: float = 0.35 # Minimum cosine similarity for a candidate code
+    PRECODING_TOP_K: int = 3 # Candidate codes kept per segment
+
+    # Semantic search (per-project vector index files, written by the worker, read by the API)
+    SEARCH_INDEX_DIR: str = "indexes"
+    SEARCH_INDEX_KIND: str = "flat" # "flat" (exact) or "ivf" (approximate, for large projects)
+    SEARCH_IVF_MIN_VECTORS: int = 20000 # Smaller indexes stay exact even with "ivf"
+    SEARCH_IVF_NPROBE: int = 8 # Inverted lists scanned per query
+    SEARCH_REBUILD_STALE_FRACTION: float = 0.2 # Rebuild once this share of indexed segments was deleted
+    SEARCH_MAX_K: int = 100
+
+    # Keyword-in-context search (app/kwic.py)
+    KWIC_FRAGMENTS: int = 3 # Snippet fragments per segment
+    KWIC_COUNT_TTL_SECONDS: int = 86400 # Cached term hit counts also expire after this
+
+    # Response compression (app/compression.py); turn off when a proxy in front already compresses
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_BYTES: int = 1024 # Smaller responses are sent as they are (streamed ones are always compressed)
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4 # 0-11; higher costs much more CPU per response
+    COMPRESSION_BROTLI_ENABLED: bool = True # Brotli also needs the brotli package; otherwise gzip only
+
+    # Instrumentation
+    METRICS_ENABLED: bool = True # Prometheus metrics at /metrics (keep it off the public network)
+    SERVER_TIMING_ENABLED: bool = False # Add a Server-Timing breakdown (total, db, pool, auth) to responses
+
+    # Principal cache (users looked up by get_current_user)
+    PRINCIPAL_CACHE_BACKEND: str = "memory" # "memory" or "redis"
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000 # Per process (memory backend); Redis entries are bounded by the TTL and maxmemory
 
 # Create a single instance of the settings to be imported elsewhere
 settings = Settings() 
\ No newline at end of file
@@ -1,24 +1,221 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from .config import settings
+from .metrics import current_request_stats
+from .recent_writes import recent_writes
+
+logger = logging.getLogger(__name__)
+
+# DATABASE_URL is the sync (psycopg2) URL shared with Alembic; the app uses the async driver
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    if parsed.drivername in ("postgresql", "postgresql+psycopg2", "postgresql+psycopg"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    elif parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite") # Local benchmarks/tests
+    return parsed.render_as_string(hide_password=False)
+
+SQLALCHEMY_DATABASE_URL = to_async_url(settings.DATABASE_URL)
+
+# --- Pool metrics ---
+
+class PoolMetrics:
+    """Checkout-wait counters, updated by InstrumentedPool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+
+    def record_checkout(self, wait_seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_seconds_total += wait_seconds
+            self.checkout_wait_seconds_max = max(self.checkout_wait_seconds_max, wait_seconds)
+
+pool_metrics = PoolMetrics()
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    # Times every checkout, including waiting for a free slot and pre-ping
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            wait = time.perf_counter() - start
+            pool_metrics.record_checkout(wait)
+            stats = current_request_stats()
+            if stats is not None:
+                stats.pool_wait_seconds += wait
+
+def _is_sqlite(url: str = SQLALCHEMY_DATABASE_URL) -> bool:
+    return url.startswith("sqlite")
+
+def _connect_args(url: str = SQLALCHEMY_DATABASE_URL) -> dict:
+    if _is_sqlite(url):
+        return {}
+    return {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+
+def _engine_options(url: str = SQLALCHEMY_DATABASE_URL) -> dict:
+    if _is_sqlite(url):
+        return {} # SQLite doesn't take pool sizing or server settings
+    return {
+        "poolclass": InstrumentedPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "connect_args": _connect_args(url),
+    }
+
+# Create SQLAlchemy async engine
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, **_engine_options())
+
+# Count queries and DB time per request (see app/metrics.py). The hooks run in
+# the greenlet that executes the query, which shares the request's context.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
 
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_request_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
 
-# Create SQLAlchemy engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def _handle_error(exception_context):
+    if exception_context.connection is not None and exception_context.connection.info.get("query_start"):
+        exception_context.connection.info["query_start"].pop()
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _instrument(async_engine):
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(async_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(async_engine.sync_engine, "handle_error", _handle_error)
+
+_instrument(engine)
+
+class PrimarySession(Session):
+    """Sessions on the primary. A commit made on behalf of a user keeps that
+    user's reads off the replicas for a while (see get_read_db)."""
+
+@event.listens_for(PrimarySession, "after_commit")
+def _after_commit(session):
+    user_id = recent_writes.current_user()
+    if user_id is not None and replicas:
+        recent_writes.mark(user_id)
+
+# Create AsyncSessionLocal class
+# expire_on_commit=False so committed objects can still be serialized by response models
+AsyncSessionLocal = async_sessionmaker(
+    bind=engine, sync_session_class=PrimarySession, autoflush=False, expire_on_commit=False,
+)
+
+# --- Read replicas ---
+
+class ReplicaSet:
+    """Read replicas, taken round robin. A replica that can't be connected to
+    is skipped for DB_REPLICA_RETRY_SECONDS; with none left, reads go to the
+    primary."""
+
+    def __init__(self, urls: list[str], retry_seconds: float):
+        self.retry_seconds = retry_seconds
+        self._sessionmakers = []
+        for url in urls:
+            options = _engine_options(url)
+            if not _is_sqlite(url):
+                # asyncpg waits 60s for a connection by default; a replica that is down must fail fast
+                options["connect_args"]["timeout"] = settings.DB_REPLICA_CONNECT_TIMEOUT_SECONDS
+            replica_engine = create_async_engine(url, **options)
+            _instrument(replica_engine)
+            self._sessionmakers.append(async_sessionmaker(bind=replica_engine, autoflush=False, expire_on_commit=False))
+        self._down_until = [0.0] * len(urls)
+        self._next = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._sessionmakers)
+
+    @property
+    def healthy(self) -> int:
+        now = time.monotonic()
+        return sum(down_until <= now for down_until in self._down_until)
+
+    async def connect(self) -> Optional[AsyncSession]:
+        """A session with a connection checked out on the next healthy replica,
+        or None if every replica is down."""
+        start = next(self._next)
+        for offset in range(len(self._sessionmakers)):
+            index = (start + offset) % len(self._sessionmakers)
+            if self._down_until[index] > time.monotonic():
+                continue
+            session = self._sessionmakers[index]()
+            try:
+                await session.connection() # Pre-pinged, so a dead replica fails here rather than mid-request
+            except (DBAPIError, OSError, asyncio.TimeoutError):
+                await session.close()
+                self._down_until[index] = time.monotonic() + self.retry_seconds
+                logger.warning("Read replica %d unavailable, skipping it for %ss", index, self.retry_seconds, exc_info=True)
+                continue
+            return session
+        return None
+
+replicas = ReplicaSet([to_async_url(url) for url in settings.DATABASE_REPLICA_URLS], settings.DB_REPLICA_RETRY_SECONDS)
+
+@asynccontextmanager
+async def read_session(primary: bool = False) -> AsyncIterator[AsyncSession]:
+    """A session for reads only: on a replica unless `primary` is set or no
+    replica is available, else on the primary."""
+    session = None if primary or not replicas else await replicas.connect()
+    async with session if session is not None else AsyncSessionLocal() as db:
+        yield db
+
+# Celery tasks each run their own event loop (asyncio.run), so pooled asyncpg
+# connections can't be shared between them; workers connect per session instead
+worker_engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=NullPool,
+    connect_args=_connect_args(),
+)
+WorkerSessionLocal = async_sessionmaker(bind=worker_engine, autoflush=False, expire_on_commit=False)
 
 # Create Base class for declarative models
 Base = declarative_base()
 
-# Dependency for FastAPI routes to get DB session (optional but good practice)
-def get_db():
-    db = SessionLocal()
-    try:
+# Dependency for FastAPI routes to get an async DB session
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
+
+def pool_stats() -> dict:
+    """Current pool usage plus cumulative checkout-wait figures."""
+    pool = engine.pool
+    stats = {
+        "checkouts": pool_metrics.checkouts,
+        "checkout_wait_seconds_total": pool_metrics.checkout_wait_seconds_total,
+        "checkout_wait_seconds_max": pool_metrics.checkout_wait_seconds_max,
+    }
+    if replicas:
+        stats.update({"replicas": len(replicas), "replicas_healthy": replicas.healthy})
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "in_use": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0), # overflow() is negative until the pool fills up
+        })
+    return stats
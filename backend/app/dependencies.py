@@ -0,0 +1,43 @@
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import security
+from .database import get_db, read_session, replicas
+from .models.project import Project
+from .principal_cache import Principal
+from .recent_writes import recent_writes
+
+async def reads_from_primary(current_user: Principal = Depends(security.get_current_active_user)) -> bool:
+    """Whether the user's reads must go to the primary: there are no replicas,
+    or the user committed something in the last READ_YOUR_WRITES_SECONDS (which
+    a lagging replica might not have yet)."""
+    return not replicas or await recent_writes.recent(current_user.id)
+
+async def get_read_db(primary: bool = Depends(reads_from_primary)):
+    """Session for routes that only read (lists, analytics): on a healthy read
+    replica, round robin, unless the user's reads must go to the primary."""
+    async with read_session(primary) as db:
+        yield db
+
+async def _owned_project(db: AsyncSession, project_id: int, current_user: Principal) -> Project:
+    project = await db.get(Project, project_id)
+    if project is None or project.owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    return project
+
+async def get_owned_project(
+    project_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(security.get_current_active_user),
+) -> Project:
+    """Loads the project from the path, 404ing if it doesn't exist or belongs to someone else."""
+    return await _owned_project(db, project_id, current_user)
+
+async def get_readable_project(
+    project_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(security.get_current_active_user),
+) -> Project:
+    """get_owned_project for routes on get_read_db: loaded through the route's
+    read session, so the request doesn't also check out a primary connection."""
+    return await _owned_project(db, project_id, current_user)
@@ -0,0 +1,202 @@
+import csv
+import io
+import zipfile
+import zlib
+from typing import Iterator, Sequence
+
+# Export of a project's coded segments, one row per (segment, code) and one
+# with an empty code for uncoded segments. Rows arrive in chunks from a
+# server-side cursor and each writer turns a chunk into the bytes that can be
+# sent so far, so memory stays flat however large the project is.
+
+# Spreadsheet apps evaluate cells starting with these as formulas ("= well, I
+# think so" from a transcript), so in CSV such text gets a leading apostrophe
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+COLUMNS = ("interview", "data_source_id", "segment_id", "position", "text", "code", "code_id", "source", "confidence")
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose contents are taken by the caller after each write."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._written += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._written
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+class CsvWriter:
+    media_type = "text/csv; charset=utf-8"
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _take(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data.encode("utf-8")
+
+    def start(self) -> bytes:
+        self._writer.writerow(COLUMNS)
+        return self._take()
+
+    def write(self, rows: Sequence[tuple]) -> bytes:
+        self._writer.writerows(
+            [("'" + value if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value) for value in row]
+            for row in rows
+        )
+        return self._take()
+
+    def close(self) -> Iterator[bytes]:
+        return iter(())
+
+class XlsxWriter:
+    """openpyxl write-only worksheet streamed straight into the zip.
+
+    openpyxl would spool the sheet to a temporary file and only zip it up on
+    save, so nothing could be sent before the last row. Instead the sheet's
+    XML goes into a zip entry on the response as rows arrive, and the rest of
+    the package (workbook, styles, content types) is taken from an empty
+    workbook with the same sheet at the end. WorksheetWriter is internal to
+    openpyxl, hence the pinned version.
+    """
+
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    sheet_title = "Coded segments"
+
+    def __init__(self):
+        from openpyxl import Workbook # Heavy; only exports need it
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        from openpyxl.worksheet._writer import WorksheetWriter
+
+        self._workbook_class = Workbook
+        self._cell_class = WriteOnlyCell
+        self._illegal = ILLEGAL_CHARACTERS_RE
+        self._sink = _Drain()
+        # The sink can't seek, so entries are written with data descriptors as they stream
+        self._archive = zipfile.ZipFile(self._sink, "w", zipfile.ZIP_DEFLATED, allowZip64=True)
+        self._sheet = Workbook(write_only=True).create_sheet(self.sheet_title)
+        self._sheet_path = "xl/worksheets/sheet1.xml"
+        self._entry = self._archive.open(self._sheet_path, "w", force_zip64=True)
+        self._sheet._writer = WorksheetWriter(self._sheet, out=self._entry)
+
+    def start(self) -> bytes:
+        self._sheet._writer.write_top()
+        self._sheet.append(COLUMNS)
+        return self._sink.take()
+
+    def write(self, rows: Sequence[tuple]) -> bytes:
+        for row in rows:
+            self._sheet.append([self._cell(value) if isinstance(value, str) else value for value in row])
+        return self._sink.take()
+
+    def _cell(self, value: str):
+        # Control characters from transcripts aren't allowed in XML cells
+        value = self._illegal.sub("", value)
+        if not value.startswith("="):
+            return value
+        # openpyxl takes any string starting with "=" for a formula; keep it text
+        cell = self._cell_class(self._sheet, value)
+        cell.data_type = "s"
+        return cell
+
+    def close(self) -> Iterator[bytes]:
+        self._sheet.close()
+        self._entry.close()
+        package = io.BytesIO()
+        skeleton = self._workbook_class(write_only=True)
+        skeleton.create_sheet(self.sheet_title)
+        skeleton.save(package)
+        with zipfile.ZipFile(package) as parts:
+            for name in parts.namelist():
+                if name != self._sheet_path:
+                    self._archive.writestr(name, parts.read(name))
+        self._archive.close()
+        yield self._sink.take()
+
+class ParquetWriter:
+    """One row group per chunk, written straight to the response."""
+
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self):
+        import pyarrow as pa # Optional dependency, checked by parquet_available()
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("interview", pa.string()),
+            ("data_source_id", pa.int32()),
+            ("segment_id", pa.int32()),
+            ("position", pa.int32()),
+            ("text", pa.string()),
+            ("code", pa.string()),
+            ("code_id", pa.int32()),
+            ("source", pa.string()),
+            ("confidence", pa.float64()),
+        ])
+        self._sink = _Drain()
+        self._writer = pq.ParquetWriter(self._sink, self._schema)
+
+    def start(self) -> bytes:
+        return self._sink.take()
+
+    def write(self, rows: Sequence[tuple]) -> bytes:
+        columns = list(zip(*rows))
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(values, type=field.type) for values, field in zip(columns, self._schema)],
+            schema=self._schema,
+        ))
+        return self._sink.take()
+
+    def close(self) -> Iterator[bytes]:
+        self._writer.close()
+        yield self._sink.take()
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+_WRITERS = {"csv": CsvWriter, "xlsx": XlsxWriter, "parquet": ParquetWriter}
+
+def make_writer(format: str):
+    return _WRITERS[format]()
+
+def media_type(format: str) -> str:
+    return _WRITERS[format].media_type
+
+class Gzip:
+    """Incremental gzip (.gz file) of the writer's output."""
+
+    def __init__(self, level: int = 6):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31) # wbits 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        # Sync-flushed so every chunk can be decompressed as soon as it arrives
+        if not data:
+            return b""
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+def filename(project_id: int, format: str, gzip: bool) -> str:
+    return f"project-{project_id}-export.{format}" + (".gz" if gzip else "")
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+def make_crypt_context(rounds: int) -> CryptContext:
+    # deprecated="auto" + an explicit cost lets verify_and_update() flag hashes
+    # made with an older cost factor so they get upgraded on login
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+# --- Worker-side functions ---
+# These run inside the pool processes, so they must be importable top-level functions.
+
+_worker_context: Optional[CryptContext] = None
+
+def _init_worker(rounds: int) -> None:
+    global _worker_context
+    _worker_context = make_crypt_context(rounds)
+
+def _hash(password: str) -> str:
+    return _worker_context.hash(password)
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return _worker_context.verify_and_update(password, hashed_password)
+
+# --- Hasher ---
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop, in a process pool sized independently of
+    the AnyIO threadpool.
+
+    At most `max_pending` hashes may be queued or running; beyond that callers
+    get a 503 with Retry-After instead of waiting indefinitely. A pool broken
+    by a worker dying (OOM kill, segfault) is replaced on the next call.
+    """
+
+    def __init__(self, workers: int, max_pending: int, rounds: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._in_process_ready = False
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            if not self._in_process_ready: # Hash in-process on the default threadpool
+                _init_worker(self.rounds)
+                self._in_process_ready = True
+            return None
+        if self._executor is None:
+            # "spawn" so children don't inherit the event loop/threads of the server process
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.rounds,),
+            )
+        return self._executor
+
+    def _replace_broken(self, executor: Executor) -> None:
+        # Concurrent callers all see the same broken pool; only the first replaces it
+        if self._executor is executor:
+            logger.warning("Password hashing worker died; restarting the process pool")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def _submit(self, fn, *args):
+        # No await between the check and the increment, so this is race-free on one loop
+        if self._in_flight >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests in progress, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            # Hashing has no side effects, so a call lost with a dead worker is retried once in a new pool
+            for _ in range(2):
+                executor = self._get_executor()
+                try:
+                    return await loop.run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    self._replace_broken(executor)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is temporarily unavailable, please retry",
+                headers={"Retry-After": "1"},
+            )
+        finally:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """Returns (is_valid, new_hash); new_hash is set when the stored hash
+        should be replaced (e.g. BCRYPT_ROUNDS changed)."""
+        return await self._submit(_verify_and_update, password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+# Single shared instance, like `settings`
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    rounds=settings.BCRYPT_ROUNDS,
+)
@@ -0,0 +1,63 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Conditional GETs for resources the frontend polls. A route computes a cheap
+# version of what it would return (for a collection: how many rows and when
+# the newest change was), turns it into a weak ETag, and answers a matching
+# If-None-Match with 304 before loading rows or building response models.
+#
+#   etag = await http_cache.collection_etag(db, f"codes-{project.id}", Code, Code.project_id == project.id)
+#   if (not_modified := http_cache.not_modified(request, etag)) is not None:
+#       return not_modified
+#   http_cache.set_headers(response, etag)
+#
+# Tags are weak: a body is equivalent whatever its Content-Encoding (see
+# app/compression.py).
+
+# Browsers keep the response but revalidate before every use; shared caches don't store it
+CACHE_CONTROL = "private, no-cache"
+
+def weak_etag(tag: str, *parts) -> str:
+    return 'W/"' + "-".join([tag, *(str(part) for part in parts)]) + '"'
+
+def digest(data: str) -> str:
+    """Short content hash, for ETags of values that have no version of their own."""
+    return hashlib.blake2b(data.encode(), digest_size=8).hexdigest()
+
+def _opaque(etag: str) -> str:
+    return etag.strip().removeprefix("W/")
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for it)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in (_opaque(candidate) for candidate in header.split(","))
+
+def set_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 for the request if the client's copy is current, else None."""
+    if not etag_matches(request, etag):
+        return None
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+async def collection_etag(db: AsyncSession, tag: str, model, *criteria) -> str:
+    """
+    Weak ETag for the rows of `model` matching `criteria`, from their count and
+    latest max(updated_at, created_at): an insert or update moves the latest
+    timestamp and a delete the count. `tag` names the collection, owner
+    included (f"projects-{user.id}"), so tags of different collections never match.
+    """
+    # updated_at is NULL until the first update and never before created_at
+    latest = func.max(func.coalesce(model.updated_at, model.created_at))
+    count, changed_at = (await db.execute(select(func.count(), latest).select_from(model).where(*criteria))).one()
+    return weak_etag(tag, count, digest(str(changed_at)))
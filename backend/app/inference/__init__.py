@@ -0,0 +1,11 @@
+import os
+
+from ..config import settings
+
+# Local transformer inference on CPU (embeddings, zero-shot pre-coding), run by the Celery worker.
+# The submodules import numpy (and load torch), so API code only imports them where it
+# runs inference (search); anything else it needs lives here.
+
+def index_path(project_id: int) -> str:
+    """Directory of the project's search index (see index.py)."""
+    return os.path.join(settings.SEARCH_INDEX_DIR, f"project_{project_id}")
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+
+from ..config import settings
+
+# torch and transformers are imported when a model is first loaded: they take
+# seconds to import and only the worker runs inference.
+
+@dataclass
+class InferenceStats:
+    batches: int = 0
+    texts: int = 0
+    tokens: int = 0 # Real (unpadded) tokens
+    padded_tokens: int = 0 # Tokens actually computed, padding included
+    seconds: float = 0.0
+    batch_latencies: deque = field(default_factory=lambda: deque(maxlen=10000)) # Seconds, most recent batches
+
+def plan_batches(lengths: list[int], max_batch_tokens: int, max_batch_size: int) -> list[list[int]]:
+    """Group text indices into batches by sequence length.
+
+    Sorting by length means each batch pads to a similar length, and the batch
+    size adapts so batch_size * longest_sequence stays within `max_batch_tokens`
+    (many short segments per batch, few long ones).
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    batches: list[list[int]] = []
+    current: list[int] = []
+    for index in order:
+        longest = lengths[index] # Ascending, so the newest item is the longest
+        if current and ((len(current) + 1) * longest > max_batch_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+        current.append(index)
+    if current:
+        batches.append(current)
+    return batches
+
+class EmbeddingEngine:
+    """Sentence embeddings from a local transformer encoder, on CPU.
+
+    Embeddings are mean-pooled over the attention mask and L2-normalized, so a
+    dot product is the cosine similarity. The model is loaded on first use.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        num_threads: int = 0,
+        quantize: bool = False,
+        max_length: int = 256,
+        max_batch_tokens: int = 8192,
+        max_batch_size: int = 64,
+        dynamic_batching: bool = True,
+    ):
+        self.model_name = model_name
+        self.num_threads = num_threads
+        self.quantize = quantize
+        self.max_length = max_length
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.dynamic_batching = dynamic_batching # False: fixed-size batches in input order (for comparison)
+        self.stats = InferenceStats()
+        self._tokenizer = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._model is not None:
+            return
+        with self._lock:
+            if self._model is not None:
+                return
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads) # Process-wide; size it to the worker's CPU share
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            model = AutoModel.from_pretrained(self.model_name)
+            model.eval()
+            if self.quantize:
+                # int8 weights for the Linear layers (most of an encoder's compute);
+                # activations are quantized on the fly
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            self._tokenizer, self._model = tokenizer, model
+
+    @property
+    def dimension(self) -> int:
+        self._load()
+        return self._model.config.hidden_size
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Returns a (len(texts), dimension) float32 array, in input order."""
+        self._load()
+        import torch
+
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        encoded = self._tokenizer(texts, truncation=True, max_length=self.max_length)["input_ids"]
+        lengths = [len(ids) for ids in encoded]
+        output = np.empty((len(texts), self.dimension), dtype=np.float32)
+
+        if self.dynamic_batching:
+            batches = plan_batches(lengths, self.max_batch_tokens, self.max_batch_size)
+        else:
+            batches = [list(range(i, min(i + self.max_batch_size, len(texts)))) for i in range(0, len(texts), self.max_batch_size)]
+
+        with torch.inference_mode():
+            for batch in batches:
+                start = time.perf_counter()
+                inputs = self._tokenizer.pad({"input_ids": [encoded[i] for i in batch]}, return_tensors="pt")
+                hidden = self._model(**inputs).last_hidden_state
+                mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+                pooled = torch.nn.functional.normalize(pooled, dim=1)
+                output[batch] = pooled.numpy()
+
+                elapsed = time.perf_counter() - start
+                self.stats.batches += 1
+                self.stats.texts += len(batch)
+                self.stats.tokens += sum(lengths[i] for i in batch)
+                self.stats.padded_tokens += inputs["input_ids"].numel()
+                self.stats.seconds += elapsed
+                self.stats.batch_latencies.append(elapsed)
+        return output
+
+@lru_cache(maxsize=1)
+def get_engine() -> EmbeddingEngine:
+    """The process-wide engine configured from settings (the model is loaded once per worker process)."""
+    return EmbeddingEngine(
+        settings.INFERENCE_MODEL,
+        num_threads=settings.INFERENCE_THREADS,
+        quantize=settings.INFERENCE_QUANTIZE,
+        max_length=settings.INFERENCE_MAX_LENGTH,
+        max_batch_tokens=settings.INFERENCE_MAX_BATCH_TOKENS,
+        max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    )
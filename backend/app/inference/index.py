@@ -0,0 +1,243 @@
+import fcntl
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterator, Optional
+
+import numpy as np
+
+from . import index_path
+
+# Per-project vector index on disk, one directory per project:
+#
+#   meta.json            what's indexed (model, dimension, row count, generation, ...)
+#   vectors-<gen>.f32    row-major float32 embeddings, appended to as segments arrive
+#   ids-<gen>.i64        the segment id of each row
+#   lists-<gen>.i32      IVF only: the inverted list (cluster) of each row
+#   centroids-<gen>.f32  IVF only: the cluster centroids
+#
+# Readers memory-map the first `count` rows from meta.json, so rows being
+# appended are invisible until meta.json is atomically replaced. A rebuild
+# writes a new generation of files and then swaps meta.json; open readers keep
+# their (unlinked) old files until they reopen.
+
+@dataclass
+class IndexMeta:
+    model: str
+    dim: int
+    count: int = 0
+    watermark: int = 0 # Highest segment id indexed; newer segments are appended
+    generation: int = 1
+    kind: str = "flat" # "flat" (exact) or "ivf"
+    nlist: int = 0
+
+def _kmeans(sample: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means (vectors and centroids are unit length)."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for cluster in range(nlist):
+            members = sample[assignment == cluster]
+            if len(members):
+                centroid = members.sum(axis=0)
+                centroids[cluster] = centroid / max(np.linalg.norm(centroid), 1e-12)
+    return centroids
+
+class VectorIndex:
+    """Writer/reader for one project's index directory."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _file(self, name: str, generation: int) -> str:
+        stem, extension = name.split(".")
+        return os.path.join(self.path, f"{stem}-{generation}.{extension}")
+
+    # --- Metadata ---
+
+    def read_meta(self) -> Optional[IndexMeta]:
+        try:
+            with open(os.path.join(self.path, "meta.json")) as f:
+                return IndexMeta(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, meta: IndexMeta):
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(asdict(meta), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def meta_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(os.path.join(self.path, "meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Exclusive writer lock (one updater per project across worker processes)."""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # --- Writing (hold lock()) ---
+
+    def append(self, meta: IndexMeta, ids: np.ndarray, vectors: np.ndarray):
+        """Append rows, then publish them by rewriting meta.json."""
+        if not len(ids):
+            return
+        with open(self._file("vectors.f32", meta.generation), "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self._file("ids.i64", meta.generation), "ab") as f:
+            f.write(np.asarray(ids, dtype=np.int64).tobytes())
+        if meta.kind == "ivf":
+            centroids = self._memmap("centroids.f32", meta.generation, np.float32, (meta.nlist, meta.dim))
+            lists = np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+            with open(self._file("lists.i32", meta.generation), "ab") as f:
+                f.write(lists.tobytes())
+        meta.count += len(ids)
+        meta.watermark = max(meta.watermark, int(np.max(ids)))
+        self._write_meta(meta)
+
+    def start_generation(self, model: str, dim: int) -> IndexMeta:
+        """A new, empty generation; it isn't visible to readers until publish()."""
+        os.makedirs(self.path, exist_ok=True)
+        current = self.read_meta()
+        meta = IndexMeta(model=model, dim=dim, generation=(current.generation + 1) if current else 1)
+        for name in ("vectors.f32", "ids.i64", "lists.i32", "centroids.f32"):
+            open(self._file(name, meta.generation), "wb").close()
+        return meta
+
+    def write_rows(self, meta: IndexMeta, ids: np.ndarray, vectors: np.ndarray):
+        """Append rows to an unpublished generation (see start_generation)."""
+        with open(self._file("vectors.f32", meta.generation), "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self._file("ids.i64", meta.generation), "ab") as f:
+            f.write(np.asarray(ids, dtype=np.int64).tobytes())
+        meta.count += len(ids)
+        if len(ids):
+            meta.watermark = max(meta.watermark, int(np.max(ids)))
+
+    def train_ivf(self, meta: IndexMeta, nlist: int, sample_size: int = 50000, chunk_rows: int = 65536):
+        """Cluster an unpublished generation's vectors and assign every row to a list."""
+        vectors = self._memmap("vectors.f32", meta.generation, np.float32, (meta.count, meta.dim))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(meta.count, min(sample_size, meta.count), replace=False))
+        centroids = _kmeans(np.asarray(vectors[sample_rows]), nlist).astype(np.float32)
+        with open(self._file("centroids.f32", meta.generation), "wb") as f:
+            f.write(centroids.tobytes())
+        with open(self._file("lists.i32", meta.generation), "wb") as f:
+            for start in range(0, meta.count, chunk_rows):
+                chunk = np.asarray(vectors[start:start + chunk_rows])
+                f.write(np.argmax(chunk @ centroids.T, axis=1).astype(np.int32).tobytes())
+        meta.kind, meta.nlist = "ivf", nlist
+
+    def publish(self, meta: IndexMeta):
+        """Make a new generation current and delete the files of older ones."""
+        self._write_meta(meta)
+        for name in os.listdir(self.path):
+            stem, _, rest = name.partition("-")
+            generation = rest.split(".")[0]
+            if stem in ("vectors", "ids", "lists", "centroids") and generation.isdigit() and int(generation) != meta.generation:
+                os.remove(os.path.join(self.path, name))
+
+    # --- Reading ---
+
+    def _memmap(self, name: str, generation: int, dtype, shape) -> np.ndarray:
+        if not shape[0]:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self._file(name, generation), dtype=dtype, mode="r", shape=shape)
+
+    def open(self) -> Optional["LoadedIndex"]:
+        meta = self.read_meta()
+        if meta is None:
+            return None
+        vectors = self._memmap("vectors.f32", meta.generation, np.float32, (meta.count, meta.dim))
+        ids = self._memmap("ids.i64", meta.generation, np.int64, (meta.count,))
+        lists = centroids = None
+        if meta.kind == "ivf":
+            lists = self._memmap("lists.i32", meta.generation, np.int32, (meta.count,))
+            centroids = np.asarray(self._memmap("centroids.f32", meta.generation, np.float32, (meta.nlist, meta.dim)))
+        return LoadedIndex(meta, vectors, ids, lists, centroids)
+
+class LoadedIndex:
+    """A read-only, memory-mapped snapshot of an index."""
+
+    def __init__(self, meta: IndexMeta, vectors: np.ndarray, ids: np.ndarray, lists: Optional[np.ndarray], centroids: Optional[np.ndarray]):
+        self.meta = meta
+        self.vectors = vectors
+        self.ids = ids
+        self.lists = lists
+        self.centroids = centroids
+
+    def search(self, query: np.ndarray, k: int, allowed_ids: Optional[np.ndarray] = None, nprobe: int = 8) -> list[tuple[int, float]]:
+        """Top-k (segment id, cosine similarity) pairs for a unit-length query.
+
+        With `allowed_ids` (e.g. segments carrying a code) the search is exact over
+        just those rows. Otherwise IVF indexes only scan the `nprobe` lists whose
+        centroids are closest to the query.
+        """
+        if not self.meta.count or k <= 0:
+            return []
+        rows = None
+        if allowed_ids is not None:
+            rows = np.flatnonzero(np.isin(self.ids, allowed_ids))
+        elif self.lists is not None:
+            probe = np.argsort(-(self.centroids @ query))[:nprobe]
+            rows = np.flatnonzero(np.isin(self.lists, probe))
+
+        if rows is None:
+            scores = self.vectors @ query
+        else:
+            if not len(rows):
+                return []
+            scores = self.vectors[rows] @ query
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        row_ids = top if rows is None else rows[top]
+        return [(int(self.ids[row]), float(scores[index])) for row, index in zip(row_ids, top)]
+
+# --- Per-project access ---
+
+def project_index(project_id: int) -> VectorIndex:
+    return VectorIndex(index_path(project_id))
+
+OPEN_INDEX_CACHE_SIZE = 16 # Projects' indexes kept memory-mapped per process
+
+# project id -> (meta.json mtime, snapshot); dropping a snapshot unmaps its files
+_open_indexes: "OrderedDict[int, tuple[int, LoadedIndex]]" = OrderedDict()
+_open_indexes_lock = threading.Lock() # Searches open indexes from the threadpool
+
+def open_project_index(project_id: int) -> Optional[LoadedIndex]:
+    """The project's index, reopened only when the worker has published changes
+    (LRU per process, so only recently searched projects stay mapped)."""
+    index = project_index(project_id)
+    mtime = index.meta_mtime()
+    with _open_indexes_lock:
+        if mtime is None:
+            _open_indexes.pop(project_id, None)
+            return None
+        cached = _open_indexes.get(project_id)
+        if cached is not None and cached[0] == mtime:
+            _open_indexes.move_to_end(project_id)
+            return cached[1]
+    loaded = index.open()
+    with _open_indexes_lock:
+        _open_indexes[project_id] = (mtime, loaded) # Replaces (and releases) a superseded generation
+        _open_indexes.move_to_end(project_id)
+        if len(_open_indexes) > OPEN_INDEX_CACHE_SIZE:
+            _open_indexes.popitem(last=False)
+    return loaded
@@ -0,0 +1,30 @@
+import numpy as np
+
+# Zero-shot pre-coding by embedding similarity: each code is embedded from its
+# name and description, and a segment's candidate codes are those whose
+# embedding is close enough to the segment's. One encoder pass per segment
+# (plus one per code), instead of one NLI pass per (segment, code) pair.
+
+def code_label(name: str, description: str | None) -> str:
+    return f"{name}: {description}" if description else name
+
+def candidate_codes(
+    segment_vectors: np.ndarray,
+    code_vectors: np.ndarray,
+    code_names: list[str],
+    threshold: float,
+    top_k: int,
+) -> list[list[tuple[str, float]]]:
+    """For each segment, up to `top_k` (code name, cosine similarity) pairs scoring
+    at least `threshold`, best first. Vectors must be L2-normalized."""
+    if not len(code_names):
+        return [[] for _ in range(len(segment_vectors))]
+    scores = segment_vectors @ code_vectors.T # (segments, codes)
+    k = min(top_k, len(code_names))
+    # Partial sort: only the top k per row are ordered
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    results = []
+    for row, indices in zip(scores, top):
+        ranked = sorted(((code_names[i], float(row[i])) for i in indices if row[i] >= threshold), key=lambda pair: -pair[1])
+        results.append(ranked)
+    return results
@@ -0,0 +1,80 @@
+import zipfile
+from typing import Iterator, Optional
+from xml.etree import ElementTree
+
+# --- XLSX ---
+# Expects the layout from the README: an `InterviewID` and a `Transcript` column.
+
+ID_COLUMN = "interviewid"
+TRANSCRIPT_COLUMN = "transcript"
+
+def count_xlsx_rows(path: str) -> Optional[int]:
+    """Data rows in the first sheet, from the sheet's declared dimensions (if any)."""
+    from openpyxl import load_workbook # Heavy, and only the worker parses uploads
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        max_row = workbook.worksheets[0].max_row
+        return max_row - 1 if max_row else None
+    finally:
+        workbook.close()
+
+def iter_xlsx_transcripts(path: str) -> Iterator[tuple[str, str]]:
+    """Yields (interview id, transcript) per row without loading the whole workbook."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(value).strip().lower() if value is not None else "" for value in next(rows, ())]
+        if ID_COLUMN not in header or TRANSCRIPT_COLUMN not in header:
+            raise ValueError("Expected 'InterviewID' and 'Transcript' columns in the first sheet")
+        id_index, transcript_index = header.index(ID_COLUMN), header.index(TRANSCRIPT_COLUMN)
+
+        for row in rows:
+            if len(row) <= max(id_index, transcript_index):
+                continue
+            interview_id, transcript = row[id_index], row[transcript_index]
+            if transcript is None or not str(transcript).strip():
+                continue
+            yield str(interview_id if interview_id is not None else ""), str(transcript)
+    finally:
+        workbook.close()
+
+# --- DOCX ---
+# Paragraphs are read straight from word/document.xml with iterparse, clearing
+# elements as we go, so memory doesn't grow with the document.
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_BODY, _W_P, _W_T, _W_TAB, _W_BR, _W_CR = (_W + tag for tag in ("body", "p", "t", "tab", "br", "cr"))
+
+def _paragraph_text(paragraph) -> str:
+    parts = []
+    for elem in paragraph.iter():
+        if elem.tag == _W_T and elem.text:
+            parts.append(elem.text)
+        elif elem.tag == _W_TAB:
+            parts.append("\t")
+        elif elem.tag in (_W_BR, _W_CR):
+            parts.append("\n")
+    return "".join(parts)
+
+def iter_docx_paragraphs(path: str) -> Iterator[str]:
+    """Yields the non-empty paragraphs of a .docx in document order."""
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as document:
+        depth = 0
+        body = None
+        for event, elem in ElementTree.iterparse(document, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if elem.tag == _W_BODY:
+                    body = elem
+                continue
+            depth -= 1
+            if elem.tag == _W_P:
+                text = _paragraph_text(elem)
+                elem.clear()
+                if text.strip():
+                    yield text
+            if body is not None and depth == 2:
+                body.clear() # Finished a top-level block (paragraph, table, ...): drop it
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import redis
+from redis import asyncio as aioredis
+
+from .config import settings
+
+# Job progress events. Every job update (app/tasks/common.set_job) appends the
+# job's new state to a capped Redis stream and publishes it on a pub/sub
+# channel, atomically, tagged with the stream entry id:
+#
+#   job_events:<job id>   stream (replay for clients resuming with Last-Event-ID)
+#   job_events:<job id>   channel (live updates)
+#
+# Each API process keeps one pub/sub connection (JobEventHub) and fans events
+# out to its SSE clients. Events are full snapshots, so a client that can't
+# keep up only needs the newest one: each subscription holds just the latest
+# event, and intermediate ones are dropped instead of buffered.
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+def _key(job_id: int) -> str:
+    return f"job_events:{job_id}"
+
+def stream_id(event_id: str) -> tuple[int, int]:
+    """Stream entry ids ("<ms>-<seq>") as comparable tuples."""
+    milliseconds, _, sequence = event_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+def is_terminal(data: str) -> bool:
+    return json.loads(data).get("status") in TERMINAL_STATUSES
+
+# --- Publishing (worker side) ---
+
+_PUBLISH_SCRIPT = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', 'data', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('PUBLISH', KEYS[1], id .. ' ' .. ARGV[2])
+return id
+"""
+
+@lru_cache
+def _publisher():
+    # Synchronous: jobs publish a handful of events per batch, and each Celery
+    # task runs its own short-lived event loop
+    client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=1.0, socket_connect_timeout=1.0)
+    return client.register_script(_PUBLISH_SCRIPT)
+
+def publish(job_id: int, data: str):
+    """Record and broadcast a job's new state (JSON). Best effort: progress
+    reporting must never fail the job, and the Job row stays authoritative."""
+    try:
+        _publisher()(keys=[_key(job_id)], args=[settings.JOB_EVENTS_STREAM_MAXLEN, data, settings.JOB_EVENTS_TTL_SECONDS])
+    except redis.RedisError:
+        logger.warning("Could not publish event for job %s", job_id, exc_info=True)
+
+# --- Fan-out (API side) ---
+
+class Subscription:
+    """Latest-only mailbox of one SSE client."""
+
+    def __init__(self):
+        self.latest: Optional[tuple[str, str]] = None # (event id, data)
+        self.closed = False
+        self.coalesced = 0 # Events overwritten before the client took them
+        self._ready = asyncio.Event()
+
+    def offer(self, event_id: str, data: str):
+        if self.latest is not None:
+            self.coalesced += 1
+        self.latest = (event_id, data)
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Optional[tuple[str, str]]:
+        """The newest event, or None after `timeout` seconds without one (or once closed)."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        event, self.latest = self.latest, None
+        return event
+
+class JobEventHub:
+    """One Redis pub/sub connection per API process, shared by all SSE clients."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client: Optional[aioredis.Redis] = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def client(self) -> aioredis.Redis:
+        if self._client is None:
+            self._client = aioredis.from_url(self.url, decode_responses=True)
+        return self._client
+
+    async def subscribe(self, job_id: int) -> Subscription:
+        subscription = Subscription()
+        async with self._lock:
+            if self._pubsub is None:
+                self._pubsub = self.client.pubsub()
+            subscribers = self._subscribers.setdefault(job_id, set())
+            if not subscribers:
+                try:
+                    await self._pubsub.subscribe(_key(job_id))
+                except BaseException:
+                    del self._subscribers[job_id]
+                    raise
+            subscribers.add(subscription)
+            if self._reader is None:
+                self._reader = asyncio.create_task(self._read())
+        return subscription
+
+    async def unsubscribe(self, job_id: int, subscription: Subscription):
+        async with self._lock:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[job_id]
+                if self._pubsub is not None:
+                    try:
+                        await self._pubsub.unsubscribe(_key(job_id))
+                    except redis.RedisError:
+                        pass
+
+    async def _read(self):
+        try:
+            while True:
+                if not self._subscribers:
+                    async with self._lock: # Exit only when subscribe() can see it
+                        if not self._subscribers:
+                            self._reader = None
+                            return
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None or message["type"] != "message":
+                    continue
+                job_id = int(message["channel"].rpartition(":")[2])
+                event_id, _, data = message["data"].partition(" ")
+                for subscription in self._subscribers.get(job_id, ()):
+                    subscription.offer(event_id, data)
+        except redis.RedisError:
+            # Drop the connection and end every stream; clients reconnect with
+            # Last-Event-ID and resume from the stream
+            logger.warning("Job event subscription failed", exc_info=True)
+            async with self._lock:
+                for subscribers in self._subscribers.values():
+                    for subscription in subscribers:
+                        subscription.close()
+                self._subscribers.clear()
+                pubsub, self._pubsub = self._pubsub, None
+                self._reader = None
+            try:
+                await pubsub.aclose()
+            except redis.RedisError:
+                pass
+
+    async def replay(self, job_id: int, after: Optional[str]) -> list[tuple[str, str]]:
+        """Stream events after the event id `after`, or just the latest one without it."""
+        if after is None:
+            entries = await self.client.xrevrange(_key(job_id), count=1)
+        else:
+            entries = await self.client.xrange(_key(job_id), min=f"({after}")
+        return [(event_id, fields["data"]) for event_id, fields in entries]
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+
+# Single shared instance per process, like `settings`
+job_event_hub = JobEventHub(settings.REDIS_URL)
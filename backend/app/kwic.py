@@ -0,0 +1,151 @@
+import html
+import logging
+import re
+import time
+from typing import Optional
+
+from .config import settings
+
+# Keyword-in-context (concordance) search over segment text, served by
+# app/routers/kwic.py. Words and phrases are matched through the segments'
+# generated tsvector column, substrings through the pg_trgm index on their
+# text. Snippets are HTML-escaped with the matches wrapped in <mark>.
+#
+# Counting every segment that contains a term is the expensive part of a
+# search, so counts are cached in Redis per project. Each project has a
+# generation number, bumped whenever its segments change (new transcripts
+# segmented, a transcript edited); counts are stored under the generation they
+# were computed in, so a bump retires them all at once:
+#
+#   kwic:<project id>                          generation
+#   kwic:<project id>:<generation>:<term key>  hit count (with a TTL)
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+FRAGMENT_DELIMITER = " ... "
+
+def term_key(match: str, term: str) -> str:
+    return f"{match}:{' '.join(term.split()).casefold()}"
+
+# --- Snippets ---
+
+def headline_options(term: str, window: int) -> str:
+    """ts_headline options giving `window` words of context on either side."""
+    max_words = 2 * window + len(term.split())
+    return (
+        f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords={max_words}, MinWords={min(window, max_words - 1)}, "
+        f'MaxFragments={settings.KWIC_FRAGMENTS}, FragmentDelimiter="{FRAGMENT_DELIMITER}"'
+    )
+
+_WORD = re.compile(r"\S+")
+
+def highlight_substring(text: str, term: str, window: int) -> str:
+    """ts_headline's output for a substring match, which Postgres can't highlight:
+    up to KWIC_FRAGMENTS fragments of `window` words either side of the matches."""
+    fragments: list[list] = [] # [start, end, match spans]
+    for match in re.finditer(re.escape(term), text, re.IGNORECASE):
+        if fragments and match.start() < fragments[-1][1]:
+            # Within the last fragment's context: extend it
+            fragments[-1][1] = _context_end(text, match.end(), window)
+            fragments[-1][2].append(match.span())
+        elif len(fragments) < settings.KWIC_FRAGMENTS:
+            fragments.append([_context_start(text, match.start(), window), _context_end(text, match.end(), window), [match.span()]])
+        else:
+            break
+    return FRAGMENT_DELIMITER.join(_render(text, *fragment) for fragment in fragments)
+
+def _context_start(text: str, position: int, window: int) -> int:
+    words = [word.start() for word in _WORD.finditer(text, 0, position)]
+    if position > 0 and not text[position - 1].isspace():
+        window += 1 # The rest of the matched word isn't context
+    return words[-window] if len(words) >= window else 0
+
+def _context_end(text: str, position: int, window: int) -> int:
+    if position < len(text) and not text[position].isspace():
+        window += 1
+    end = position
+    for count, word in enumerate(_WORD.finditer(text, position), start=1):
+        end = word.end()
+        if count == window:
+            break
+    return end
+
+def _render(text: str, start: int, end: int, matches: list[tuple[int, int]]) -> str:
+    parts = []
+    for match_start, match_end in matches:
+        parts.append(html.escape(text[start:match_start], quote=False))
+        parts.append(HIGHLIGHT_START + html.escape(text[match_start:match_end], quote=False) + HIGHLIGHT_STOP)
+        start = match_end
+    parts.append(html.escape(text[start:end], quote=False))
+    return "".join(parts).strip()
+
+# --- Hit counts ---
+
+# KEYS[1] generation key; ARGV[1] term key. Returns {generation, count or nil}
+_GET_LUA = """
+local generation = redis.call('GET', KEYS[1]) or '0'
+return {generation, redis.call('GET', KEYS[1] .. ':' .. generation .. ':' .. ARGV[1])}
+"""
+
+_REDIS_RETRY_SECONDS = 5.0 # After a Redis error, searches skip the cache this long
+
+class HitCountCache:
+    """Per-project term hit counts in Redis. Best effort: methods return None
+    (and counts are computed again) when Redis is unavailable.
+
+    get() and put() run in searches, on the event loop, so they use the asyncio
+    client and skip Redis for a while after an error. invalidate() is called
+    from Celery tasks too (each with its own event loop), so it stays sync, and
+    always tries: a missed invalidation would serve stale counts."""
+
+    def __init__(self, url: str, ttl_seconds: int):
+        import redis # Only needed once a search or an invalidation runs
+        from redis import asyncio as aioredis
+
+        self._redis_errors = (redis.RedisError,)
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._async_client = aioredis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._get = self._async_client.register_script(_GET_LUA)
+        self.ttl_seconds = ttl_seconds
+        self._retry_at = 0.0
+
+    def _key(self, project_id: int) -> str:
+        return f"kwic:{project_id}"
+
+    async def _call(self, fn, *args, **kwargs):
+        # Skip Redis for a while after a failure, so an outage doesn't add a timeout to every search
+        if self._retry_at and time.monotonic() < self._retry_at:
+            return None
+        try:
+            result = await fn(*args, **kwargs)
+        except self._redis_errors:
+            logger.warning("Concordance hit count cache unavailable", exc_info=True)
+            self._retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+            return None
+        self._retry_at = 0.0
+        return result
+
+    async def get(self, project_id: int, key: str) -> Optional[tuple[str, Optional[int]]]:
+        """(generation, cached count or None); None if Redis is unavailable."""
+        reply = await self._call(self._get, keys=[self._key(project_id)], args=[key])
+        if reply is None:
+            return None
+        generation, count = reply
+        return generation.decode(), int(count) if count is not None else None
+
+    async def put(self, project_id: int, generation: str, key: str, count: int):
+        # Under the generation the count was computed in: if the segments changed
+        # meanwhile, it lands in a retired generation and is never read
+        await self._call(self._async_client.set, f"{self._key(project_id)}:{generation}:{key}", count, ex=self.ttl_seconds)
+
+    def invalidate(self, project_id: int):
+        try:
+            self._client.incr(self._key(project_id))
+        except self._redis_errors:
+            # Counts may be stale until they expire
+            logger.warning("Could not invalidate concordance hit counts of project %s", project_id, exc_info=True)
+
+# Single shared instance per process, like `settings`
+hit_counts = HitCountCache(settings.REDIS_URL, settings.KWIC_COUNT_TTL_SECONDS)
@@ -0,0 +1,422 @@
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+from .config import settings
+from .metrics import route_template
+
+# Per-tier limits, enforced in Redis so every API worker and Celery worker
+# shares them:
+#
+#   request rate   sliding-window counter per (user, route), checked by
+#                  security.get_current_active_user on every authenticated request
+#   LLM tokens     daily and monthly quota per user; coding jobs reserve each
+#                  request's estimated tokens before sending it and settle the
+#                  reservation with the actual usage afterwards
+#
+# Both are single Lua scripts (one round trip, atomic). If Redis is unavailable
+# the same algorithms run in-process (per worker) until it's back, so limits
+# degrade instead of failing open or failing requests. RATE_LIMIT_BACKEND=memory
+# uses the in-process store only (tests, single-process setups).
+#
+# Request checks run on the API's event loop, so they go through the store's
+# asyncio Redis client. Quota reservations come from Celery tasks, each running
+# its own event loop (asyncio.run) that a shared asyncio client can't follow, so
+# the task passes in its own client. The quota check before a run is queued uses
+# the sync client.
+
+logger = logging.getLogger(__name__)
+
+WINDOW_MS = 60_000 # Request limits are per minute
+_REDIS_RETRY_SECONDS = 5.0 # After a Redis error, use the in-process store this long before trying again
+
+@dataclass(frozen=True)
+class TierLimits:
+    requests_per_minute: int = 0 # 0: unlimited
+    llm_tokens_per_day: int = 0
+    llm_tokens_per_month: int = 0
+
+_TIERS = {name: TierLimits(**values) for name, values in settings.TIER_LIMITS.items()}
+
+def tier_limits(tier: Optional[str]) -> TierLimits:
+    """Limits of a subscription tier; unknown tiers get the "free" ones."""
+    return _TIERS.get(tier or "free") or _TIERS.get("free") or TierLimits()
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_ms: int # Until the current window ends
+    retry_after_ms: int = 0 # Until the request would be allowed (when it isn't)
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_ms / 1000)), # Seconds from now
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after_ms / 1000)))
+        return headers
+
+class QuotaExceeded(Exception):
+    def __init__(self, period: str, limit: int, retry_after_seconds: int):
+        super().__init__(f"LLM token quota exceeded ({limit} tokens per {period}); resets in {retry_after_seconds}s")
+        self.period = period
+        self.limit = limit
+        self.retry_after_seconds = retry_after_seconds
+
+def _sliding_window(now_ms: int, state: Optional[tuple[int, int, int]], limit: int, cost: int) -> tuple[tuple[int, int, int], RateLimitResult]:
+    """The in-process version of _SLIDING_WINDOW_LUA. `state` is (window, count, previous count)."""
+    window, elapsed = divmod(now_ms, WINDOW_MS)
+    last_window, count, previous = state or (window, 0, 0)
+    if last_window != window:
+        previous = count if last_window == window - 1 else 0
+        count = 0
+    # The previous window's count, weighted by how much of it still overlaps the sliding window
+    used = previous * (WINDOW_MS - elapsed) / WINDOW_MS + count
+    reset_ms = WINDOW_MS - elapsed
+    if used + cost > limit:
+        if count + cost <= limit:
+            retry_ms = WINDOW_MS * (1 - (limit - count - cost) / previous) - elapsed
+        else:
+            retry_ms = reset_ms + WINDOW_MS * max(0.0, 1 - (limit - cost) / count)
+        return (window, count, previous), RateLimitResult(False, limit, 0, reset_ms, math.ceil(retry_ms))
+    return (window, count + cost, previous), RateLimitResult(True, limit, int(limit - used - cost), reset_ms)
+
+# --- Store backends ---
+
+class InMemoryLimitStore:
+    """Per-process store."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._windows: dict[str, tuple[int, int, int]] = {}
+        self._usage: dict[str, tuple[float, int]] = {} # key -> (expires at, tokens used)
+        self._writes = 0
+
+    async def hit(self, key: str, limit: int, cost: int = 1) -> Optional[RateLimitResult]:
+        now_ms = int(time.time() * 1000)
+        with self._lock:
+            self._windows[key], result = _sliding_window(now_ms, self._windows.get(key), limit, cost)
+            self._wrote()
+        return result
+
+    def _used(self, key: str, now: float) -> int:
+        entry = self._usage.get(key)
+        return entry[1] if entry is not None and entry[0] > now else 0
+
+    def usage(self, keys: list[str]) -> Optional[list[int]]:
+        now = time.time()
+        with self._lock:
+            return [self._used(key, now) for key in keys]
+
+    async def reserve(self, keys: list[str], limits: list[int], ttls: list[int], tokens: int, client=None) -> Optional[int]:
+        """Add `tokens` to every counter if all stay within their limits (0: unlimited).
+        Returns 0, or the 1-based index of the counter that would go over."""
+        now = time.time()
+        with self._lock:
+            used = [self._used(key, now) for key in keys]
+            for index, (value, limit) in enumerate(zip(used, limits), 1):
+                if limit and value + tokens > limit:
+                    return index
+            for key, value, ttl in zip(keys, used, ttls):
+                self._usage[key] = (self._usage.get(key, (now + ttl, 0))[0], value + tokens)
+            self._wrote()
+        return 0
+
+    async def adjust(self, keys: list[str], tokens: int, client=None) -> Optional[bool]:
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                entry = self._usage.get(key)
+                if entry is not None and entry[0] > now:
+                    self._usage[key] = (entry[0], max(0, entry[1] + tokens))
+        return True
+
+    def _wrote(self):
+        # Drop stale entries every so often (caller holds the lock)
+        self._writes += 1
+        if self._writes % 1000:
+            return
+        now = time.time()
+        current_window = int(now * 1000) // WINDOW_MS
+        self._windows = {key: state for key, state in self._windows.items() if state[0] >= current_window - 1}
+        self._usage = {key: entry for key, entry in self._usage.items() if entry[0] > now}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._windows.clear()
+            self._usage.clear()
+
+
+# KEYS[1] = counter hash (fields w: window, c: count, p: previous count)
+# ARGV[1] = limit, ARGV[2] = window (ms), ARGV[3] = cost
+# Returns {allowed, remaining, reset ms, retry after ms}; uses the Redis clock so all workers agree
+_SLIDING_WINDOW_LUA = """
+redis.replicate_commands()
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local limit = tonumber(ARGV[1])
+local size = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local window = math.floor(now / size)
+local elapsed = now - window * size
+
+local state = redis.call('HMGET', KEYS[1], 'w', 'c', 'p')
+local last = tonumber(state[1]) or window
+local count = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+if last ~= window then
+    if last == window - 1 then previous = count else previous = 0 end
+    count = 0
+end
+
+local used = previous * (size - elapsed) / size + count
+local reset = size - elapsed
+if used + cost > limit then
+    local retry
+    if count + cost <= limit then
+        retry = size * (1 - (limit - count - cost) / previous) - elapsed
+    else
+        retry = reset + size * math.max(0, 1 - (limit - cost) / count)
+    end
+    redis.call('HSET', KEYS[1], 'w', window, 'c', count, 'p', previous)
+    redis.call('PEXPIRE', KEYS[1], size * 2)
+    return {0, 0, reset, math.ceil(retry)}
+end
+redis.call('HSET', KEYS[1], 'w', window, 'c', count + cost, 'p', previous)
+redis.call('PEXPIRE', KEYS[1], size * 2)
+return {1, math.floor(limit - used - cost), reset, 0}
+"""
+
+# KEYS = usage counters; ARGV = tokens, then a (limit, ttl seconds) pair per key
+# Returns 0 after adding the tokens to every counter, or the 1-based index of the
+# counter that would go over its limit (nothing is added then)
+_RESERVE_LUA = """
+local tokens = tonumber(ARGV[1])
+local used = redis.call('MGET', unpack(KEYS))
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[2 * i])
+    if limit > 0 and (tonumber(used[i]) or 0) + tokens > limit then
+        return i
+    end
+end
+for i = 1, #KEYS do
+    redis.call('INCRBY', KEYS[i], tokens)
+    if redis.call('TTL', KEYS[i]) < 0 then
+        redis.call('EXPIRE', KEYS[i], ARGV[2 * i + 1])
+    end
+end
+return 0
+"""
+
+class RedisLimitStore:
+    """Store shared by every worker. Methods return None when Redis is unavailable."""
+
+    def __init__(self, url: str):
+        import redis # Only needed when this backend is selected
+        from redis import asyncio as aioredis
+
+        self._redis_errors = (redis.RedisError,)
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._async_client = aioredis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._sliding_window = self._async_client.register_script(_SLIDING_WINDOW_LUA)
+        self._retry_at = 0.0
+
+    def _skipped(self) -> bool:
+        # Skip Redis for a while after a failure, so an outage doesn't add a timeout to every request
+        return bool(self._retry_at) and time.monotonic() < self._retry_at
+
+    def _failed(self):
+        logger.warning("Rate limit store unavailable; using per-process limits", exc_info=True)
+        self._retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+
+    def _call(self, fn, *args, **kwargs):
+        if self._skipped():
+            return None
+        try:
+            result = fn(*args, **kwargs)
+        except self._redis_errors:
+            self._failed()
+            return None
+        self._retry_at = 0.0
+        return result
+
+    async def _call_async(self, fn, *args, **kwargs):
+        if self._skipped():
+            return None
+        try:
+            result = await fn(*args, **kwargs)
+        except self._redis_errors:
+            self._failed()
+            return None
+        self._retry_at = 0.0
+        return result
+
+    async def hit(self, key: str, limit: int, cost: int = 1) -> Optional[RateLimitResult]:
+        reply = await self._call_async(self._sliding_window, keys=[key], args=[limit, WINDOW_MS, cost])
+        if reply is None:
+            return None
+        allowed, remaining, reset_ms, retry_after_ms = (int(value) for value in reply)
+        return RateLimitResult(bool(allowed), limit, remaining, reset_ms, retry_after_ms)
+
+    def usage(self, keys: list[str]) -> Optional[list[int]]:
+        values = self._call(self._client.mget, keys)
+        return None if values is None else [int(value) if value is not None else 0 for value in values]
+
+    # `client`: an asyncio client bound to the caller's event loop (defaults to the store's own)
+
+    async def reserve(self, keys: list[str], limits: list[int], ttls: list[int], tokens: int, client=None) -> Optional[int]:
+        args = [tokens]
+        for limit, ttl in zip(limits, ttls):
+            args += [limit, ttl]
+        script = (client or self._async_client).register_script(_RESERVE_LUA)
+        reply = await self._call_async(script, keys=keys, args=args)
+        return None if reply is None else int(reply)
+
+    async def adjust(self, keys: list[str], tokens: int, client=None) -> Optional[bool]:
+        async def incr():
+            pipeline = (client or self._async_client).pipeline(transaction=False)
+            for key in keys:
+                pipeline.incrby(key, tokens)
+            await pipeline.execute()
+            return True
+        return await self._call_async(incr)
+
+    def clear(self) -> None:
+        try:
+            for prefix in ("ratelimit:", "llm_tokens:"):
+                keys = list(self._client.scan_iter(match=f"{prefix}*"))
+                if keys:
+                    self._client.delete(*keys)
+        except self._redis_errors:
+            pass
+
+
+def _build_store():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisLimitStore(settings.REDIS_URL)
+    return InMemoryLimitStore()
+
+# Single shared instances, like `settings`; the in-process store stands in while Redis is unavailable
+limit_store = _build_store()
+fallback_store = InMemoryLimitStore()
+
+def _with_fallback(method: str, *args):
+    result = getattr(limit_store, method)(*args)
+    if result is None:
+        result = getattr(fallback_store, method)(*args)
+    return result
+
+async def _with_fallback_async(method: str, *args, **kwargs):
+    result = await getattr(limit_store, method)(*args, **kwargs)
+    if result is None:
+        result = await getattr(fallback_store, method)(*args, **kwargs)
+    return result
+
+# --- Request rate ---
+
+_STATE_KEY = "rate_limit"
+
+async def check_rate_limit(request: Request, user_id: int, tier: str) -> None:
+    """Count the request against the user's limit for its route; 429 when over.
+    The X-RateLimit-* headers are added to the response by RateLimitHeadersMiddleware."""
+    limit = tier_limits(tier).requests_per_minute
+    if not limit:
+        return
+    route = f"{request.method} {route_template(request.scope)}"
+    key = f"ratelimit:{user_id}:{route}"
+    result = await limit_store.hit(key, limit)
+    if result is None:
+        result = await fallback_store.hit(key, limit)
+    if not result.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers=result.headers(),
+        )
+    request.state.rate_limit = result
+
+class RateLimitHeadersMiddleware:
+    """Adds the X-RateLimit-* headers of requests that were rate limited.
+
+    Pure ASGI, and done here rather than in the dependency so that responses
+    routes return directly (streams, 304s) get them too.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                result = scope.get("state", {}).get(_STATE_KEY)
+                if result is not None:
+                    headers = list(message.get("headers", []))
+                    headers += [(name.lower().encode(), value.encode()) for name, value in result.headers().items()]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+# --- LLM token quotas ---
+
+def _periods(user_id: int, now: datetime) -> list[tuple[str, str, int]]:
+    """(period name, counter key, seconds until the period ends) for the day and the month (UTC)."""
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    next_month = (now.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return [
+        ("day", f"llm_tokens:{user_id}:{now:%Y-%m-%d}", math.ceil((tomorrow - now).total_seconds())),
+        ("month", f"llm_tokens:{user_id}:{now:%Y-%m}", math.ceil((next_month - now).total_seconds())),
+    ]
+
+class LLMTokenQuota:
+    """A user's daily and monthly LLM token quota, as used by one coding job.
+    `redis_client` is the job's asyncio Redis client, used by reserve and settle."""
+
+    def __init__(self, user_id: int, tier: str, redis_client=None):
+        self.user_id = user_id
+        self.redis_client = redis_client
+        limits = tier_limits(tier)
+        self.limits = [limits.llm_tokens_per_day, limits.llm_tokens_per_month]
+
+    def check(self) -> None:
+        """Raise QuotaExceeded if either quota is already used up."""
+        if not any(self.limits):
+            return
+        periods = _periods(self.user_id, datetime.now(timezone.utc))
+        used = _with_fallback("usage", [key for _, key, _ in periods])
+        for (period, _, ends_in), value, limit in zip(periods, used, self.limits):
+            if limit and value >= limit:
+                raise QuotaExceeded(period, limit, ends_in)
+
+    async def reserve(self, tokens: int) -> Optional[list[str]]:
+        """Take `tokens` from both quotas, or raise QuotaExceeded. Returns the
+        counters to settle with the actual usage (None when unlimited)."""
+        if not any(self.limits):
+            return None
+        periods = _periods(self.user_id, datetime.now(timezone.utc))
+        keys = [key for _, key, _ in periods]
+        ttls = [ends_in + 86400 for _, _, ends_in in periods] # Kept a day past the period, for reporting
+        over = await _with_fallback_async("reserve", keys, self.limits, ttls, tokens, client=self.redis_client)
+        if over:
+            period, _, ends_in = periods[over - 1]
+            raise QuotaExceeded(period, self.limits[over - 1], ends_in)
+        return keys
+
+    async def settle(self, reservation: Optional[list[str]], reserved: int, used: int) -> None:
+        """Replace a reservation's estimate with the tokens actually used (0 releases it)."""
+        if reservation is not None and used != reserved:
+            await _with_fallback_async("adjust", reservation, used - reserved, client=self.redis_client)
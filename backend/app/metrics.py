@@ -0,0 +1,173 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Request instrumentation. MetricsMiddleware gives every HTTP request a
+# RequestStats (in a context variable, so it's visible to dependencies, the
+# SQLAlchemy cursor hooks in app/database.py and threadpool calls), then records
+# it in the Prometheus metrics below, served at /metrics.
+
+# --- Per-request stats ---
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0 # Time in cursor.execute
+    pool_wait_seconds: float = 0.0 # Time checking out connections
+    spans: dict[str, float] = field(default_factory=dict) # Named sections, e.g. "auth" (seconds)
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being handled, or None outside a request (e.g. in workers)."""
+    return _current.get()
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Adds the block's duration to the current request's `name` span."""
+    stats = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.spans[name] = stats.spans.get(name, 0.0) + time.perf_counter() - start
+
+# --- Metrics ---
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request", ["route"], buckets=_LATENCY_BUCKETS,
+)
+REQUEST_POOL_WAIT_SECONDS = Histogram(
+    "http_request_pool_wait_seconds", "Time spent checking out DB connections per request", ["route"], buckets=_LATENCY_BUCKETS,
+)
+REQUEST_SPAN_SECONDS = Counter(
+    "http_request_span_seconds", "Time spent in named sections of request handling", ["route", "span"],
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being handled", multiprocess_mode="livesum")
+
+# Sampled when /metrics is scraped
+THREADPOOL_SIZE = Gauge("threadpool_size", "Threads available to run_in_threadpool / sync dependencies", multiprocess_mode="max")
+THREADPOOL_BUSY = Gauge("threadpool_busy", "Threadpool threads in use", multiprocess_mode="livesum")
+THREADPOOL_WAITING = Gauge("threadpool_waiting", "Calls queued for a threadpool thread", multiprocess_mode="livesum")
+DB_POOL_IN_USE = Gauge("db_pool_in_use", "DB connections checked out", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "DB connections opened beyond the pool size", multiprocess_mode="livesum")
+PASSWORD_HASHES_IN_FLIGHT = Gauge("password_hashes_in_flight", "bcrypt hashes queued or running", multiprocess_mode="livesum")
+PRINCIPAL_CACHE_HITS = Gauge("principal_cache_hits", "Principal cache hits since start", multiprocess_mode="livesum")
+PRINCIPAL_CACHE_MISSES = Gauge("principal_cache_misses", "Principal cache misses since start", multiprocess_mode="livesum")
+
+def _sample_gauges():
+    # Imported here: this module is imported by app.database
+    from anyio import to_thread
+
+    from .database import pool_stats
+    from .hashing import password_hasher
+    from .principal_cache import principal_cache
+
+    limiter = to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    THREADPOOL_SIZE.set(limiter.total_tokens)
+    THREADPOOL_BUSY.set(statistics.borrowed_tokens)
+    THREADPOOL_WAITING.set(statistics.tasks_waiting)
+
+    pool = pool_stats()
+    DB_POOL_IN_USE.set(pool.get("in_use", 0))
+    DB_POOL_OVERFLOW.set(pool.get("overflow", 0))
+    PASSWORD_HASHES_IN_FLIGHT.set(password_hasher.in_flight)
+    cache = principal_cache.stats()
+    PRINCIPAL_CACHE_HITS.set(cache["hits"])
+    PRINCIPAL_CACHE_MISSES.set(cache["misses"])
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus text format. With several uvicorn workers, set
+    PROMETHEUS_MULTIPROC_DIR so every worker's samples are aggregated."""
+    _sample_gauges()
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+# --- Middleware ---
+
+def _server_timing(stats: RequestStats, total_seconds: float) -> bytes:
+    parts = [f"total;dur={total_seconds * 1000:.1f}"]
+    parts.append(f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"')
+    if stats.pool_wait_seconds:
+        parts.append(f"pool;dur={stats.pool_wait_seconds * 1000:.1f}")
+    for name, seconds in stats.spans.items():
+        parts.append(f"{name};dur={seconds * 1000:.1f}")
+    return ", ".join(parts).encode()
+
+def route_template(scope) -> str:
+    """The matched route's full path template (/projects/{project_id}), used as the
+    metric label instead of the raw path to bound cardinality."""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    # Routes of included routers may only know their path relative to the include
+    # prefix; take the prefix from the leading segments of the actual path
+    segments = template.count("/")
+    prefix = scope["path"].rsplit("/", segments)[0] if segments else ""
+    return prefix + template
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no response buffering, so streaming responses are unaffected)."""
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    # Everything up to the response head (handler, DB, serialization)
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(stats, time.perf_counter() - start)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            _current.reset(token)
+            route_path = route_template(scope)
+            REQUEST_DURATION.labels(scope["method"], route_path, str(status_code)).observe(time.perf_counter() - start)
+            REQUEST_QUERIES.labels(route_path).observe(stats.queries)
+            REQUEST_DB_SECONDS.labels(route_path).observe(stats.db_seconds)
+            REQUEST_POOL_WAIT_SECONDS.labels(route_path).observe(stats.pool_wait_seconds)
+            for name, seconds in stats.spans.items():
+                REQUEST_SPAN_SECONDS.labels(route_path, name).inc(seconds)
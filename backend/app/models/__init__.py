@@ -1,5 +1,12 @@
 from .user import User
 from .project import Project
+from .data_source import DataSource
+from .segment import Segment
+from .code import Code, SegmentCode
+from .job import Job
+from .llm_cache import LLMCacheEntry
+from .analytics import ProjectAnalytics, AnalyticsCodeCount, AnalyticsCodePair
+from .revoked_token import RevokedToken
 
 # Import Base from database to ensure it's available if needed,
 # though models already import it. Redundant but safe.
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, func
+
+from ..database import Base
+
+# Materialized code analytics (see app/analytics.py). Only applied codes count
+# (LLM and manual, not local-model candidates). Rows go away with their code or
+# data source through the foreign keys.
+
+class ProjectAnalytics(Base):
+    """One row per project whose aggregates have been built; `version` changes
+    whenever they do (it's the analytics ETag)."""
+    __tablename__ = "project_analytics"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+
+    built_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class AnalyticsCodeCount(Base):
+    """Segments of one interview (data source) carrying a code."""
+    __tablename__ = "analytics_code_counts"
+
+    data_source_id = Column(Integer, ForeignKey("data_sources.id", ondelete="CASCADE"), primary_key=True)
+    code_id = Column(Integer, ForeignKey("codes.id", ondelete="CASCADE"), primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    segments = Column(Integer, nullable=False)
+
+class AnalyticsCodePair(Base):
+    """Segments carrying both codes (code_a_id < code_b_id)."""
+    __tablename__ = "analytics_code_pairs"
+
+    code_a_id = Column(Integer, ForeignKey("codes.id", ondelete="CASCADE"), primary_key=True)
+    code_b_id = Column(Integer, ForeignKey("codes.id", ondelete="CASCADE"), primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    segments = Column(Integer, nullable=False)
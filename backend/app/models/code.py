@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, JSON, UniqueConstraint, func
+from sqlalchemy.orm import relationship
+
+from ..database import Base
+
+class Code(Base):
+    """An entry in a project's codebook."""
+    __tablename__ = "codes"
+    __table_args__ = (
+        UniqueConstraint("project_id", "name", name="uq_codes_project_id_name"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    description = Column(Text, nullable=True) # Included in the LLM prompt
+    # Rules that apply the code without the LLM (see app/coding/rules.py)
+    keywords = Column(JSON, nullable=False, default=list, server_default="[]")
+    patterns = Column(JSON, nullable=False, default=list, server_default="[]")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    project = relationship("Project", back_populates="codes")
+
+    def __repr__(self):
+        return f"<Code(id={self.id}, name='{self.name}', project_id={self.project_id})>"
+
+class SegmentCode(Base):
+    """A code applied to a segment."""
+    __tablename__ = "segment_codes"
+    __table_args__ = (
+        UniqueConstraint("segment_id", "code_id", name="uq_segment_codes_segment_id_code_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    segment_id = Column(Integer, ForeignKey("segments.id", ondelete="CASCADE"), nullable=False)
+    code_id = Column(Integer, ForeignKey("codes.id", ondelete="CASCADE"), nullable=False, index=True)
+    source = Column(String, default="llm", nullable=False) # Who applied it: "llm", "manual", "rule", ...
+    confidence = Column(Float, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    segment = relationship("Segment", back_populates="codes")
+    code = relationship("Code")
+
+    def __repr__(self):
+        return f"<SegmentCode(segment_id={self.segment_id}, code_id={self.code_id}, source='{self.source}')>"
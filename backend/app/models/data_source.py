@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
+from sqlalchemy.orm import relationship
+
+from ..database import Base
+
+class DataSource(Base):
+    __tablename__ = "data_sources"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String, nullable=False) # e.g. the InterviewID of a transcript
+    kind = Column(String, default="transcript", nullable=False)
+    content = Column(Text, nullable=False, default="") # Full transcript text
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    project = relationship("Project", back_populates="data_sources")
+    # Segments are ordered by their position within the transcript
+    segments = relationship("Segment", back_populates="data_source", cascade="all, delete-orphan", order_by="Segment.position")
+
+    def __repr__(self):
+        return f"<DataSource(id={self.id}, name='{self.name}', project_id={self.project_id})>"
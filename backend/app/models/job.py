@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, func
+
+from ..database import Base
+
+class Job(Base):
+    """A background task run by the Celery worker (e.g. an LLM coding run)."""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String, nullable=False) # e.g. "coding"
+    status = Column(String, default="queued", nullable=False) # queued, running, succeeded, failed
+    total = Column(Integer, default=0, nullable=False) # Units of work (e.g. segments) to process
+    done = Column(Integer, default=0, nullable=False)
+    stats = Column(JSON, nullable=True) # Kind-specific counters (requests, tokens, ...)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind='{self.kind}', status='{self.status}')>"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, func
+
+from ..database import Base
+
+class LLMCacheEntry(Base):
+    """Persistent tier of the LLM response cache (see app/coding/cache.py)."""
+    __tablename__ = "llm_cache_entries"
+
+    # sha256 of (normalized segment text, prompt version, codebook version, model, temperature)
+    key = Column(String(64), primary_key=True)
+    model = Column(String, nullable=False)
+    codes = Column(JSON, nullable=False) # Code names the model applied
+    # This segment's share of the original request's usage (what a hit saves)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<LLMCacheEntry(key='{self.key}', model='{self.model}')>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 
 # Use relative import for Base within the same package
@@ -6,6 +6,10 @@ from ..database import Base
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        # Serves the owner filter and (created_at, id) keyset ordering of GET /projects/
+        Index("ix_projects_owner_id_created_at_id", "owner_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
@@ -20,9 +24,9 @@ class Project(Base):
     # 'back_populates' links it to the corresponding relationship in the User model (we'll add this later)
     owner = relationship("User", back_populates="projects")
 
-    # Define relationships to other models if needed later (e.g., data sources, codes)
-    # data_sources = relationship("DataSource", back_populates="project", cascade="all, delete-orphan")
-    # codes = relationship("Code", back_populates="project", cascade="all, delete-orphan")
+    # Transcripts and the codebook belong to the project
+    data_sources = relationship("DataSource", back_populates="project", cascade="all, delete-orphan")
+    codes = relationship("Code", back_populates="project", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Project(id={self.id}, name='{self.name}', owner_id={self.owner_id})>"
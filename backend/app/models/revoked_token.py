@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
+
+from ..database import Base
+
+class RevokedToken(Base):
+    """A single revoked token: a refresh token that was used (or logged out), or
+    a logged-out access token. The durable record behind the revocation store's
+    denylist (see app/revocation.py); rows are useless once `expires_at` passes."""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True) # The token's own expiry
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<RevokedToken(jti='{self.jti}', user_id={self.user_id})>"
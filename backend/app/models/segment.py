@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, func
+from sqlalchemy.orm import relationship
+
+from ..database import Base
+
+class Segment(Base):
+    """A chunk of a transcript; the unit that codes are applied to."""
+    __tablename__ = "segments"
+    __table_args__ = (
+        Index("ix_segments_data_source_id_position", "data_source_id", "position"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # project_id is denormalized from the data source so project-wide queries skip a join
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    data_source_id = Column(Integer, ForeignKey("data_sources.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False) # Order within the data source
+    start_offset = Column(Integer, nullable=False) # Character offsets into DataSource.content
+    end_offset = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    # Postgres also has a generated, GIN-indexed `text_search` tsvector column
+    # and a pg_trgm index on `text` (migration e1c7d5a3b942); both are left out
+    # of the model so SQLite can still create the schema in local runs
+    token_count = Column(Integer, nullable=False, default=0) # Estimated, used for request packing
+    content_hash = Column(String(32), nullable=True) # md5 of text; edits keep segments whose hash is unchanged
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    data_source = relationship("DataSource", back_populates="segments")
+    codes = relationship("SegmentCode", back_populates="segment", cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<Segment(id={self.id}, data_source_id={self.data_source_id}, position={self.position})>"
@@ -13,6 +13,8 @@ class User(Base):
     # Nullable fields for features added later or dependent on external services
     stripe_customer_id = Column(String, unique=True, nullable=True) 
     subscription_tier = Column(String, default="free", nullable=False)
+    # Embedded in tokens as `ver`; incrementing it revokes all of the user's tokens (see app/revocation.py)
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
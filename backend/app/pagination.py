@@ -0,0 +1,56 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+# --- Keyset cursors ---
+# Cursors are opaque to clients: base64url-encoded JSON of the sort key of the
+# last row on the page. Datetimes are tagged so they round-trip.
+
+def encode_cursor(*values) -> str:
+    encoded = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(encoded, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_value(value, expected: type):
+    if expected is datetime:
+        return datetime.fromisoformat(value["dt"])
+    # bool is an int subclass, but never part of a sort key
+    if type(value) is not expected:
+        raise TypeError(f"expected {expected.__name__}")
+    return value
+
+def decode_cursor(cursor: str, *types: type) -> list:
+    """The sort key values of `cursor`, checked against `types` (e.g. datetime, int)
+    so that a tampered cursor is a 400 rather than a failed query."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong cursor shape")
+        return [_decode_value(value, expected) for value, expected in zip(values, types)]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+# --- Counting ---
+
+async def estimate_count(db: AsyncSession, query: Select) -> int:
+    """Row count for `query` from the planner's estimate rather than a scan.
+
+    Postgres only; other dialects (SQLite in local runs) fall back to COUNT(*).
+    """
+    dialect = db.bind.dialect
+    if dialect.name != "postgresql":
+        result = await db.execute(select(func.count()).select_from(query.subquery()))
+        return result.scalar_one()
+
+    sql = query.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = result.scalar_one()
+    if isinstance(plan, str): # asyncpg returns json columns undecoded
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,226 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Fields that, when changed on a User, make any cached principal stale
+_WATCHED_FIELDS = ("email", "is_active", "subscription_tier")
+
+_REDIS_RETRY_SECONDS = 5.0 # After a Redis error, lookups skip it this long (and go to Postgres)
+
+# --- Principal snapshot ---
+
+@dataclass(frozen=True)
+class Principal:
+    """The subset of a User that authenticated routes need.
+
+    Plain data (not an ORM instance) so it can be shared across requests and
+    sessions, and serialized into Redis.
+    """
+    id: int
+    email: str
+    is_active: bool
+    subscription_tier: str
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            is_active=bool(user.is_active),
+            subscription_tier=user.subscription_tier,
+            created_at=user.created_at,
+        )
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat() if self.created_at else None
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "Principal":
+        data = json.loads(raw)
+        if data.get("created_at"):
+            data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+# --- Cache backends ---
+
+class _CacheCounters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+        }
+
+
+class InMemoryPrincipalCache(_CacheCounters):
+    """Per-process LRU cache with a TTL on every entry."""
+
+    def __init__(self, ttl_seconds: int, max_size: int):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, tuple[float, Principal]]" = OrderedDict()
+
+    async def get(self, user_id: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] < time.monotonic():
+                # Expired, drop it and treat as a miss
+                del self._entries[user_id]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+        self._record(entry is not None)
+        return entry[1] if entry is not None else None
+
+    async def set(self, principal: Principal) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[principal.id] = (expires_at, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False) # Evict least recently used
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisPrincipalCache(_CacheCounters):
+    """Cache shared by every API worker, stored in Redis with a TTL.
+
+    Not bounded by PRINCIPAL_CACHE_MAX_SIZE: every key expires after the TTL,
+    so it holds at most the users seen within one TTL, and under memory
+    pressure Redis evicts them per its maxmemory-policy (any volatile-* policy
+    covers them). Redis failures degrade to cache misses so auth keeps working
+    (against Postgres) if the broker is unavailable.
+
+    get() and set() run in get_current_user, so they use the asyncio client and
+    skip Redis for a while after an error. invalidate() runs in the (sync)
+    after_commit hook and always tries, so a change is never left cached.
+    """
+
+    key_prefix = "principal:"
+
+    def __init__(self, url: str, ttl_seconds: int):
+        super().__init__()
+        import redis # Only needed when this backend is selected
+        from redis import asyncio as aioredis
+
+        self.ttl_seconds = ttl_seconds
+        self._redis_errors = (redis.RedisError,)
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._async_client = aioredis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._retry_at = 0.0
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.key_prefix}{user_id}"
+
+    async def _call(self, fn, *args):
+        # Skip Redis for a while after a failure, so an outage doesn't add a timeout to every request
+        if self._retry_at and time.monotonic() < self._retry_at:
+            return None
+        try:
+            result = await fn(*args)
+        except self._redis_errors:
+            logger.warning("Principal cache unavailable; loading users from Postgres", exc_info=True)
+            self._retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+            return None
+        self._retry_at = 0.0
+        return result
+
+    async def get(self, user_id: int) -> Optional[Principal]:
+        raw = await self._call(self._async_client.get, self._key(user_id))
+        self._record(raw is not None)
+        return Principal.from_json(raw) if raw is not None else None
+
+    async def set(self, principal: Principal) -> None:
+        await self._call(self._async_client.setex, self._key(principal.id), self.ttl_seconds, principal.to_json())
+
+    def invalidate(self, user_id: int) -> None:
+        try:
+            self._client.delete(self._key(user_id))
+        except self._redis_errors:
+            pass
+
+    def clear(self) -> None:
+        try:
+            keys = list(self._client.scan_iter(match=f"{self.key_prefix}*"))
+            if keys:
+                self._client.delete(*keys)
+        except self._redis_errors:
+            pass
+
+
+def _build_cache():
+    if settings.PRINCIPAL_CACHE_BACKEND == "redis":
+        return RedisPrincipalCache(settings.REDIS_URL, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+    return InMemoryPrincipalCache(settings.PRINCIPAL_CACHE_TTL_SECONDS, settings.PRINCIPAL_CACHE_MAX_SIZE)
+
+# Single shared instance, like `settings`
+principal_cache = _build_cache()
+
+def invalidate_principal(user_id: int) -> None:
+    """Drop a cached principal, e.g. after changing a user outside the ORM."""
+    principal_cache.invalidate(user_id)
+
+# --- Automatic invalidation ---
+# Changes are collected at flush time (while attribute history is still
+# available) and applied after commit, so a concurrent request can't re-cache
+# the old row between the flush and the commit.
+
+_PENDING_KEY = "principal_cache_invalidations"
+
+@event.listens_for(Session, "after_flush")
+def _collect_stale_principals(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in session.dirty:
+        if isinstance(obj, User) and any(
+            inspect(obj).attrs[name].history.has_changes() for name in _WATCHED_FIELDS
+        ):
+            pending.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            pending.add(obj.id)
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        principal_cache.invalidate(user_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_invalidations(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,88 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from .config import settings
+
+# Read-your-writes for reads served by replicas (app/database.py). Replicas
+# lag the primary, so right after a user changes something (creates a
+# project, renames a code) a replica may not have it yet. Every commit made
+# while handling a user's request marks the user in Redis for
+# READ_YOUR_WRITES_SECONDS, and get_read_db sends a marked user's reads to the
+# primary. The marker lives in Redis rather than a cookie so it holds across
+# API workers and for clients that only send bearer tokens.
+#
+#   recent_write:<user id>   set (with a TTL) by the user's last commit
+
+logger = logging.getLogger(__name__)
+
+_REDIS_RETRY_SECONDS = 5.0 # After a Redis error, skip it this long (reads go to the primary meanwhile)
+
+# The authenticated user of the request being handled (set by get_current_active_user)
+_current_user: ContextVar[Optional[int]] = ContextVar("recent_writes_user", default=None)
+
+class RecentWrites:
+    """Users who committed within the last `window_seconds`. When Redis is
+    unavailable every user counts as having written, so reads stay on the primary.
+
+    recent() runs for every replica-routed read, so it uses the asyncio client;
+    mark() runs in the (sync) after_commit hook. After a Redis error both skip
+    Redis for a while, so an outage doesn't add a timeout to every request."""
+
+    prefix = "recent_write:"
+
+    def __init__(self, url: str, window_seconds: float):
+        self._url = url
+        self.window_seconds = window_seconds
+        self._client = None
+        self._async_client = None
+        self._retry_at = 0.0
+
+    def _connect(self):
+        import redis # Only needed once replicas are configured
+        from redis import asyncio as aioredis
+
+        self._redis_errors = (redis.RedisError,)
+        self._client = redis.Redis.from_url(self._url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._async_client = aioredis.from_url(self._url, socket_timeout=0.05, socket_connect_timeout=0.05)
+
+    def _available(self) -> bool:
+        if self._retry_at and time.monotonic() < self._retry_at:
+            return False
+        if self._client is None:
+            self._connect()
+        return True
+
+    def _failed(self, message: str, *args):
+        logger.warning(message, *args, exc_info=True)
+        self._retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+
+    def bind_user(self, user_id: int):
+        _current_user.set(user_id)
+
+    def current_user(self) -> Optional[int]:
+        return _current_user.get()
+
+    def mark(self, user_id: int):
+        # While Redis is skipped, reads go to the primary anyway (see recent())
+        if not self._available():
+            return
+        try:
+            self._client.set(f"{self.prefix}{user_id}", 1, px=int(self.window_seconds * 1000))
+        except self._redis_errors:
+            self._failed("Could not mark a recent write by user %s", user_id)
+
+    async def recent(self, user_id: int) -> bool:
+        if not self._available():
+            return True
+        try:
+            found = await self._async_client.exists(f"{self.prefix}{user_id}")
+        except self._redis_errors:
+            self._failed("Recent write markers unavailable, reading from the primary")
+            return True
+        self._retry_at = 0.0
+        return bool(found)
+
+# Single shared instance per process, like `settings`
+recent_writes = RecentWrites(settings.REDIS_URL, settings.READ_YOUR_WRITES_SECONDS)
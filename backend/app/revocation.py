@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import delete, event, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models.revoked_token import RevokedToken
+from .models.user import User
+
+# Token revocation without a database lookup per request.
+#
+# users.token_version is the source of truth: every token carries the version it
+# was minted with (the `ver` claim) and bumping the column revokes all of the
+# user's tokens. The bump is also published here as the user's minimum valid
+# version, so get_current_user can reject stale access tokens without reading
+# the row. Single access tokens (logout) are revoked by adding their `jti` to a
+# denylist. Entries only live as long as the tokens they could reject, so both
+# stay small.
+#
+# Single revocations are also recorded in Postgres (revoked_tokens), which is
+# what refresh checks: using a refresh token inserts its jti, and the insert
+# finding it already there is reuse, decided atomically for every worker. The
+# per-process store reloads the denylist from that table when it starts.
+
+logger = logging.getLogger(__name__)
+
+_REDIS_RETRY_SECONDS = 5.0 # After a Redis error, skip it this long (callers fall back to Postgres)
+
+# User fields embedded in access tokens; changing one revokes the user's tokens
+_CLAIM_FIELDS = ("email", "is_active", "subscription_tier")
+
+# --- Store backends ---
+
+class InMemoryRevocationStore:
+    """Per-process store (revocations are only seen by the worker that made them)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: dict[int, tuple[float, int]] = {} # user id -> (expires at, min version)
+        self._denied: dict[str, float] = {} # jti -> expires at
+        self._writes = 0
+
+    async def check(self, user_id: int, jti: Optional[str]) -> Optional[tuple[int, bool]]:
+        """(minimum valid token version, whether `jti` is denied), or None if unavailable."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._versions.get(user_id)
+            min_version = entry[1] if entry is not None and entry[0] > now else 0
+            denied = jti is not None and self._denied.get(jti, 0.0) > now
+        return min_version, denied
+
+    def set_min_version(self, user_id: int, version: int, ttl_seconds: int) -> None:
+        with self._lock:
+            self._versions[user_id] = (time.monotonic() + ttl_seconds, version)
+            self._wrote()
+
+    def deny(self, jti: str, ttl_seconds: int) -> None:
+        with self._lock:
+            self._denied[jti] = time.monotonic() + ttl_seconds
+            self._wrote()
+
+    def _wrote(self):
+        # Drop expired entries every so often (caller holds the lock)
+        self._writes += 1
+        if self._writes % 1000:
+            return
+        now = time.monotonic()
+        self._versions = {key: entry for key, entry in self._versions.items() if entry[0] > now}
+        self._denied = {key: expires_at for key, expires_at in self._denied.items() if expires_at > now}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._versions.clear()
+            self._denied.clear()
+
+
+class RedisRevocationStore:
+    """Store shared by every API worker, with a TTL on every key.
+
+    check() runs on every authenticated request, so it uses the asyncio client;
+    writes (logouts, version bumps) are rare and may come from sync code such as
+    the after_commit hook below. Redis failures make check() return None, so
+    callers fall back to Postgres, and Redis is then skipped for a while.
+    """
+
+    version_prefix = "token_version:"
+    denied_prefix = "token_denied:"
+
+    def __init__(self, url: str):
+        import redis # Only needed when this backend is selected
+        from redis import asyncio as aioredis
+
+        self._redis_errors = (redis.RedisError,)
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._async_client = aioredis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._retry_at = 0.0
+
+    def _skipped(self) -> bool:
+        # Skip Redis for a while after a failure, so an outage doesn't add a timeout to every request
+        return bool(self._retry_at) and time.monotonic() < self._retry_at
+
+    def _failed(self):
+        logger.warning("Token revocation store unavailable; checking token versions in Postgres", exc_info=True)
+        self._retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+
+    async def check(self, user_id: int, jti: Optional[str]) -> Optional[tuple[int, bool]]:
+        if self._skipped():
+            return None
+        keys = [f"{self.version_prefix}{user_id}"]
+        if jti is not None:
+            keys.append(f"{self.denied_prefix}{jti}")
+        try:
+            values = await self._async_client.mget(keys)
+        except self._redis_errors:
+            self._failed()
+            return None
+        self._retry_at = 0.0
+        min_version = int(values[0]) if values[0] is not None else 0
+        return min_version, len(values) > 1 and values[1] is not None
+
+    def set_min_version(self, user_id: int, version: int, ttl_seconds: int) -> None:
+        try:
+            self._client.setex(f"{self.version_prefix}{user_id}", ttl_seconds, version)
+        except self._redis_errors:
+            self._failed()
+
+    def deny(self, jti: str, ttl_seconds: int) -> None:
+        try:
+            self._client.setex(f"{self.denied_prefix}{jti}", max(ttl_seconds, 1), 1)
+        except self._redis_errors:
+            self._failed()
+
+    def clear(self) -> None:
+        try:
+            for prefix in (self.version_prefix, self.denied_prefix):
+                keys = list(self._client.scan_iter(match=f"{prefix}*"))
+                if keys:
+                    self._client.delete(*keys)
+        except self._redis_errors:
+            pass
+
+
+def _build_store():
+    if settings.TOKEN_REVOCATION_BACKEND == "redis":
+        return RedisRevocationStore(settings.REDIS_URL)
+    return InMemoryRevocationStore()
+
+# Single shared instance, like `settings`
+revocation_store = _build_store()
+
+def publish_token_version(user_id: int, version: int) -> None:
+    """Reject the user's access tokens older than `version` (call after committing the bump)."""
+    # Older access tokens have all expired once an access token lifetime has passed
+    revocation_store.set_min_version(user_id, version, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+# --- Single tokens ---
+
+def remaining_seconds(claims: dict) -> int:
+    return max(int(claims["exp"] - time.time()), 0) + 1
+
+def _expires_at(claims: dict) -> datetime:
+    return datetime.fromtimestamp(claims["exp"], timezone.utc)
+
+async def _record(db: AsyncSession, claims: dict) -> bool:
+    """Insert the token into revoked_tokens; False if it was there already."""
+    user_id = int(claims["sub"])
+    # The user's expired rows go first, so the table only holds tokens that could still be presented
+    await db.execute(
+        delete(RevokedToken)
+        .where(RevokedToken.user_id == user_id)
+        .where(RevokedToken.expires_at <= datetime.now(timezone.utc))
+    )
+    result = await db.execute(
+        pg_insert(RevokedToken)
+        .values(jti=claims["jti"], user_id=user_id, expires_at=_expires_at(claims))
+        .on_conflict_do_nothing()
+        .returning(RevokedToken.jti)
+    )
+    return result.first() is not None
+
+async def consume_refresh_token(db: AsyncSession, claims: dict) -> bool:
+    """Mark a refresh token as used and commit. False if it had been used (or
+    revoked) before: concurrent uses of one token wait on each other's insert,
+    so exactly one of them gets True."""
+    consumed = await _record(db, claims)
+    await db.commit()
+    return consumed
+
+async def revoke_token(db: AsyncSession, claims: dict) -> None:
+    """Revoke a single token (logout): recorded in Postgres, then denied in the store."""
+    await _record(db, claims)
+    await db.commit()
+    revocation_store.deny(claims["jti"], remaining_seconds(claims))
+
+async def restore_denylist(db: AsyncSession) -> None:
+    """Load the unexpired revoked tokens into the per-process store, whose
+    denylist would otherwise be empty after every restart (call at startup)."""
+    if not isinstance(revocation_store, InMemoryRevocationStore):
+        return
+    now = datetime.now(timezone.utc)
+    try:
+        result = await db.execute(select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > now))
+    except SQLAlchemyError:
+        logger.warning("Could not load revoked tokens; logged-out tokens stay valid until they expire", exc_info=True)
+        return
+    for jti, expires_at in result:
+        revocation_store.deny(jti, int((expires_at - now).total_seconds()) + 1)
+
+# --- Automatic revocation ---
+# Changing a claim field bumps the version in the same flush; the new minimum is
+# published after commit (as with principal cache invalidation).
+
+_PENDING_KEY = "token_version_bumps"
+
+@event.listens_for(Session, "before_flush")
+def _bump_token_versions(session, flush_context, instances):
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for obj in session.dirty:
+        if isinstance(obj, User) and obj.id in pending:
+            continue
+        if isinstance(obj, User) and any(
+            inspect(obj).attrs[name].history.has_changes() for name in _CLAIM_FIELDS
+        ):
+            obj.token_version = (obj.token_version or 0) + 1
+            pending[obj.id] = obj.token_version
+
+@event.listens_for(Session, "after_commit")
+def _publish_token_versions(session):
+    for user_id, version in session.info.pop(_PENDING_KEY, {}).items():
+        publish_token_version(user_id, version)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_token_versions(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,112 @@
+from collections import defaultdict
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import analytics, http_cache, security
+from ..database import get_db
+from ..dependencies import get_read_db, get_readable_project
+from ..models.analytics import AnalyticsCodeCount, AnalyticsCodePair, ProjectAnalytics
+from ..models.code import Code
+from ..models.data_source import DataSource
+from ..models.project import Project
+from ..schemas import analytics as analytics_schemas
+
+router = APIRouter(
+    prefix="/projects/{project_id}/analytics",
+    tags=["Analytics"],
+    dependencies=[Depends(security.get_current_active_user)],
+)
+
+async def _version(db: AsyncSession, project_id: int):
+    result = await db.execute(
+        select(ProjectAnalytics.version, ProjectAnalytics.built_at).where(ProjectAnalytics.project_id == project_id)
+    )
+    return result.first()
+
+@router.get("/", response_model=analytics_schemas.ProjectAnalytics, responses={304: {"description": "Not modified"}})
+async def read_analytics(
+    request: Request,
+    response: Response,
+    project: Project = Depends(get_readable_project),
+    primary_db: AsyncSession = Depends(get_db), # Connects only if the replica has no build (below)
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Code frequencies, co-occurrence and per-interview breakdowns for the project.
+    Send the returned ETag back in If-None-Match to get a 304 when nothing changed.
+    """
+    # The version and the aggregates are read from the same database, so the
+    # ETag always describes the data sent with it
+    row = await _version(db, project.id)
+    if row is None:
+        db = primary_db # Replicas are read-only, and may not have a build made elsewhere yet
+        row = await _version(db, project.id)
+    if row is None:
+        await analytics.build(db, project.id) # First request for this project
+        row = await _version(db, project.id)
+    version = row.version
+
+    # built_at keeps tags unique if the aggregates are ever rebuilt (and the version restarts)
+    etag = http_cache.weak_etag(f"analytics-{project.id}", int(row.built_at.timestamp()), version)
+    if (not_modified := http_cache.not_modified(request, etag)) is not None:
+        return not_modified
+    http_cache.set_headers(response, etag)
+
+    codes = (await db.execute(select(Code.id, Code.name).where(Code.project_id == project.id).order_by(Code.id))).all()
+    frequencies = {
+        row.code_id: row
+        for row in await db.execute(
+            select(
+                AnalyticsCodeCount.code_id,
+                func.sum(AnalyticsCodeCount.segments).label("segments"),
+                func.count().label("interviews"),
+            )
+            .where(AnalyticsCodeCount.project_id == project.id)
+            .group_by(AnalyticsCodeCount.code_id)
+        )
+    }
+    segments_by_code = {code_id: int(row.segments) for code_id, row in frequencies.items()}
+
+    pairs = await db.execute(
+        select(AnalyticsCodePair.code_a_id, AnalyticsCodePair.code_b_id, AnalyticsCodePair.segments)
+        .where(AnalyticsCodePair.project_id == project.id)
+        .order_by(AnalyticsCodePair.segments.desc(), AnalyticsCodePair.code_a_id, AnalyticsCodePair.code_b_id)
+    )
+    cooccurrence = []
+    for a, b, n in pairs:
+        either = segments_by_code.get(a, 0) + segments_by_code.get(b, 0) - n
+        cooccurrence.append(analytics_schemas.CodeCooccurrence(
+            code_a_id=a, code_b_id=b, segments=n, jaccard=round(n / either, 4) if either else 0.0,
+        ))
+
+    interviews: dict[int, dict[int, int]] = defaultdict(dict)
+    counts = await db.execute(
+        select(AnalyticsCodeCount.data_source_id, AnalyticsCodeCount.code_id, AnalyticsCodeCount.segments)
+        .where(AnalyticsCodeCount.project_id == project.id)
+    )
+    for source_id, code_id, n in counts:
+        interviews[source_id][code_id] = n
+    names = dict((await db.execute(
+        select(DataSource.id, DataSource.name).where(DataSource.id.in_(list(interviews)))
+    )).all()) if interviews else {}
+
+    return analytics_schemas.ProjectAnalytics(
+        project_id=project.id,
+        version=version,
+        codes=[
+            analytics_schemas.CodeFrequency(
+                code_id=code.id,
+                name=code.name,
+                segments=segments_by_code.get(code.id, 0),
+                interviews=frequencies[code.id].interviews if code.id in frequencies else 0,
+            )
+            for code in codes
+        ],
+        cooccurrence=cooccurrence,
+        interviews=[
+            analytics_schemas.InterviewBreakdown(data_source_id=source_id, name=names.get(source_id, ""), codes=interviews[source_id])
+            for source_id in sorted(interviews)
+        ],
+    )
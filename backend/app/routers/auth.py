@@ -1,10 +1,15 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # from .. import database, models, schemas, security # Use relative imports
 # from .. import database, models, security # Adjusted import
 from .. import database, security # Further adjusted import
+from ..hashing import password_hasher
+from ..revocation import consume_refresh_token, publish_token_version, revoke_token
 from ..models import user as user_model # Import the user model specifically
 from ..schemas import user as user_schemas
 from ..schemas import token as token_schemas
@@ -14,32 +19,37 @@ router = APIRouter(
 )
 
 @router.post("/register", response_model=user_schemas.User, status_code=status.HTTP_201_CREATED)
-def register_user(user: user_schemas.UserCreate, db: Session = Depends(database.get_db)):
+async def register_user(user: user_schemas.UserCreate, db: AsyncSession = Depends(database.get_db)):
     # Check if user already exists
-    db_user = db.query(user_model.User).filter(user_model.User.email == user.email).first() # Use imported model
+    result = await db.execute(select(user_model.User).where(user_model.User.email == user.email)) # Use imported model
+    db_user = result.scalar_one_or_none()
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Hash the password
-    hashed_password = security.get_password_hash(user.password)
+    # Hash the password (in the hashing process pool, off the event loop)
+    hashed_password = await password_hasher.hash(user.password)
     
     # Create new user instance
     db_user = user_model.User(email=user.email, hashed_password=hashed_password) # Use imported model
     
     # Add user to database
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 @router.post("/login", response_model=token_schemas.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = db.query(user_model.User).filter(user_model.User.email == form_data.username).first() # Use imported model
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(database.get_db)):
+    result = await db.execute(select(user_model.User).where(user_model.User.email == form_data.username)) # Use imported model
+    user = result.scalar_one_or_none()
+    password_ok, new_hash = (False, None)
+    if user:
+        password_ok, new_hash = await password_hasher.verify_and_update(form_data.password, user.hashed_password)
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -51,8 +61,69 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
             detail="Inactive user"
         )
 
-    # Create access token (store user ID in 'sub' claim)
-    access_token = security.create_access_token(
-        data={"sub": str(user.id)} 
+    # Transparently upgrade hashes made with an older cost factor
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
+    # Access token (user ID in 'sub', plus the claims get_current_user needs) and a refresh token
+    return security.create_tokens(user)
+
+@router.post("/refresh", response_model=token_schemas.Token)
+async def refresh_tokens(body: token_schemas.RefreshRequest, db: AsyncSession = Depends(database.get_db)):
+    """Exchanges a refresh token for a new access/refresh token pair.
+
+    Refresh tokens are single use. Presenting one that was already used revokes
+    all of the user's tokens, since either the client or an attacker holds a copy.
+    Use is recorded in Postgres, so this holds across workers and restarts.
+    """
+    try:
+        claims = security.decode_token(body.refresh_token, token_type="refresh")
+    except security.InvalidToken:
+        raise security.credentials_exception()
+    user = await db.get(user_model.User, int(claims["sub"]))
+    if user is None or not user.is_active or claims.get("ver") != user.token_version:
+        raise security.credentials_exception()
+    if not await consume_refresh_token(db, claims):
+        await revoke_all_tokens(db, user)
+        raise security.credentials_exception()
+    return security.create_tokens(user)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: Optional[token_schemas.LogoutRequest] = None,
+    claims: dict = Depends(security.get_token_claims),
+    db: AsyncSession = Depends(database.get_db),
+):
+    """Revokes the presented access token (and the refresh token, if given)."""
+    if "jti" in claims:
+        await revoke_token(db, claims)
+    if body is not None and body.refresh_token:
+        try:
+            refresh_claims = security.decode_token(body.refresh_token, token_type="refresh")
+        except security.InvalidToken:
+            return
+        if refresh_claims["sub"] == claims["sub"]:
+            await revoke_token(db, refresh_claims)
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_everywhere(
+    claims: dict = Depends(security.get_token_claims),
+    db: AsyncSession = Depends(database.get_db),
+):
+    """Revokes every access and refresh token of the current user."""
+    user = await db.get(user_model.User, int(claims["sub"]))
+    if user is None:
+        raise security.credentials_exception()
+    await revoke_all_tokens(db, user)
+
+async def revoke_all_tokens(db: AsyncSession, user: user_model.User):
+    result = await db.execute(
+        update(user_model.User)
+        .where(user_model.User.id == user.id)
+        .values(token_version=user_model.User.token_version + 1)
+        .returning(user_model.User.token_version)
     )
-    return {"access_token": access_token, "token_type": "bearer"} 
\ No newline at end of file
+    version = result.scalar_one()
+    await db.commit()
+    publish_token_version(user.id, version) 
\ No newline at end of file
@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from .. import analytics, security
+from ..database import get_db
+from ..dependencies import get_owned_project, get_read_db, get_readable_project
+from ..models.code import Code
+from ..models.project import Project
+from ..schemas import code as code_schemas
+
+router = APIRouter(
+    prefix="/projects/{project_id}/codes",
+    tags=["Codebook"],
+    dependencies=[Depends(security.get_current_active_user)],
+)
+
+@router.get("/", response_model=List[code_schemas.Code])
+async def read_codes(project: Project = Depends(get_readable_project), db: AsyncSession = Depends(get_read_db)):
+    """Lists the project's codebook."""
+    result = await db.execute(select(Code).where(Code.project_id == project.id).order_by(Code.id))
+    return result.scalars().all()
+
+@router.post("/", response_model=code_schemas.Code, status_code=status.HTTP_201_CREATED)
+async def create_code(
+    code: code_schemas.CodeCreate,
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_db),
+):
+    """Adds a code to the project's codebook."""
+    db_code = Code(**code.model_dump(), project_id=project.id)
+    db.add(db_code)
+    await analytics.bump_version(db, project.id) # The code shows up (with zero counts) in analytics
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Code already exists")
+    await db.refresh(db_code)
+    return db_code
+
+@router.patch("/{code_id}", response_model=code_schemas.Code)
+async def update_code(
+    code_id: int,
+    changes: code_schemas.CodeUpdate,
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Updates the fields sent for a code. Keyword and pattern changes take effect
+    from the next coding run; codes already applied by rules are kept until then.
+    """
+    db_code = await db.get(Code, code_id)
+    if db_code is None or db_code.project_id != project.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Code not found")
+    values = changes.model_dump(exclude_unset=True)
+    for field, value in values.items():
+        setattr(db_code, field, value)
+    if "name" in values:
+        await analytics.bump_version(db, project.id) # Analytics responses show code names
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Code already exists")
+    await db.refresh(db_code)
+    return db_code
+
+@router.delete("/{code_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_code(code_id: int, project: Project = Depends(get_owned_project), db: AsyncSession = Depends(get_db)):
+    """Removes a code (and every application of it) from the codebook."""
+    db_code = await db.get(Code, code_id)
+    if db_code is None or db_code.project_id != project.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Code not found")
+    await db.delete(db_code)
+    await analytics.bump_version(db, project.id) # Its aggregate rows go with it (ON DELETE CASCADE)
+    await db.commit()
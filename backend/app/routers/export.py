@@ -0,0 +1,84 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import export, security
+from ..config import settings
+from ..database import read_session
+from ..dependencies import get_read_db, get_readable_project, reads_from_primary
+from ..models.code import Code, SegmentCode
+from ..models.data_source import DataSource
+from ..models.project import Project
+from ..models.segment import Segment
+
+router = APIRouter(
+    prefix="/projects/{project_id}",
+    tags=["Export"],
+    dependencies=[Depends(security.get_current_active_user)],
+)
+
+def _export_query(project_id: int):
+    # Uncoded segments get one row with empty code columns
+    return (
+        select(
+            DataSource.name, Segment.data_source_id, Segment.id, Segment.position, Segment.text,
+            Code.name, SegmentCode.code_id, SegmentCode.source, SegmentCode.confidence,
+        )
+        .join(DataSource, DataSource.id == Segment.data_source_id)
+        .outerjoin(SegmentCode, SegmentCode.segment_id == Segment.id)
+        .outerjoin(Code, Code.id == SegmentCode.code_id)
+        .where(Segment.project_id == project_id)
+        .order_by(Segment.data_source_id, Segment.position, SegmentCode.code_id)
+    )
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_project(
+    format: Literal["csv", "xlsx", "parquet"] = "csv",
+    gzip: bool = Query(False, description="Compress the file (.gz); mostly worth it for CSV"),
+    project: Project = Depends(get_readable_project),
+    db: AsyncSession = Depends(get_read_db),
+    primary: bool = Depends(reads_from_primary),
+):
+    """
+    Downloads the project's coded segments: one row per applied code (uncoded
+    segments get a row with empty code columns), in transcript order.
+
+    Rows are read through a server-side cursor EXPORT_CHUNK_ROWS at a time and
+    written out as they arrive, so exports of any size use constant memory.
+    Parquet files get one row group per chunk.
+    """
+    if format == "parquet" and not export.parquet_available():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Parquet export needs pyarrow installed")
+    project_id = project.id
+    await db.close() # The export reads through its own connection for as long as the download takes
+
+    async def chunks():
+        writer = await run_in_threadpool(export.make_writer, format)
+        compressor = export.Gzip() if gzip else None
+
+        def encode(data: bytes) -> bytes:
+            return compressor.compress(data) if compressor is not None else data
+
+        yield encode(writer.start()) # Before the query runs, so the download starts right away
+        async with read_session(primary) as session: # A replica when there is one
+            result = await session.stream(
+                _export_query(project_id).execution_options(yield_per=settings.EXPORT_CHUNK_ROWS)
+            )
+            async for rows in result.partitions():
+                data = encode(await run_in_threadpool(writer.write, rows))
+                if data:
+                    yield data
+        async for data in iterate_in_threadpool(writer.close()):
+            yield encode(data)
+        if compressor is not None:
+            yield compressor.flush()
+
+    return StreamingResponse(
+        chunks(),
+        media_type="application/gzip" if gzip else export.media_type(format),
+        headers={"Content-Disposition": f'attachment; filename="{export.filename(project_id, format, gzip)}"'},
+    )
@@ -0,0 +1,159 @@
+import asyncio
+import re
+from typing import Optional
+
+import redis
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import limits, security, task_queue
+from ..config import settings
+from ..job_events import is_terminal, job_event_hub, stream_id
+from ..database import get_db
+from ..dependencies import get_owned_project
+from ..models.job import Job
+from ..models.project import Project
+from ..principal_cache import Principal
+from ..schemas import job as job_schemas
+
+router = APIRouter(
+    prefix="/projects/{project_id}",
+    tags=["Jobs"],
+    dependencies=[Depends(security.get_current_active_user)],
+)
+
+@router.post("/coding-runs", response_model=job_schemas.Job, status_code=status.HTTP_202_ACCEPTED)
+async def start_coding_run(
+    run: job_schemas.CodingRunCreate,
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(security.get_current_active_user),
+):
+    """
+    Queues an LLM coding run for the project. Poll the returned job for progress.
+    Codes whose keywords or patterns match are applied first, without the LLM.
+    Answers 429 while the owner's LLM token quota is used up; a run that uses it
+    up midway fails with the segments coded so far kept.
+    """
+    try:
+        limits.LLMTokenQuota(current_user.id, current_user.subscription_tier).check()
+    except limits.QuotaExceeded as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc), headers={"Retry-After": str(exc.retry_after_seconds)},
+        )
+    job = Job(project_id=project.id, kind="coding", status="queued", total=0, done=0)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    # Enqueued by name so the API doesn't import the worker-side task code
+    # (publishing to the broker is blocking I/O, so keep it off the event loop)
+    await run_in_threadpool(
+        task_queue.send_task,
+        "app.tasks.coding.code_project",
+        args=[job.id, run.segment_ids, run.prefilter, run.rules, run.skip_rule_coded],
+    )
+    return job
+
+@router.post("/precoding-runs", response_model=job_schemas.Job, status_code=status.HTTP_202_ACCEPTED)
+async def start_precoding_run(
+    run: job_schemas.PrecodingRunCreate,
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Queues a pre-coding run with the local model: candidate codes are stored with
+    source "model" and a confidence, for review or to prefilter an LLM coding run.
+    """
+    job = Job(project_id=project.id, kind="precoding", status="queued", total=0, done=0)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    await run_in_threadpool(task_queue.send_task, "app.tasks.inference.precode_project", args=[job.id, run.segment_ids])
+    return job
+
+@router.get("/jobs/{job_id}", response_model=job_schemas.Job)
+async def read_job(job_id: int, project: Project = Depends(get_owned_project), db: AsyncSession = Depends(get_db)):
+    """Returns the status and progress of a background job."""
+    job = await db.get(Job, job_id)
+    if job is None or job.project_id != project.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+_EVENT_ID = re.compile(r"\d+-\d+")
+
+def _sse(data: str, event_id: Optional[str] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += ["event: job", f"data: {data}"]
+    return "\n".join(lines) + "\n\n"
+
+@router.get("/jobs/{job_id}/events", response_class=StreamingResponse)
+async def stream_job_events(
+    job_id: int,
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_db),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Streams the job's progress as Server-Sent Events instead of polling.
+
+    Each `job` event carries the job's full state (as returned by GET
+    /jobs/{job_id}); the stream ends after the job succeeds or fails. Updates
+    are coalesced: a client gets at most one every JOB_EVENTS_MIN_INTERVAL_SECONDS,
+    and one that falls behind receives only the newest state. Reconnecting with the
+    `Last-Event-ID` header replays the events it missed.
+    """
+    job = await db.get(Job, job_id)
+    if job is None or job.project_id != project.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    snapshot = job_schemas.Job.model_validate(job).model_dump_json()
+    await db.close() # Return the connection to the pool; the stream may stay open for minutes
+    if last_event_id is not None and not _EVENT_ID.fullmatch(last_event_id):
+        last_event_id = None
+
+    async def events():
+        yield "retry: 3000\n\n" # Reconnect delay for EventSource clients
+        try:
+            subscription = await job_event_hub.subscribe(job_id) # Before replaying, so nothing falls in between
+        except redis.RedisError:
+            yield _sse(snapshot) # Events unavailable: report the current state and let the client retry
+            return
+        try:
+            last_id = last_event_id
+            try:
+                replayed = await job_event_hub.replay(job_id, last_id)
+            except redis.RedisError:
+                replayed = []
+            if not replayed:
+                # Nothing newer in the stream (or it expired): start from the row
+                replayed = [(None, snapshot)]
+            for event_id, data in replayed:
+                yield _sse(data, event_id)
+                last_id = event_id or last_id
+                if is_terminal(data):
+                    return
+            while True:
+                # Rate-limit each client; updates arriving meanwhile collapse into the latest
+                await asyncio.sleep(settings.JOB_EVENTS_MIN_INTERVAL_SECONDS)
+                event = await subscription.next(settings.JOB_EVENTS_KEEPALIVE_SECONDS)
+                if subscription.closed:
+                    return
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event_id, data = event
+                if last_id is not None and stream_id(event_id) <= stream_id(last_id):
+                    continue # Already replayed
+                yield _sse(data, event_id)
+                last_id = event_id
+                if is_terminal(data):
+                    return
+        finally:
+            await job_event_hub.unsubscribe(job_id, subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # No proxy buffering
+    )
@@ -0,0 +1,121 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func, literal_column, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional
+
+from .. import kwic, security
+from ..dependencies import get_read_db, get_readable_project
+from ..models.data_source import DataSource
+from ..models.project import Project
+from ..models.segment import Segment
+from ..pagination import decode_cursor, encode_cursor
+from ..schemas import kwic as kwic_schemas
+
+SUBSTRING_MIN_LENGTH = 3 # Shorter substrings can't use the trigram index
+
+router = APIRouter(
+    prefix="/projects/{project_id}",
+    tags=["Search"],
+    dependencies=[Depends(security.get_current_active_user)],
+)
+
+# Generated column and text search configuration of migration e1c7d5a3b942
+_text_search = literal_column("segments.text_search")
+_simple = literal_column("'simple'::regconfig")
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _escape_html(text):
+    # Before ts_headline, whose <mark> tags must be the only markup in the snippet
+    return func.replace(func.replace(func.replace(text, "&", "&amp;"), "<", "&lt;"), ">", "&gt;")
+
+@router.get("/kwic", response_model=kwic_schemas.KwicResults)
+async def kwic_search(
+    response: Response,
+    term: str = Query(..., min_length=1, max_length=200),
+    window: int = Query(5, ge=1, le=50, description="Words of context on either side of a match"),
+    match: Literal["phrase", "substring"] = Query("phrase", description='Whole words ("phrase") or any part of a word'),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    project: Project = Depends(get_readable_project),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Keyword in context: the project's segments containing `term`, in transcript
+    order, each with snippets of `window` words around the matches.
+
+    "phrase" matches the term's words in sequence (case-insensitive, no stemming)
+    through the segments' tsvector index; "substring" matches any part of a
+    word through the trigram index and needs at least 3 characters. SQLite
+    (local runs) only does substring matching.
+
+    Pages are keyset-paginated: when there are more results the `X-Next-Cursor`
+    header holds an opaque cursor to pass back as `cursor`. `total` is cached
+    per project until its segments change.
+    """
+    term = " ".join(term.split())
+    if db.bind.dialect.name != "postgresql":
+        match = "substring"
+    if len(term) < (SUBSTRING_MIN_LENGTH if match == "substring" else 1):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Substring searches need at least {SUBSTRING_MIN_LENGTH} characters",
+        )
+
+    if match == "phrase":
+        query = func.phraseto_tsquery(_simple, term)
+        condition = _text_search.op("@@")(query)
+        snippet = func.ts_headline(_simple, _escape_html(Segment.text), query, kwic.headline_options(term, window))
+    else:
+        condition = Segment.text.ilike(f"%{_escape_like(term)}%", escape="\\")
+        snippet = Segment.text # Highlighted below
+    matching = select(Segment.id, Segment.data_source_id, Segment.position).where(Segment.project_id == project.id).where(condition)
+    # Read before any query, so a count computed from segments that change
+    # meanwhile is stored under the generation that change retires
+    key = kwic.term_key(match, term)
+    cached = await kwic.hit_counts.get(project.id, key)
+
+    page_query = matching.order_by(Segment.data_source_id, Segment.position, Segment.id)
+    if cursor:
+        source_id, position, segment_id = decode_cursor(cursor, int, int, int)
+        page_query = page_query.where(tuple_(Segment.data_source_id, Segment.position, Segment.id) > (source_id, position, segment_id))
+    # Snippets are only built for the page (a LIMIT subquery isn't flattened into the outer query)
+    page = page_query.limit(limit + 1).subquery()
+    result = await db.execute(
+        select(page.c.id, page.c.data_source_id, page.c.position, DataSource.name, snippet.label("snippet"))
+        .join(Segment, Segment.id == page.c.id)
+        .join(DataSource, DataSource.id == page.c.data_source_id)
+        .order_by(page.c.data_source_id, page.c.position, page.c.id)
+    )
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more:
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.data_source_id, last.position, last.id)
+
+    total = cached[1] if cached is not None else None
+    if total is None:
+        if not cursor and not has_more:
+            total = len(rows) # A complete first page is the count
+        else:
+            total = (await db.execute(select(func.count()).select_from(matching.subquery()))).scalar_one()
+        if cached is not None:
+            await kwic.hit_counts.put(project.id, cached[0], key, total)
+
+    return kwic_schemas.KwicResults(
+        term=term,
+        match=match,
+        total=total,
+        results=[
+            kwic_schemas.KwicHit(
+                segment_id=row.id,
+                data_source_id=row.data_source_id,
+                data_source_name=row.name,
+                position=row.position,
+                snippet=row.snippet if match == "phrase" else kwic.highlight_substring(row.snippet, term, window),
+            )
+            for row in rows
+        ],
+    )
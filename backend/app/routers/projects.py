@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+import json
+import shutil
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Boolean, Integer, String, Text, case, column, delete, func, insert, select, tuple_, update, values
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 # Use relative imports for models, schemas, security, and dependencies
-from .. import models, security
+from .. import http_cache, models, security
 from ..schemas import project as project_schemas # Alias to avoid naming conflict
+from ..config import settings
 from ..database import get_db
+from ..dependencies import get_owned_project, get_read_db
+from ..inference import index_path
+from ..pagination import decode_cursor, encode_cursor, estimate_count
+
+# The authenticated principal (a cached snapshot of the User row) for type hinting
+from ..principal_cache import Principal
 
-# Import the specific User model for type hinting
-from ..models.user import User as UserModel
+PAGE_MAX = 1000 # Largest `limit` of GET /projects/
 
 router = APIRouter(
     prefix="/projects",
@@ -20,8 +34,8 @@ router = APIRouter(
 @router.post("/", response_model=project_schemas.Project, status_code=status.HTTP_201_CREATED)
 async def create_project(
     project: project_schemas.ProjectCreate,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(security.get_current_active_user) # Get current user
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(security.get_current_active_user) # Get current user
 ):
     """
     Creates a new project for the currently authenticated user.
@@ -32,30 +46,251 @@ async def create_project(
         owner_id=current_user.id # Set the owner to the current user
     )
     db.add(db_project)
-    db.commit()
-    db.refresh(db_project) # Refresh to get the generated ID and defaults
+    await db.commit()
+    await db.refresh(db_project) # Refresh to get the generated ID and defaults
     return db_project
 
-@router.get("/", response_model=List[project_schemas.Project])
+@router.get("/", response_model=List[project_schemas.Project], responses={304: {"description": "Not modified"}})
 async def read_projects(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(security.get_current_active_user)
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=PAGE_MAX),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(security.get_current_active_user)
 ):
     """
     Retrieves a list of projects owned by the currently authenticated user.
+
+    Projects are ordered by (created_at, id). When there are more results the
+    `X-Next-Cursor` header holds an opaque cursor; pass it back as `cursor` to
+    fetch the next page (keyset pagination, served by the owner index).
+    `skip` offset paging still works for existing clients. With
+    `include_total=true` an estimated total is returned in `X-Total-Count`.
+
+    Send the returned ETag back in If-None-Match to get a 304 when none of the
+    user's projects changed.
     """
-    projects = (
-        db.query(models.project.Project)
-        .filter(models.project.Project.owner_id == current_user.id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    Project = models.project.Project
+    etag = await http_cache.collection_etag(db, f"projects-{current_user.id}", Project, Project.owner_id == current_user.id)
+    if (not_modified := http_cache.not_modified(request, etag)) is not None:
+        return not_modified
+    http_cache.set_headers(response, etag)
+
+    owned = select(Project).where(Project.owner_id == current_user.id)
+    query = owned.order_by(Project.created_at, Project.id)
+    if cursor:
+        created_at, project_id = decode_cursor(cursor, datetime, int)
+        query = query.where(tuple_(Project.created_at, Project.id) > (created_at, project_id))
+    elif skip:
+        query = query.offset(skip)
+
+    # Fetch one extra row to know whether there is a next page
+    result = await db.execute(query.limit(limit + 1))
+    projects = result.scalars().all()
+    if len(projects) > limit:
+        projects = projects[:limit]
+        last = projects[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+
+    if include_total:
+        response.headers["X-Total-Count"] = str(await estimate_count(db, owned))
     return projects
 
-# Add other project-related endpoints here later (e.g., get by ID, update, delete)
-# @router.get("/{project_id}", response_model=project_schemas.Project) ...
-# @router.put("/{project_id}", response_model=project_schemas.Project) ...
-# @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT) ... 
\ No newline at end of file
+# --- Bulk operations ---
+# Declared before /{project_id} so "bulk" isn't taken for a project id
+
+async def _read_bulk_items(request: Request) -> list:
+    """The request body as a JSON array, capped at BULK_MAX_BYTES and BULK_MAX_ITEMS."""
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > settings.BULK_MAX_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Request body exceeds {settings.BULK_MAX_BYTES} bytes",
+            )
+    try:
+        items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Request body is not valid JSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Expected a JSON array")
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_MAX_ITEMS} items per request",
+        )
+    return items
+
+def _validate_items(items: list, schema: type[BaseModel], results: dict) -> list[tuple[int, BaseModel]]:
+    """Items that pass `schema`; failures are recorded in `results` by index."""
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}" for error in e.errors())
+            results[index] = project_schemas.BulkItemResult(index=index, status="error", error=detail)
+    return valid
+
+def _bulk_result(results: dict) -> project_schemas.BulkResult:
+    items = [results[index] for index in sorted(results)]
+    failed = sum(item.status == "error" for item in items)
+    return project_schemas.BulkResult(succeeded=len(items) - failed, failed=failed, items=items)
+
+async def _write_chunk(db: AsyncSession, chunk: list, write, results: dict):
+    """Run `write` (one statement for the whole chunk) in a savepoint. If the
+    database rejects it, retry item by item so only the offending items fail."""
+    try:
+        async with db.begin_nested():
+            await write(chunk)
+    except DBAPIError as e:
+        if len(chunk) == 1:
+            index = chunk[0][0]
+            results[index] = project_schemas.BulkItemResult(index=index, status="error", error=str(e.orig).strip())
+            return
+        for item in chunk:
+            await _write_chunk(db, [item], write, results)
+
+@router.post("/bulk", response_model=project_schemas.BulkResult)
+async def create_projects_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(security.get_current_active_user),
+):
+    """
+    Creates many projects from a JSON array of `ProjectCreate` objects.
+
+    Valid items are inserted in one transaction, with one multi-row
+    `INSERT ... RETURNING` per chunk. Invalid items are reported in `items`
+    (by their position in the request) without failing the rest.
+    """
+    results: dict[int, project_schemas.BulkItemResult] = {}
+    valid = _validate_items(await _read_bulk_items(request), project_schemas.ProjectCreate, results)
+
+    async def insert_chunk(chunk):
+        rows = [{**project.model_dump(), "owner_id": current_user.id} for _, project in chunk]
+        created = await db.scalars(insert(models.project.Project).returning(models.project.Project, sort_by_parameter_order=True), rows)
+        for (index, _), db_project in zip(chunk, created.all()):
+            results[index] = project_schemas.BulkItemResult(index=index, status="created", project=db_project)
+
+    for start in range(0, len(valid), settings.BULK_CHUNK_ROWS):
+        await _write_chunk(db, valid[start:start + settings.BULK_CHUNK_ROWS], insert_chunk, results)
+    await db.commit()
+    return _bulk_result(results)
+
+@router.patch("/bulk", response_model=project_schemas.BulkResult)
+async def update_projects_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(security.get_current_active_user),
+):
+    """
+    Updates many projects from a JSON array of `{"id": ..., "name": ..., "description": ...}`
+    objects; only the fields present in an item are changed.
+
+    Each chunk is one `UPDATE ... FROM (VALUES ...) RETURNING` statement, which
+    also sets `updated_at`. Unknown ids, other users' projects and invalid items
+    are reported as per-item errors.
+    """
+    Project = models.project.Project
+    results: dict[int, project_schemas.BulkItemResult] = {}
+    valid = []
+    seen = set()
+    for index, update_item in _validate_items(await _read_bulk_items(request), project_schemas.ProjectBulkUpdate, results):
+        if update_item.id in seen:
+            results[index] = project_schemas.BulkItemResult(index=index, status="error", error="Duplicate id in request")
+            continue
+        seen.add(update_item.id)
+        valid.append((index, update_item))
+
+    async def update_chunk(chunk):
+        changes = values(
+            column("id", Integer), column("name", String), column("description", Text),
+            column("set_name", Boolean), column("set_description", Boolean),
+            name="changes",
+        ).data([
+            (item.id, item.name, item.description, "name" in item.model_fields_set, "description" in item.model_fields_set)
+            for _, item in chunk
+        ])
+        stmt = (
+            update(Project)
+            .where(Project.id == changes.c.id)
+            .where(Project.owner_id == current_user.id)
+            .values(
+                name=case((changes.c.set_name, changes.c.name), else_=Project.name),
+                description=case((changes.c.set_description, changes.c.description), else_=Project.description),
+                updated_at=func.now(),
+            )
+            .returning(Project)
+            .execution_options(synchronize_session=False)
+        )
+        updated = {db_project.id: db_project for db_project in (await db.scalars(stmt)).all()}
+        for index, item in chunk:
+            if item.id in updated:
+                results[index] = project_schemas.BulkItemResult(index=index, status="updated", project=updated[item.id])
+            else:
+                results[index] = project_schemas.BulkItemResult(index=index, status="error", error="Project not found")
+
+    for start in range(0, len(valid), settings.BULK_CHUNK_ROWS):
+        await _write_chunk(db, valid[start:start + settings.BULK_CHUNK_ROWS], update_chunk, results)
+    await db.commit()
+    return _bulk_result(results)
+
+# --- Single project ---
+
+@router.get("/{project_id}", response_model=project_schemas.Project)
+async def read_project(project: models.project.Project = Depends(get_owned_project)):
+    """Retrieves one of the current user's projects."""
+    return project
+
+@router.patch("/{project_id}", response_model=project_schemas.Project)
+async def update_project(
+    project_id: int,
+    changes: project_schemas.ProjectUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(security.get_current_active_user),
+):
+    """
+    Updates the fields sent for one of the current user's projects. The ownership
+    check, the update and `updated_at` are a single statement.
+    """
+    Project = models.project.Project
+    result = await db.execute(
+        update(Project)
+        .where(Project.id == project_id)
+        .where(Project.owner_id == current_user.id)
+        .values(**changes.model_dump(exclude_unset=True), updated_at=func.now())
+        .returning(Project)
+        .execution_options(synchronize_session=False)
+    )
+    db_project = result.scalar_one_or_none()
+    if db_project is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    await db.commit()
+    return db_project
+
+@router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_project(
+    project_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(security.get_current_active_user),
+):
+    """
+    Deletes one of the current user's projects. Its sources, segments, codes and
+    jobs go with it (ON DELETE CASCADE), as does its search index.
+    """
+    Project = models.project.Project
+    result = await db.execute(
+        delete(Project)
+        .where(Project.id == project_id)
+        .where(Project.owner_id == current_user.id)
+        .returning(Project.id)
+    )
+    if result.first() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    await db.commit()
+    await run_in_threadpool(shutil.rmtree, index_path(project_id), True)
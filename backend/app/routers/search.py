@@ -0,0 +1,108 @@
+import time
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from .. import security
+from ..config import settings
+from ..database import get_db
+from ..dependencies import get_owned_project
+from ..models.code import Code, SegmentCode
+from ..models.data_source import DataSource
+from ..models.project import Project
+from ..models.segment import Segment
+from ..schemas import search as search_schemas
+
+STALE_OVERFETCH = 2 # Ask the index for extra hits in case some segments were deleted since indexing
+
+router = APIRouter(
+    prefix="/projects/{project_id}/search",
+    tags=["Search"],
+    dependencies=[Depends(security.get_current_active_user)],
+)
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+@router.get("/", response_model=search_schemas.SearchResults)
+async def search_segments(
+    q: str = Query(..., min_length=1, max_length=2000),
+    k: int = Query(10, ge=1, le=settings.SEARCH_MAX_K),
+    code_id: Optional[List[int]] = Query(None, description="Only segments carrying any of these codes"),
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Finds the project's segments most similar in meaning to `q`.
+    """
+    # Imported on the first search: numpy, and torch once the model loads, stay
+    # out of API workers that never serve one
+    from ..inference.engine import get_engine
+    from ..inference.index import open_project_index
+
+    started = time.perf_counter()
+
+    start = time.perf_counter()
+    allowed_ids = None
+    if code_id:
+        result = await db.execute(
+            select(SegmentCode.segment_id)
+            .join(Code, Code.id == SegmentCode.code_id)
+            .where(Code.project_id == project.id)
+            .where(SegmentCode.code_id.in_(code_id))
+            .distinct()
+        )
+        allowed_ids = list(result.scalars())
+    filter_ms = _ms(start)
+    # Return the connection to the pool while embedding (which may load the model
+    # on a cold worker); fetching the hits checks one out again
+    await db.close()
+
+    # Query embedding and index scan are CPU-bound: keep them off the event loop
+    start = time.perf_counter()
+    query_vector = (await run_in_threadpool(get_engine().embed, [q]))[0]
+    embed_ms = _ms(start)
+
+    start = time.perf_counter()
+    index = await run_in_threadpool(open_project_index, project.id)
+    hits = []
+    if index is not None and allowed_ids != []:
+        hits = await run_in_threadpool(index.search, query_vector, k * STALE_OVERFETCH, allowed_ids, settings.SEARCH_IVF_NPROBE)
+    search_ms = filter_ms + _ms(start)
+
+    start = time.perf_counter()
+    results = []
+    if hits:
+        rows = await db.execute(
+            select(Segment.id, Segment.data_source_id, Segment.position, Segment.text, DataSource.name)
+            .join(DataSource, DataSource.id == Segment.data_source_id)
+            .where(Segment.project_id == project.id)
+            .where(Segment.id.in_([segment_id for segment_id, _ in hits]))
+        )
+        segments = {row.id: row for row in rows}
+        for segment_id, score in hits:
+            row = segments.get(segment_id)
+            if row is None:
+                continue # Deleted since it was indexed
+            results.append(search_schemas.SearchHit(
+                segment_id=row.id,
+                data_source_id=row.data_source_id,
+                data_source_name=row.name,
+                position=row.position,
+                text=row.text,
+                score=round(score, 4),
+            ))
+            if len(results) == k:
+                break
+    fetch_ms = _ms(start)
+
+    return search_schemas.SearchResults(
+        query=q,
+        indexed=index.meta.count if index is not None else 0,
+        index_kind=index.meta.kind if index is not None else "none",
+        results=results,
+        timings=search_schemas.SearchTimings(embed_ms=embed_ms, search_ms=search_ms, fetch_ms=fetch_ms, total_ms=_ms(started)),
+    )
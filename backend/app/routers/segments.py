@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import analytics, security
+from ..database import get_db
+from ..dependencies import get_owned_project
+from ..models.code import Code, SegmentCode
+from ..models.project import Project
+from ..models.segment import Segment
+from ..schemas import segment_code as segment_code_schemas
+
+router = APIRouter(
+    prefix="/projects/{project_id}/segments",
+    tags=["Segments"],
+    dependencies=[Depends(security.get_current_active_user)],
+)
+
+async def _check_segment(db: AsyncSession, project: Project, segment_id: int):
+    segment = await db.get(Segment, segment_id)
+    if segment is None or segment.project_id != project.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Segment not found")
+
+@router.post("/{segment_id}/codes", response_model=segment_code_schemas.SegmentCode, status_code=status.HTTP_201_CREATED)
+async def apply_code(
+    segment_id: int,
+    body: segment_code_schemas.SegmentCodeCreate,
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_db),
+):
+    """Applies a code to a segment by hand (confirming it if the LLM or local model suggested it)."""
+    await _check_segment(db, project, segment_id)
+    code = await db.get(Code, body.code_id)
+    if code is None or code.project_id != project.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Code not found")
+
+    async with analytics.track_code_changes(db, project.id, [segment_id]):
+        stmt = pg_insert(SegmentCode).values(segment_id=segment_id, code_id=code.id, source="manual")
+        result = await db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_segment_codes_segment_id_code_id",
+                set_={"source": "manual", "confidence": None},
+            ).returning(SegmentCode)
+        )
+        applied = result.scalar_one()
+    await db.commit()
+    return applied
+
+@router.delete("/{segment_id}/codes/{code_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_code(
+    segment_id: int,
+    code_id: int,
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_db),
+):
+    """Removes a code from a segment, whoever applied it."""
+    await _check_segment(db, project, segment_id)
+    async with analytics.track_code_changes(db, project.id, [segment_id]):
+        result = await db.execute(
+            delete(SegmentCode)
+            .where(SegmentCode.segment_id == segment_id)
+            .where(SegmentCode.code_id == code_id)
+            .returning(SegmentCode.id)
+        )
+        if result.first() is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Code not applied to this segment")
+    await db.commit()
@@ -0,0 +1,277 @@
+import os
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import defer
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from .. import security, task_queue
+from ..coding.resegment import resegment_source
+from ..config import settings
+from ..database import get_db
+from ..dependencies import get_owned_project, get_read_db, get_readable_project
+from ..models.data_source import DataSource
+from ..models.job import Job
+from ..models.project import Project
+from ..schemas import data_source as data_source_schemas
+from ..schemas import job as job_schemas
+from ..tasks.common import now, segments_changed
+
+ALLOWED_EXTENSIONS = {".xlsx", ".docx"}
+MULTIPART_OVERHEAD_BYTES = 64 * 1024 # Boundaries and part headers allowed on top of MAX_UPLOAD_BYTES
+
+router = APIRouter(
+    prefix="/projects/{project_id}/sources",
+    tags=["Data Sources"],
+    dependencies=[Depends(security.get_current_active_user)],
+)
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Upload exceeds {settings.MAX_UPLOAD_BYTES} bytes",
+    )
+
+class _UploadReceiver:
+    """
+    Streams the `file` field of a multipart/form-data body to UPLOAD_DIR as the
+    body arrives. Starlette's form parsing would spool the whole body to a
+    temporary file before the route runs (and before any size check), so the
+    body is parsed here instead, one received chunk at a time.
+    """
+
+    def __init__(self, boundary: bytes):
+        from python_multipart.multipart import MultipartParser
+
+        self.filename: Optional[str] = None
+        self.path: Optional[str] = None
+        self.size = 0
+        self._out = None
+        self._receiving = False # Inside the file part's data
+        self._ended = False # The closing boundary was parsed
+        self._pending: list[bytes] = [] # File data parsed from the current chunk
+        self._field = self._value = b""
+        self._headers: dict[bytes, bytes] = {}
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_end": self._on_end,
+        })
+
+    # Parser callbacks (synchronous; file data is written after each chunk)
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+    def _on_headers_finished(self):
+        from python_multipart.multipart import parse_options_header
+
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name") == b"file" and b"filename" in options and self.filename is None:
+            self.filename = os.path.basename(options[b"filename"].decode("utf-8", "replace"))
+            self._receiving = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._receiving:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self):
+        self._receiving = False
+
+    def _on_end(self):
+        self._ended = True
+
+    async def receive(self, request: Request):
+        from python_multipart.exceptions import MultipartParseError
+
+        received = 0
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+                    raise _too_large()
+                try:
+                    self._parser.write(chunk)
+                except MultipartParseError:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed multipart body")
+                if self._pending:
+                    await self._write()
+            if not self._ended:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed multipart body")
+        except BaseException:
+            self.discard()
+            raise
+        finally:
+            if self._out is not None:
+                await run_in_threadpool(self._out.close)
+        if self.filename is None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Missing `file` field")
+
+    async def _write(self):
+        data, self._pending = b"".join(self._pending), []
+        self.size += len(data)
+        if self.size > settings.MAX_UPLOAD_BYTES:
+            raise _too_large()
+        if self._out is None:
+            extension = os.path.splitext(self.filename)[1].lower()
+            if extension not in ALLOWED_EXTENSIONS:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only .xlsx and .docx files are supported")
+            os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+            self.path = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4().hex}{extension}")
+            self._out = open(self.path, "wb")
+        await run_in_threadpool(self._out.write, data)
+
+    def discard(self):
+        if self._out is not None:
+            self._out.close()
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+# The body is parsed by _UploadReceiver, so its schema is declared by hand
+_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}},
+        }}},
+    },
+}
+
+@router.post("/", response_model=job_schemas.Job, status_code=status.HTTP_202_ACCEPTED, openapi_extra=_UPLOAD_BODY)
+async def upload_source(
+    request: Request,
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Uploads transcripts (.xlsx with InterviewID/Transcript columns, or a .docx
+    interview) in the multipart field `file`, for background ingestion. Poll
+    the returned job for progress.
+
+    The file is written to disk as it is received; bodies declaring more than
+    MAX_UPLOAD_BYTES are rejected before any of it is read.
+    """
+    from python_multipart.multipart import parse_options_header
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a multipart/form-data body")
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise _too_large()
+    # Return the connection (checked out by the ownership check) to the pool:
+    # receiving the body may take minutes
+    await db.close()
+
+    upload = _UploadReceiver(options[b"boundary"])
+    await upload.receive(request)
+    if upload.path is None: # An empty file: nothing was written
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The uploaded file is empty")
+
+    job = Job(project_id=project.id, kind="ingestion", status="queued", total=0, done=0, stats={"filename": upload.filename, "bytes": upload.size})
+    db.add(job)
+    try:
+        await db.commit()
+    except BaseException:
+        upload.discard()
+        raise
+    await db.refresh(job)
+    # The worker deletes the file once it's ingested
+    try:
+        await run_in_threadpool(task_queue.send_task, "app.tasks.ingestion.ingest_source", args=[job.id, upload.path, upload.filename])
+    except Exception:
+        upload.discard()
+        job.status, job.error, job.finished_at = "failed", "Could not queue the ingestion", now()
+        await db.commit()
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Could not queue the ingestion; try again")
+    return job
+
+@router.get("/", response_model=List[data_source_schemas.DataSource])
+async def read_sources(project: Project = Depends(get_readable_project), db: AsyncSession = Depends(get_read_db)):
+    """Lists the project's data sources (without their text)."""
+    result = await db.execute(
+        select(DataSource.id, DataSource.project_id, DataSource.name, DataSource.kind, DataSource.created_at)
+        .where(DataSource.project_id == project.id)
+        .order_by(DataSource.id)
+    )
+    return result.all()
+
+@router.patch("/{source_id}", response_model=data_source_schemas.DataSourceEditResult)
+async def update_source(
+    source_id: int,
+    changes: data_source_schemas.DataSourceUpdate,
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Renames a data source and/or replaces its transcript text.
+
+    An edited transcript is re-segmented incrementally: segments whose text is
+    unchanged keep their ids and codes (only their offsets move), edited
+    segments keep their manual codes, and only new or edited segments are
+    queued for coding (`recode`), so the work is proportional to the edit.
+    """
+    result = await db.execute(
+        select(DataSource)
+        .options(defer(DataSource.content))
+        .where(DataSource.id == source_id)
+        .where(DataSource.project_id == project.id)
+        .with_for_update() # Serializes concurrent edits of the same transcript
+    )
+    source = result.scalar_one_or_none()
+    if source is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Data source not found")
+    if changes.name is not None:
+        source.name = changes.name
+
+    diff, new_ids = None, []
+    if changes.content is not None:
+        diff, new_ids = await resegment_source(db, source, changes.content)
+    job = None
+    if new_ids and changes.recode:
+        job = Job(
+            project_id=project.id,
+            kind="coding" if changes.recode == "llm" else "precoding",
+            status="queued", total=0, done=0,
+            stats={"data_source_id": source.id},
+        )
+        db.add(job)
+    await db.commit()
+
+    if diff is not None and (new_ids or diff.removed):
+        await run_in_threadpool(segments_changed, project.id)
+    if job is not None:
+        await db.refresh(job)
+        if changes.recode == "llm":
+            await run_in_threadpool(task_queue.send_task, "app.tasks.coding.code_project", args=[job.id, new_ids, False])
+        else:
+            await run_in_threadpool(task_queue.send_task, "app.tasks.inference.precode_project", args=[job.id, new_ids])
+
+    edit = data_source_schemas.DataSourceEditResult(source=data_source_schemas.DataSource.model_validate(source), job=job)
+    if diff is not None:
+        edit.segments_unchanged = diff.unchanged
+        edit.segments_moved = len(diff.moved)
+        edit.segments_replaced = len(diff.replaced)
+        edit.segments_added = len(diff.added)
+        edit.segments_removed = len(diff.removed)
+    return edit
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 
-from .. import models, security
-from ..models.user import User as UserModel
+from .. import http_cache, models, security
+from ..principal_cache import Principal
 from ..schemas import user as user_schemas # Import user schema module
 
 router = APIRouter(
@@ -9,11 +9,17 @@ router = APIRouter(
     tags=["Users"]
 )
 
-@router.get("/me", response_model=user_schemas.User)
-async def read_users_me(current_user: UserModel = Depends(security.get_current_active_user)):
-    """Fetches the details for the currently logged-in user."""
-    # Type hint for current_user is now UserModel as returned by dependency
-    # but FastAPI uses the response_model for output serialization
+@router.get("/me", response_model=user_schemas.User, responses={304: {"description": "Not modified"}})
+async def read_users_me(request: Request, response: Response, current_user: Principal = Depends(security.get_current_active_user)):
+    """Fetches the details for the currently logged-in user. Send the returned
+    ETag back in If-None-Match to get a 304 when they haven't changed."""
+    # The principal is everything the response shows, so its content is the version
+    etag = http_cache.weak_etag(f"user-{current_user.id}", http_cache.digest(current_user.to_json()))
+    if (not_modified := http_cache.not_modified(request, etag)) is not None:
+        return not_modified
+    http_cache.set_headers(response, etag)
+    # current_user is the cached Principal returned by the dependency,
+    # FastAPI uses the response_model for output serialization
     return current_user
 
 # Add other user-related endpoints here later (e.g., update profile) 
\ No newline at end of file
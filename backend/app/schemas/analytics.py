@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+
+# Segments carrying a code, across the project (output)
+class CodeFrequency(BaseModel):
+    code_id: int
+    name: str
+    segments: int
+    interviews: int # Data sources with at least one such segment
+
+# Segments carrying both codes (output)
+class CodeCooccurrence(BaseModel):
+    code_a_id: int
+    code_b_id: int
+    segments: int
+    jaccard: float # segments / segments carrying either code
+
+# Per-interview code counts (output)
+class InterviewBreakdown(BaseModel):
+    data_source_id: int
+    name: str
+    codes: dict[int, int] # code id -> segments
+
+# Project analytics summary (output)
+class ProjectAnalytics(BaseModel):
+    project_id: int
+    version: int # Changes whenever any figure does (also the ETag)
+    codes: list[CodeFrequency]
+    cooccurrence: list[CodeCooccurrence]
+    interviews: list[InterviewBreakdown]
@@ -0,0 +1,63 @@
+import re
+
+from pydantic import BaseModel, field_validator
+from typing import Optional
+from datetime import datetime
+
+from ..coding.rules import validate_pattern
+
+# Keyword rules match whole words, case-insensitively; "cost*" also matches "costs".
+# Patterns are regular expressions (see app/coding/rules.py)
+class CodeRules(BaseModel):
+    keywords: list[str] = [] # Phrases and synonyms that apply the code without the LLM
+    patterns: list[str] = []
+
+    @field_validator("keywords")
+    @classmethod
+    def keywords_not_blank(cls, value):
+        if value is None:
+            return value
+        keywords = [" ".join(keyword.split()) for keyword in value]
+        if any(not keyword.rstrip("*").strip() for keyword in keywords):
+            raise ValueError("keywords cannot be blank")
+        return keywords
+
+    @field_validator("patterns")
+    @classmethod
+    def patterns_compile(cls, value):
+        if value is None:
+            return value
+        for pattern in value:
+            try:
+                validate_pattern(pattern)
+            except re.error as exc:
+                raise ValueError(f"invalid pattern {pattern!r}: {exc}")
+        return value
+
+# Schema for adding a code to a project's codebook (input)
+class CodeCreate(CodeRules):
+    name: str
+    description: Optional[str] = None # Shown to the LLM, so worth filling in
+
+# Schema for updating a code (input); only the fields sent are changed
+class CodeUpdate(CodeRules):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    keywords: Optional[list[str]] = None
+    patterns: Optional[list[str]] = None
+
+    @field_validator("name", "keywords", "patterns")
+    @classmethod
+    def not_null(cls, value, info):
+        if value is None:
+            raise ValueError(f"{info.field_name} cannot be null")
+        return value
+
+# Schema for reading/returning codes (output)
+class Code(CodeCreate):
+    id: int
+    project_id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Literal, Optional
+
+from .job import Job
+
+# Schema for listing a project's data sources (output; the transcript text is left out)
+class DataSource(BaseModel):
+    id: int
+    project_id: int
+    name: str
+    kind: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# Schema for editing a data source (input)
+class DataSourceUpdate(BaseModel):
+    name: Optional[str] = None
+    content: Optional[str] = None # The full new transcript text
+    # How new or edited segments are coded: "llm", "model" (local pre-coding) or None to skip
+    recode: Optional[Literal["llm", "model"]] = "llm"
+
+# Schema for the result of an edit (output)
+class DataSourceEditResult(BaseModel):
+    source: DataSource
+    segments_unchanged: int = 0
+    segments_moved: int = 0 # Same text, new position or offsets
+    segments_replaced: int = 0 # Edited; manual codes were kept
+    segments_added: int = 0
+    segments_removed: int = 0
+    job: Optional[Job] = None # Coding run for the new segments
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+# Schema for starting an LLM coding run (input)
+class CodingRunCreate(BaseModel):
+    segment_ids: Optional[list[int]] = None # Only (re)code these; defaults to every segment
+    prefilter: bool = False # Only send segments the local model pre-coded (see /precoding-runs)
+    rules: bool = True # Apply the codebook's keyword/pattern rules first (codes with source "rule")
+    skip_rule_coded: bool = False # Don't send segments the rules coded to the LLM (by default they go last)
+
+# Schema for starting a local-model pre-coding run (input)
+class PrecodingRunCreate(BaseModel):
+    segment_ids: Optional[list[int]] = None # Defaults to every segment
+
+# Schema for reading/returning background job status (output)
+class Job(BaseModel):
+    id: int
+    project_id: int
+    kind: str
+    status: str
+    total: int
+    done: int
+    stats: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
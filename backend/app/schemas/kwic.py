@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+# A segment containing the searched term, with its context (output)
+class KwicHit(BaseModel):
+    segment_id: int
+    data_source_id: int
+    data_source_name: str
+    position: int
+    snippet: str # HTML-escaped fragments around the matches, which are wrapped in <mark>
+
+# Keyword-in-context search response (output)
+class KwicResults(BaseModel):
+    term: str
+    match: str # "phrase" (whole words) or "substring"
+    total: int # Segments containing the term in the whole project
+    results: list[KwicHit]
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, field_validator
+from typing import List, Literal, Optional
 from datetime import datetime
 
 # Schema for creating a project (input)
@@ -7,6 +7,21 @@ class ProjectCreate(BaseModel):
     name: str
     description: Optional[str] = None # Optional field
 
+# Schema for updating a project (input); only the fields sent are changed
+class ProjectUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+    @field_validator("name")
+    @classmethod
+    def name_not_null(cls, value):
+        if value is None:
+            raise ValueError("name cannot be null")
+        return value
+
+class ProjectBulkUpdate(ProjectUpdate):
+    id: int
+
 # Schema for reading/returning project data (output)
 class Project(ProjectCreate):
     id: int
@@ -18,4 +33,16 @@ class Project(ProjectCreate):
         # Enable ORM mode to work with SQLAlchemy models
         # For Pydantic V2, use from_attributes=True
         from_attributes = True
-        # orm_mode = True # For Pydantic V1 
\ No newline at end of file
+        # orm_mode = True # For Pydantic V1
+
+# Bulk results: one entry per submitted item, in request order
+class BulkItemResult(BaseModel):
+    index: int
+    status: Literal["created", "updated", "error"]
+    project: Optional[Project] = None
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    items: List[BulkItemResult]
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+
+# A segment matching a semantic search (output)
+class SearchHit(BaseModel):
+    segment_id: int
+    data_source_id: int
+    data_source_name: str
+    position: int
+    text: str
+    score: float # Cosine similarity to the query
+
+# Where the time of a search went, in milliseconds
+class SearchTimings(BaseModel):
+    embed_ms: float
+    search_ms: float
+    fetch_ms: float
+    total_ms: float
+
+# Semantic search response (output)
+class SearchResults(BaseModel):
+    query: str
+    indexed: int # Segments in the project's index (new ones are added in the background)
+    index_kind: str # "flat" (exact), "ivf" (approximate) or "none" (not built yet)
+    results: list[SearchHit]
+    timings: SearchTimings
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+# Schema for applying a code to a segment by hand (input)
+class SegmentCodeCreate(BaseModel):
+    code_id: int
+
+# Schema for reading/returning an applied code (output)
+class SegmentCode(BaseModel):
+    id: int
+    segment_id: int
+    code_id: int
+    source: str # "manual", "llm", "rule" (codebook keyword/pattern) or "model" (local model candidate)
+    confidence: Optional[float] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -1,8 +1,18 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None # Access token lifetime in seconds
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None # Also revoke this session's refresh token
 
 class TokenData(BaseModel):
-    user_id: int | None = None 
\ No newline at end of file
+    user_id: int | None = None
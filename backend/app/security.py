@@ -1,23 +1,35 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import secrets
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import database, schemas
 from .models import user as user_model # Import user model directly
 from .config import settings
+from .hashing import make_crypt_context
+from .limits import check_rate_limit
+from .metrics import timed
+from .principal_cache import Principal, principal_cache
+from .recent_writes import recent_writes
+from .revocation import revocation_store
 
 # OAuth2 scheme definition (points to the login endpoint)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 # Password Hashing Context (using bcrypt)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = make_crypt_context(settings.BCRYPT_ROUNDS)
 
 # --- Password Utilities ---
+# Blocking helpers for scripts; request handlers use hashing.password_hasher instead
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -30,43 +42,146 @@ def get_password_hash(password: str) -> str:
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+REFRESH_TOKEN_EXPIRE_MINUTES = settings.REFRESH_TOKEN_EXPIRE_MINUTES
+
+# Key id -> secret. Tokens without a `kid` header predate key rotation and are checked with SECRET_KEY
+SIGNING_KEYS = dict(settings.JWT_KEYS) or {"default": SECRET_KEY}
+ACTIVE_KID = settings.JWT_ACTIVE_KID or next(iter(SIGNING_KEYS))
+
+_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+class InvalidToken(Exception):
+    pass
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, token_type: str = "access") -> str:
+    from jose import jwt # Loads the cryptography backends; only needed once a token is issued
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
+    issued_at = datetime.now(timezone.utc)
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = issued_at + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        expire = issued_at + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # jti identifies the token on the revocation denylist
+    to_encode.update({"exp": expire, "iat": issued_at, "typ": token_type, "jti": secrets.token_urlsafe(8)})
+    encoded_jwt = jwt.encode(to_encode, SIGNING_KEYS[ACTIVE_KID], algorithm=ALGORITHM, headers={"kid": ACTIVE_KID})
     return encoded_jwt
 
+def create_tokens(user: user_model.User) -> dict:
+    """An access token carrying the claims get_current_user needs (so it can skip
+    Postgres), plus a refresh token for getting the next one."""
+    claims = {"sub": str(user.id), "ver": user.token_version or 0}
+    access_token = create_access_token({
+        **claims,
+        "email": user.email,
+        "act": bool(user.is_active),
+        "tier": user.subscription_tier,
+        "ctd": int(user.created_at.timestamp()) if user.created_at else None,
+    })
+    refresh_token = create_access_token(
+        claims, timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES), token_type="refresh",
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """Verify an HMAC-signed token and return its claims.
+
+    Equivalent to jwt.decode for our own tokens but several times cheaper: one
+    HMAC, two small JSON documents, and no generic claim validation.
+    """
+    try:
+        header_segment, payload_segment, signature_segment = token.split(".")
+        header = json.loads(_b64decode(header_segment))
+        if header.get("alg") != ALGORITHM or ALGORITHM not in _HMAC_DIGESTS:
+            raise InvalidToken("Unexpected algorithm")
+        kid = header.get("kid")
+        key = SIGNING_KEYS.get(kid) if kid is not None else SECRET_KEY
+        if key is None:
+            raise InvalidToken("Unknown key id")
+        expected = hmac.new(key.encode(), f"{header_segment}.{payload_segment}".encode(), _HMAC_DIGESTS[ALGORITHM]).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature_segment)):
+            raise InvalidToken("Bad signature")
+        payload = json.loads(_b64decode(payload_segment))
+    except (ValueError, binascii.Error, AttributeError) as e:
+        raise InvalidToken("Malformed token") from e
+    if not isinstance(payload.get("exp"), (int, float)) or payload["exp"] <= time.time():
+        raise InvalidToken("Expired")
+    if payload.get("typ", "access") != token_type: # Tokens from before refresh tokens have no typ
+        raise InvalidToken("Wrong token type")
+    return payload
+
 # --- Token Dependency ---
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> user_model.User:
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        # We can use TokenData schema here for validation if needed later
-        # token_data = schemas.TokenData(user_id=user_id)
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(user_model.User).filter(user_model.User.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
-    return user
-
-async def get_current_active_user(current_user: user_model.User = Depends(get_current_user)) -> user_model.User:
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    """The verified claims of the request's access token."""
+    with timed("auth"):
+        try:
+            claims = decode_token(token)
+        except InvalidToken:
+            raise credentials_exception()
+        if claims.get("sub") is None:
+            raise credentials_exception()
+        return claims
+
+async def get_current_user(claims: dict = Depends(get_token_claims), db: AsyncSession = Depends(database.get_db)) -> Principal:
+    with timed("auth"): # Shows up in Server-Timing and the http_request_span_seconds metric
+        user_id = int(claims["sub"])
+        if "ver" in claims:
+            # Fast path: the principal comes from the token itself, and revocation is
+            # checked in the revocation store. Only if that is unavailable do we read
+            # the token version from Postgres (the session doesn't check out a
+            # connection until its first query).
+            state = await revocation_store.check(user_id, claims.get("jti"))
+            if state is None:
+                user = await db.get(user_model.User, user_id)
+                if user is None:
+                    raise credentials_exception()
+                min_version, denied = user.token_version, False
+            else:
+                min_version, denied = state
+            if denied or claims["ver"] < min_version:
+                raise credentials_exception()
+            return Principal(
+                id=user_id,
+                email=claims["email"],
+                is_active=claims["act"],
+                subscription_tier=claims["tier"],
+                created_at=datetime.fromtimestamp(claims["ctd"], timezone.utc) if claims.get("ctd") is not None else None,
+            )
+
+        # Tokens minted before claims were embedded: serve the principal from cache
+        # when possible; only a miss touches Postgres
+        principal = await principal_cache.get(user_id)
+        if principal is None:
+            user = await db.get(user_model.User, user_id)
+            if user is None:
+                raise credentials_exception()
+            principal = Principal.from_user(user)
+            await principal_cache.set(principal)
+        return principal
+
+async def get_current_active_user(request: Request, current_user: Principal = Depends(get_current_user)) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    # Every authenticated route goes through here, so this is where the tier's request limit applies
+    with timed("ratelimit"):
+        await check_rate_limit(request, current_user.id, current_user.subscription_tier)
+    recent_writes.bind_user(current_user.id) # Commits made for this request count as the user's writes
     return current_user
 
 # Removed decode_access_token and get_user_id_from_token as their logic is now within get_current_user
@@ -0,0 +1,9 @@
+# Enqueueing background jobs from the API. Tasks are sent by name (the API
+# never imports the task modules), and Celery itself is only imported on the
+# first send, so it stays out of API workers' startup time and memory.
+
+def send_task(name: str, args: list) -> None:
+    """Queue a Celery task by name (blocking I/O: call it through run_in_threadpool from async code)."""
+    from .celery_app import celery_app
+
+    celery_app.send_task(name, args=args)
@@ -0,0 +1,324 @@
+import asyncio
+from typing import Optional
+
+from sqlalchemy import delete, exists, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..analytics import track_code_changes
+from ..celery_app import celery_app
+from ..coding import llm
+from ..coding.cache import CachedCoding, LLMResponseCache, cache_key, codebook_version
+from ..coding.rate_limit import RedisTokenBucket
+from ..coding.rules import CodeRules, RuleSet, compile_rules
+from ..coding.segmenter import estimate_tokens
+from ..config import settings
+from ..limits import LLMTokenQuota, QuotaExceeded
+from ..database import WorkerSessionLocal
+from ..models import Code, Job, Project, Segment, SegmentCode, User
+from .common import now, segment_new_sources, segments_changed, set_job
+
+WRITE_BATCH_SEGMENTS = 500 # Segments' codes written (and progress reported) per commit
+RULE_SCAN_SEGMENTS = 5000 # Segments scanned by the codebook rules (and their codes written) per commit
+INSERT_CHUNK_ROWS = 1000 # Rows per multi-row INSERT
+
+@celery_app.task(name="app.tasks.coding.code_project")
+def code_project(
+    job_id: int,
+    segment_ids: Optional[list[int]] = None,
+    prefilter: bool = False,
+    rules: bool = True,
+    skip_rule_coded: bool = False,
+):
+    """Segment any new transcripts of the job's project and code its segments
+    (or only `segment_ids`, or only pre-coded ones with `prefilter`): first with
+    the codebook's keyword rules, then with the LLM."""
+    asyncio.run(run_coding_job(job_id, segment_ids, prefilter, rules, skip_rule_coded))
+
+async def run_coding_job(
+    job_id: int,
+    segment_ids: Optional[list[int]] = None,
+    prefilter: bool = False,
+    rules: bool = True,
+    skip_rule_coded: bool = False,
+):
+    # Imported here: only the worker needs the OpenAI client
+    from openai import AsyncOpenAI
+    from redis import asyncio as aioredis
+
+    redis_client = aioredis.from_url(settings.REDIS_URL)
+    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+    bucket = RedisTokenBucket(
+        redis_client,
+        settings.LLM_MODEL,
+        settings.LLM_REQUESTS_PER_MINUTE,
+        settings.LLM_TOKENS_PER_MINUTE,
+    )
+    response_cache = LLMResponseCache(redis_client, settings.LLM_CACHE_REDIS_MAX_ENTRIES)
+    try:
+        async with WorkerSessionLocal() as db:
+            job = await db.get(Job, job_id)
+            if job is None:
+                return
+            await set_job(db, job_id, status="running")
+            progress: dict = {} # Segments committed so far, known even if the job fails
+            try:
+                stats = await code_segments(
+                    db, job, client, redis_client, bucket, response_cache, segment_ids, prefilter, rules, skip_rule_coded,
+                    progress,
+                )
+            except Exception as exc:
+                await db.rollback()
+                await set_job(db, job_id, status="failed", error=str(exc), finished_at=now())
+                raise
+            finally:
+                # New transcripts' segments are committed before coding starts, so they're
+                # indexed (and stale hit counts retired) whether or not the job succeeds
+                if progress.get("segments_created"):
+                    segments_changed(job.project_id)
+            await set_job(db, job_id, status="succeeded", stats=stats, finished_at=now())
+    finally:
+        await client.close()
+        await redis_client.aclose()
+
+# --- Coding ---
+
+async def load_segments(
+    db: AsyncSession,
+    project_id: int,
+    segment_ids: Optional[list[int]],
+    prefilter: bool = False,
+) -> list[llm.SegmentInput]:
+    query = (
+        select(Segment.id, Segment.text, Segment.token_count)
+        .where(Segment.project_id == project_id)
+        .order_by(Segment.data_source_id, Segment.position)
+    )
+    if segment_ids is not None:
+        query = query.where(Segment.id.in_(segment_ids))
+    if prefilter:
+        # Only segments the local model found candidate codes for (see app/tasks/inference.py)
+        query = query.where(exists().where(SegmentCode.segment_id == Segment.id).where(SegmentCode.source == "model"))
+    result = await db.execute(query)
+    return [llm.SegmentInput(id=row.id, text=row.text, token_count=row.token_count) for row in result]
+
+async def write_codes(db: AsyncSession, project_id: int, results: dict[int, list[str]], code_ids: dict[str, int]):
+    """Replace the LLM codes (and local model candidates) of the given segments in bulk
+    (one transaction, analytics included)."""
+    async with track_code_changes(db, project_id, list(results)):
+        await db.execute(
+            delete(SegmentCode)
+            .where(SegmentCode.segment_id.in_(list(results)))
+            .where(SegmentCode.source.in_(["llm", "model"]))
+        )
+        rows = [
+            {"segment_id": segment_id, "code_id": code_ids[name], "source": "llm"}
+            for segment_id, names in results.items()
+            for name in names
+        ]
+        for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+            await db.execute(
+                pg_insert(SegmentCode)
+                .values(rows[start:start + INSERT_CHUNK_ROWS])
+                .on_conflict_do_nothing(constraint="uq_segment_codes_segment_id_code_id") # Keep manual codes
+            )
+    await db.commit()
+
+async def apply_rules(db: AsyncSession, project_id: int, ruleset: RuleSet, segments: list[llm.SegmentInput]) -> dict[int, set[int]]:
+    """Replace the rule codes of the given segments with what the rules match now.
+    Returns the matched code ids of each segment that got any."""
+    matched: dict[int, set[int]] = {}
+    for start in range(0, len(segments), RULE_SCAN_SEGMENTS):
+        chunk = segments[start:start + RULE_SCAN_SEGMENTS]
+        hits = {segment.id: found for segment, found in zip(chunk, ruleset.match_many([segment.text for segment in chunk])) if found}
+        async with track_code_changes(db, project_id, [segment.id for segment in chunk]):
+            await db.execute(
+                delete(SegmentCode)
+                .where(SegmentCode.segment_id.in_([segment.id for segment in chunk]))
+                .where(SegmentCode.source == "rule")
+            )
+            rows = [
+                {"segment_id": segment_id, "code_id": code_id, "source": "rule"}
+                for segment_id, found in hits.items()
+                for code_id in sorted(found)
+            ]
+            for row_start in range(0, len(rows), INSERT_CHUNK_ROWS):
+                await db.execute(
+                    pg_insert(SegmentCode)
+                    .values(rows[row_start:row_start + INSERT_CHUNK_ROWS])
+                    .on_conflict_do_nothing(constraint="uq_segment_codes_segment_id_code_id")
+                )
+        await db.commit()
+        matched.update(hits)
+    return matched
+
+def _segment_usage(batch: list[llm.SegmentInput], usage: llm.Usage) -> dict[int, tuple[int, int]]:
+    """Split a request's usage across its segments (prompt by size, completion evenly)."""
+    total_tokens = sum(segment.token_count for segment in batch) or 1
+    return {
+        segment.id: (
+            round(usage.prompt_tokens * segment.token_count / total_tokens),
+            round(usage.completion_tokens / len(batch)),
+        )
+        for segment in batch
+    }
+
+async def code_segments(
+    db: AsyncSession,
+    job: Job,
+    client,
+    redis_client,
+    bucket: RedisTokenBucket,
+    response_cache: LLMResponseCache,
+    segment_ids: Optional[list[int]],
+    prefilter: bool = False,
+    rules: bool = True,
+    skip_rule_coded: bool = False,
+    progress: Optional[dict] = None,
+) -> dict:
+    created = await segment_new_sources(db, job.project_id, progress)
+
+    codes = (await db.execute(select(Code).where(Code.project_id == job.project_id).order_by(Code.id))).scalars().all()
+    if not codes:
+        raise ValueError("The project has no codes to apply")
+    codebook = [(code.name, code.description) for code in codes]
+    code_ids = {code.name: code.id for code in codes}
+    codebook_tokens = estimate_tokens(llm.format_codebook(codebook))
+    model, temperature = settings.LLM_MODEL, settings.LLM_TEMPERATURE
+
+    owner = (await db.execute(
+        select(User.id, User.subscription_tier).join(Project, Project.owner_id == User.id).where(Project.id == job.project_id)
+    )).one()
+    quota = LLMTokenQuota(owner.id, owner.subscription_tier, redis_client)
+
+    segments = await load_segments(db, job.project_id, segment_ids, prefilter)
+
+    # Zero-cost first pass: codes whose keywords or patterns match are applied
+    # directly. Segments they matched are then skipped or sent to the LLM last,
+    # so a run cut short (by the token quota, say) spends its tokens elsewhere.
+    rule_coded: dict[int, set[int]] = {}
+    ruleset = compile_rules([CodeRules(code.id, tuple(code.keywords), tuple(code.patterns)) for code in codes]) if rules else None
+    if ruleset:
+        rule_coded = await apply_rules(db, job.project_id, ruleset, segments)
+        if skip_rule_coded:
+            segments = [segment for segment in segments if segment.id not in rule_coded]
+        else:
+            segments.sort(key=lambda segment: segment.id in rule_coded) # Stable: transcript order otherwise
+    rule_stats = {
+        "rule_coded_segments": len(rule_coded),
+        "rule_codes_applied": sum(len(found) for found in rule_coded.values()),
+        "rule_skipped_segments": len(rule_coded) if skip_rule_coded else 0,
+    }
+    await set_job(db, job.id, total=len(segments), done=0)
+
+    # Consult the cache before any API call. Segments with identical (normalized)
+    # text share a key, so only the first of them is sent.
+    version = codebook_version(codebook)
+    keys = {segment.id: cache_key(segment.text, llm.PROMPT_VERSION, version, model, temperature) for segment in segments}
+    cached = await response_cache.get_many(db, list(set(keys.values())))
+
+    pending: dict[int, list[str]] = {}
+    saved_prompt_tokens = saved_completion_tokens = 0
+    to_send: list[llm.SegmentInput] = []
+    followers: dict[str, list[int]] = {} # key -> other segment ids waiting on the same request
+    for segment in segments:
+        key = keys[segment.id]
+        hit = cached.get(key)
+        if hit is not None:
+            pending[segment.id] = [name for name in hit.codes if name in code_ids]
+            saved_prompt_tokens += hit.prompt_tokens
+            saved_completion_tokens += hit.completion_tokens
+        elif key in followers:
+            followers[key].append(segment.id)
+        else:
+            followers[key] = []
+            to_send.append(segment)
+    cache_hits = len(pending)
+
+    batches = llm.pack_batches(to_send, settings.LLM_BATCH_TOKEN_BUDGET, settings.LLM_MAX_SEGMENTS_PER_REQUEST)
+
+    # Requests run concurrently (bounded per worker, rate-limited across workers);
+    # results are written from this coroutine only, since the session isn't concurrency-safe
+    semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+    async def run_batch(batch: list[llm.SegmentInput]) -> tuple[list[llm.SegmentInput], llm.BatchResult]:
+        async with semaphore:
+            estimate = llm.estimate_request_tokens(codebook_tokens, batch)
+            # Taken from the owner's quota up front, so concurrent requests can't overshoot it
+            reservation = await quota.reserve(estimate)
+            used = 0
+            try:
+                await bucket.acquire(estimate)
+                result = await llm.code_batch(client, model, temperature, codebook, batch)
+                used = result.usage.prompt_tokens + result.usage.completion_tokens
+            finally:
+                await quota.settle(reservation, estimate, used)
+            return batch, result
+
+    usage = llm.Usage()
+    done = 0
+
+    async def flush():
+        nonlocal pending, done
+        await write_codes(db, job.project_id, pending, code_ids)
+        done += len(pending)
+        pending = {}
+        # Running totals for progress events (replaced by the full stats at the end)
+        await set_job(db, job.id, done=done, stats={
+            "requests": usage.requests,
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "cache_hits": cache_hits,
+            **rule_stats,
+        })
+
+    tasks = [asyncio.create_task(run_batch(batch)) for batch in batches]
+    quota_exceeded: Optional[QuotaExceeded] = None
+    try:
+        if len(pending) >= WRITE_BATCH_SEGMENTS:
+            await flush()
+        for next_result in asyncio.as_completed(tasks):
+            try:
+                batch, result = await next_result
+            except QuotaExceeded as exc:
+                # Requests already sent still complete and are kept; the rest fail the same way
+                quota_exceeded = exc
+                continue
+            usage.add(result.usage)
+            shares = _segment_usage(batch, result.usage)
+            new_entries = {}
+            for segment in batch:
+                names = result.codes.get(segment.id, [])
+                key = keys[segment.id]
+                new_entries[key] = CachedCoding(names, *shares[segment.id])
+                pending[segment.id] = names
+                for follower_id in followers[key]:
+                    pending[follower_id] = names
+            await response_cache.put_many(db, model, new_entries)
+            if len(pending) >= WRITE_BATCH_SEGMENTS:
+                await flush()
+    finally:
+        for task in tasks:
+            task.cancel()
+    if pending:
+        await flush()
+    if quota_exceeded is not None:
+        raise quota_exceeded
+
+    saved_cost = (
+        saved_prompt_tokens * settings.LLM_PROMPT_COST_PER_1K_TOKENS
+        + saved_completion_tokens * settings.LLM_COMPLETION_COST_PER_1K_TOKENS
+    ) / 1000
+    return {
+        "segments_created": created,
+        "segments_coded": done,
+        "requests": usage.requests,
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "cache_hits": cache_hits,
+        "cache_misses": len(segments) - cache_hits,
+        "cache_hit_rate": round(cache_hits / len(segments), 4) if segments else 0.0,
+        "tokens_saved": saved_prompt_tokens + saved_completion_tokens,
+        "cost_saved_usd": round(saved_cost, 4),
+        **rule_stats,
+    }
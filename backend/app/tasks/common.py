@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import exists, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import job_events, kwic, task_queue
+from ..coding.segmenter import SegmentSpan, content_hash, estimate_tokens, segment_text
+from ..config import settings
+from ..models import DataSource, Job, Segment
+from ..schemas import job as job_schemas
+
+# --- Job bookkeeping ---
+
+async def set_job(db: AsyncSession, job_id: int, **values):
+    """Update (and commit) the job, then publish its new state to SSE clients."""
+    result = await db.execute(update(Job).where(Job.id == job_id).values(**values).returning(Job))
+    job = result.scalar_one_or_none()
+    data = job_schemas.Job.model_validate(job).model_dump_json() if job is not None else None
+    await db.commit()
+    if data is not None:
+        job_events.publish(job_id, data)
+
+def now():
+    return datetime.now(timezone.utc)
+
+# --- Segments ---
+
+def segment_rows(project_id: int, source_id: int, spans: list[SegmentSpan], first_position: int = 0, offset: int = 0) -> list[dict]:
+    """Segment table rows for spans of a data source (offsets shifted by `offset`)."""
+    return [
+        {
+            "project_id": project_id,
+            "data_source_id": source_id,
+            "position": first_position + index,
+            "start_offset": offset + span.start,
+            "end_offset": offset + span.end,
+            "text": span.text,
+            "token_count": estimate_tokens(span.text),
+            "content_hash": content_hash(span.text),
+        }
+        for index, span in enumerate(spans)
+    ]
+
+async def segment_new_sources(db: AsyncSession, project_id: int, progress: Optional[dict] = None) -> int:
+    """Split transcripts that have no segments yet. Returns segments created.
+    Each transcript's segments are committed as they're made, and also counted
+    in progress["segments_created"], so a caller that fails later (or partway
+    through) knows whether segments were stored."""
+    result = await db.execute(
+        select(DataSource.id)
+        .where(DataSource.project_id == project_id)
+        .where(~exists().where(Segment.data_source_id == DataSource.id))
+    )
+    created = 0
+    for source_id in result.scalars().all():
+        # One transcript in memory at a time
+        content = (await db.execute(select(DataSource.content).where(DataSource.id == source_id))).scalar_one()
+        rows = segment_rows(project_id, source_id, segment_text(content, settings.SEGMENT_MAX_CHARS))
+        if rows:
+            await db.execute(insert(Segment), rows) # executemany, batched by the driver
+            created += len(rows)
+        await db.commit()
+        if progress is not None:
+            progress["segments_created"] = progress.get("segments_created", 0) + len(rows)
+    return created
+
+def request_index_update(project_id: int):
+    """Queue a search index update for the project (after segments are created)."""
+    task_queue.send_task("app.tasks.inference.update_search_index", [project_id])
+
+def segments_changed(project_id: int):
+    """Refresh what's derived from the project's segments after some were
+    created, edited or removed: its search index and concordance hit counts."""
+    kwic.hit_counts.invalidate(project_id)
+    request_index_update(project_id)
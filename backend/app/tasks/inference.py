@@ -0,0 +1,167 @@
+import asyncio
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..celery_app import celery_app
+from ..config import settings
+from ..database import WorkerSessionLocal
+from ..inference.engine import get_engine
+from ..inference.index import project_index
+from ..inference.precoding import candidate_codes, code_label
+from ..models import Code, Job, Segment, SegmentCode
+from .common import now, segment_new_sources, segments_changed, set_job
+
+PAGE_SEGMENTS = 1024 # Segments read, embedded and written (and progress reported) per commit
+
+@celery_app.task(name="app.tasks.inference.precode_project")
+def precode_project(job_id: int, segment_ids: Optional[list[int]] = None):
+    """Pre-code the job's project's segments (or only `segment_ids`) with the local model."""
+    asyncio.run(run_precoding_job(job_id, segment_ids))
+
+async def run_precoding_job(job_id: int, segment_ids: Optional[list[int]] = None):
+    async with WorkerSessionLocal() as db:
+        job = await db.get(Job, job_id)
+        if job is None:
+            return
+        await set_job(db, job_id, status="running")
+        progress: dict = {} # Segments committed so far, known even if the job fails
+        try:
+            stats = await precode_segments(db, job, segment_ids, progress)
+        except Exception as exc:
+            await db.rollback()
+            await set_job(db, job_id, status="failed", error=str(exc), finished_at=now())
+            raise
+        finally:
+            # New transcripts' segments are committed before pre-coding starts, so they're
+            # indexed (and stale hit counts retired) whether or not the job succeeds
+            if progress.get("segments_created"):
+                segments_changed(job.project_id)
+        await set_job(db, job_id, status="succeeded", stats=stats, finished_at=now())
+
+async def write_candidates(db: AsyncSession, candidates: dict[int, list[tuple[str, float]]], code_ids: dict[str, int]):
+    """Replace the model candidates of the given segments (LLM and manual codes are kept)."""
+    await db.execute(
+        delete(SegmentCode)
+        .where(SegmentCode.segment_id.in_(list(candidates)))
+        .where(SegmentCode.source == "model")
+    )
+    rows = [
+        {"segment_id": segment_id, "code_id": code_ids[name], "source": "model", "confidence": round(score, 4)}
+        for segment_id, pairs in candidates.items()
+        for name, score in pairs
+    ]
+    if rows:
+        await db.execute(pg_insert(SegmentCode).values(rows).on_conflict_do_nothing(constraint="uq_segment_codes_segment_id_code_id"))
+    await db.commit()
+
+async def precode_segments(db: AsyncSession, job: Job, segment_ids: Optional[list[int]], progress: Optional[dict] = None) -> dict:
+    created = await segment_new_sources(db, job.project_id, progress)
+
+    codes = (await db.execute(select(Code).where(Code.project_id == job.project_id).order_by(Code.id))).scalars().all()
+    if not codes:
+        raise ValueError("The project has no codes to apply")
+    code_names = [code.name for code in codes]
+    code_ids = {code.name: code.id for code in codes}
+
+    engine = get_engine()
+    # Inference is CPU-bound and synchronous; nothing else runs on this event loop
+    code_vectors = engine.embed([code_label(code.name, code.description) for code in codes])
+
+    base = select(Segment.id, Segment.text).where(Segment.project_id == job.project_id)
+    if segment_ids is not None:
+        base = base.where(Segment.id.in_(segment_ids))
+    total = (await db.execute(select(func.count()).select_from(base.subquery()))).scalar_one()
+    await set_job(db, job.id, total=total, done=0)
+
+    first_batch = engine.stats.batches
+    seconds = engine.stats.seconds
+    done = with_candidates = applied = 0
+    last_id = 0
+    while True:
+        # Keyset pages so memory stays bounded on large projects
+        page = (await db.execute(base.where(Segment.id > last_id).order_by(Segment.id).limit(PAGE_SEGMENTS))).all()
+        if not page:
+            break
+        last_id = page[-1].id
+        vectors = engine.embed([row.text for row in page])
+        results = candidate_codes(vectors, code_vectors, code_names, settings.PRECODING_THRESHOLD, settings.PRECODING_TOP_K)
+        candidates = {row.id: pairs for row, pairs in zip(page, results)}
+        await write_candidates(db, candidates, code_ids)
+
+        done += len(page)
+        with_candidates += sum(1 for pairs in results if pairs)
+        applied += sum(len(pairs) for pairs in results)
+        await set_job(db, job.id, done=done)
+
+    seconds = engine.stats.seconds - seconds
+    latencies = list(engine.stats.batch_latencies)[-(engine.stats.batches - first_batch):] if done else []
+    return {
+        "segments_created": created,
+        "segments_precoded": done,
+        "segments_with_candidates": with_candidates,
+        "candidates": applied,
+        "model": engine.model_name,
+        "quantized": engine.quantize,
+        "segments_per_second": round(done / seconds, 1) if seconds else 0.0,
+        "p95_batch_ms": round(float(np.percentile(latencies, 95)) * 1000, 1) if latencies else 0.0,
+    }
+
+# --- Search index ---
+
+@celery_app.task(name="app.tasks.inference.update_search_index")
+def update_search_index(project_id: int):
+    """Embed the project's new segments into its search index (rebuilding it when
+    the model changed, too many indexed segments were deleted, or it's big
+    enough to switch to IVF)."""
+    asyncio.run(run_index_update(project_id))
+
+async def _segment_pages(db: AsyncSession, project_id: int, after_id: int):
+    last_id = after_id
+    while True:
+        page = (await db.execute(
+            select(Segment.id, Segment.text)
+            .where(Segment.project_id == project_id)
+            .where(Segment.id > last_id)
+            .order_by(Segment.id)
+            .limit(PAGE_SEGMENTS)
+        )).all()
+        if not page:
+            return
+        last_id = page[-1].id
+        yield page
+
+async def run_index_update(project_id: int):
+    index = project_index(project_id)
+    engine = get_engine()
+    async with WorkerSessionLocal() as db:
+        with index.lock():
+            meta = index.read_meta()
+            rebuild = meta is None or meta.model != engine.model_name
+            if not rebuild:
+                # Indexed segments since deleted (e.g. re-segmented transcripts) are
+                # skipped at query time; rebuild once they're a large share of rows
+                live, total = (await db.execute(
+                    select(func.count().filter(Segment.id <= meta.watermark), func.count())
+                    .where(Segment.project_id == project_id)
+                )).one()
+                stale = meta.count - live
+                rebuild = meta.count > 0 and stale / meta.count > settings.SEARCH_REBUILD_STALE_FRACTION
+                # Switch to IVF when the project outgrows exact search
+                rebuild = rebuild or (
+                    settings.SEARCH_INDEX_KIND == "ivf" and meta.kind == "flat" and total >= settings.SEARCH_IVF_MIN_VECTORS
+                )
+
+            if rebuild:
+                meta = index.start_generation(engine.model_name, engine.dimension)
+                async for page in _segment_pages(db, project_id, 0):
+                    index.write_rows(meta, np.array([row.id for row in page]), engine.embed([row.text for row in page]))
+                if settings.SEARCH_INDEX_KIND == "ivf" and meta.count >= settings.SEARCH_IVF_MIN_VECTORS:
+                    index.train_ivf(meta, nlist=int(np.sqrt(meta.count)))
+                index.publish(meta)
+            else:
+                async for page in _segment_pages(db, project_id, meta.watermark):
+                    index.append(meta, np.array([row.id for row in page]), engine.embed([row.text for row in page]))
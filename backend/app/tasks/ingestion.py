@@ -0,0 +1,140 @@
+import asyncio
+import os
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..celery_app import celery_app
+from ..coding.segmenter import segment_text
+from ..config import settings
+from ..database import WorkerSessionLocal
+from ..ingestion import count_xlsx_rows, iter_docx_paragraphs, iter_xlsx_transcripts
+from ..models import DataSource, Job
+from .common import now, segment_rows, segments_changed, set_job
+
+# Column order for COPY into segments (the remaining columns take their defaults)
+SEGMENT_COPY_COLUMNS = ("project_id", "data_source_id", "position", "start_offset", "end_offset", "text", "token_count", "content_hash")
+
+@celery_app.task(name="app.tasks.ingestion.ingest_source")
+def ingest_source(job_id: int, path: str, filename: str):
+    """Parse an uploaded .xlsx/.docx into transcripts and segments, then delete the upload."""
+    try:
+        asyncio.run(run_ingestion_job(job_id, path, filename))
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+async def run_ingestion_job(job_id: int, path: str, filename: str):
+    async with WorkerSessionLocal() as db:
+        job = await db.get(Job, job_id)
+        if job is None:
+            return
+        stats = dict(job.stats or {}, sources=0, segments=0)
+        await set_job(db, job_id, status="running")
+        try:
+            extension = os.path.splitext(filename)[1].lower()
+            if extension == ".xlsx":
+                await ingest_xlsx(db, job, path, stats)
+            elif extension == ".docx":
+                await ingest_docx(db, job, path, os.path.splitext(os.path.basename(filename))[0], stats)
+            else:
+                raise ValueError(f"Unsupported file type: {extension}")
+        except Exception as exc:
+            await db.rollback()
+            await set_job(db, job_id, status="failed", error=str(exc), stats=stats, finished_at=now())
+            if stats["segments"]:
+                # Batches are committed as they're written, so the segments stored
+                # before the failure stay: index them and retire stale hit counts
+                segments_changed(job.project_id)
+            raise
+        await set_job(db, job_id, status="succeeded", stats=stats, finished_at=now())
+        segments_changed(job.project_id)
+
+# --- Bulk writes ---
+
+async def insert_sources(db: AsyncSession, project_id: int, items: list[tuple[str, str]]) -> list[int]:
+    """Insert data sources in one batched INSERT ... RETURNING, ids in input order."""
+    result = await db.execute(
+        insert(DataSource).returning(DataSource.id, sort_by_parameter_order=True),
+        [{"project_id": project_id, "name": name, "kind": "transcript", "content": content} for name, content in items],
+    )
+    return list(result.scalars())
+
+async def copy_segments(db: AsyncSession, rows: list[dict]):
+    """COPY segment rows into Postgres (much faster than INSERTs for large uploads)."""
+    if not rows:
+        return
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "segments",
+        records=[tuple(row[column] for column in SEGMENT_COPY_COLUMNS) for row in rows],
+        columns=SEGMENT_COPY_COLUMNS,
+    )
+
+# --- Formats ---
+
+async def ingest_xlsx(db: AsyncSession, job: Job, path: str, stats: dict):
+    """One transcript per row, written INGEST_BATCH_ROWS rows per transaction."""
+    total = count_xlsx_rows(path) # None if the writer didn't record the sheet's dimensions
+    await set_job(db, job.id, total=total or 0)
+    done = 0
+
+    async def flush(batch: list[tuple[str, str]]):
+        nonlocal done
+        source_ids = await insert_sources(db, job.project_id, batch)
+        rows = []
+        for source_id, (_, transcript) in zip(source_ids, batch):
+            rows.extend(segment_rows(job.project_id, source_id, segment_text(transcript, settings.SEGMENT_MAX_CHARS)))
+        await copy_segments(db, rows)
+        done += len(batch)
+        stats["sources"] += len(batch)
+        stats["segments"] += len(rows)
+        progress = {"done": done} if total else {"done": done, "total": done}
+        await set_job(db, job.id, stats=stats, **progress) # Commits the batch too
+
+    batch: list[tuple[str, str]] = []
+    for item in iter_xlsx_transcripts(path):
+        batch.append(item)
+        if len(batch) >= settings.INGEST_BATCH_ROWS:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+async def ingest_docx(db: AsyncSession, job: Job, path: str, name: str, stats: dict):
+    """The whole document is one transcript. Paragraphs are consumed in chunks of
+    ~INGEST_CHUNK_CHARS; each chunk is segmented, appended to the transcript's
+    content in SQL and COPYed, so only one chunk is held in memory."""
+    await set_job(db, job.id, total=1)
+    source_id = (await insert_sources(db, job.project_id, [(name, "")]))[0]
+    stats["sources"] = 1
+    offset = position = 0
+
+    async def flush(paragraphs: list[str]):
+        nonlocal offset, position
+        text = "\n\n".join(paragraphs)
+        if offset:
+            text = "\n\n" + text # Paragraph break between chunks
+        spans = segment_text(text, settings.SEGMENT_MAX_CHARS)
+        await db.execute(
+            update(DataSource).where(DataSource.id == source_id).values(content=DataSource.content + text)
+        )
+        rows = segment_rows(job.project_id, source_id, spans, first_position=position, offset=offset)
+        await copy_segments(db, rows)
+        offset += len(text)
+        position += len(spans)
+        stats["segments"] += len(rows)
+        await set_job(db, job.id, stats=stats)
+
+    chunk: list[str] = []
+    chunk_chars = 0
+    for paragraph in iter_docx_paragraphs(path):
+        chunk.append(paragraph)
+        chunk_chars += len(paragraph)
+        if chunk_chars >= settings.INGEST_CHUNK_CHARS:
+            await flush(chunk)
+            chunk, chunk_chars = [], 0
+    if chunk:
+        await flush(chunk)
+    await set_job(db, job.id, done=1)
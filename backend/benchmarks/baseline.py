@@ -0,0 +1,91 @@
+"""JSON baselines and regression checks shared by the benchmark scripts.
+
+A result file looks like:
+    {"meta": {...}, "scenarios": {"login": {"rps": 812.3, "p95_ms": 41.2, ...}, ...}}
+
+A scenario regresses when a higher-is-better metric (rps, ops_per_sec,
+mb_per_sec) drops, or a lower-is-better one (p95_ms, p99_ms, mean_us,
+import_ms, rss_mb, compile_ms) rises, by more than the threshold fraction
+relative to the baseline.
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+from datetime import datetime, timezone
+
+HIGHER_IS_BETTER = ("rps", "ops_per_sec", "mb_per_sec")
+LOWER_IS_BETTER = ("p95_ms", "p99_ms", "mean_us", "import_ms", "rss_mb", "compile_ms")
+
+
+def summarize(latencies_seconds: list[float], wall_seconds: float, errors: int = 0) -> dict:
+    """Throughput and latency percentiles (ms) for one scenario."""
+    ordered = sorted(latencies_seconds)
+    if not ordered:
+        return {"requests": 0, "errors": errors, "rps": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+
+    def pct(p: float) -> float:
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 2)
+
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / wall_seconds, 1) if wall_seconds else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+    }
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save(path: str, meta: dict, scenarios: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"meta": {**environment(), **meta}, "scenarios": scenarios}, f, indent=2)
+    print(f"Saved results to {path}")
+
+
+def compare(scenarios: dict, baseline_path: str, threshold: float) -> list[str]:
+    """Regressions of `scenarios` against the baseline file (empty if none)."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["scenarios"]
+    regressions = []
+    for name, base in baseline.items():
+        current = scenarios.get(name)
+        if current is None:
+            continue
+        for metric in HIGHER_IS_BETTER:
+            if base.get(metric) and metric in current and current[metric] < base[metric] * (1 - threshold):
+                regressions.append(f"{name}: {metric} {current[metric]} < baseline {base[metric]} (-{threshold:.0%} allowed)")
+        for metric in LOWER_IS_BETTER:
+            if base.get(metric) and metric in current and current[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{name}: {metric} {current[metric]} > baseline {base[metric]} (+{threshold:.0%} allowed)")
+    return regressions
+
+
+def check(scenarios: dict, baseline_path: str | None, threshold: float) -> int:
+    """Print the comparison and return the process exit code (1 on regression)."""
+    if not baseline_path:
+        return 0
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --save {baseline_path} to create one")
+        return 0
+    regressions = compare(scenarios, baseline_path, threshold)
+    if regressions:
+        print("REGRESSIONS:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No regressions against {baseline_path} (threshold {threshold:.0%})")
+    return 0
@@ -0,0 +1,162 @@
+"""Bytes and CPU per poll of GET /projects/ and GET /users/me, with and without
+conditional requests (app/http_cache.py) and compression (app/compression.py).
+
+For each endpoint:
+    full           a 200 with the body sent as it is (Accept-Encoding: identity)
+    gzip, br       a 200, compressed (br needs the brotli package)
+    not_modified   a poll with If-None-Match: the 304 the frontend gets when
+                   nothing changed
+
+The app runs in process (httpx's ASGI transport, no sockets) against a SQLite
+file, so CPU time is the whole request: routing, auth, queries, serialization
+and compression, plus the client's small share. Bytes are as sent over the
+wire: status line and headers, and the body as encoded.
+
+Usage (from backend/):
+    python benchmarks/http_cache.py --projects 100
+    python benchmarks/http_cache.py --save benchmarks/results/http_cache.json
+    python benchmarks/http_cache.py --baseline benchmarks/results/http_cache.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Make the `app` package importable when run as a script, and give Settings a DB URL
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(__file__))
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'http_cache.db')}"
+# The rate limiter still runs (its cost is part of what's measured) but never rejects
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+os.environ["TIER_LIMITS"] = json.dumps({"free": {"requests_per_minute": 10**9, "llm_tokens_per_day": 0, "llm_tokens_per_month": 0}})
+
+import httpx # noqa: E402
+from sqlalchemy import create_engine, insert, select # noqa: E402
+from sqlalchemy.orm import Session # noqa: E402
+
+import baseline # noqa: E402
+import main # noqa: E402
+from app import compression, models # noqa: E402, F401 (registers every table on Base.metadata)
+from app.database import Base # noqa: E402
+from app.models.project import Project # noqa: E402
+from app.models.user import User # noqa: E402
+from app.security import create_tokens # noqa: E402
+
+ENDPOINTS = {"projects_list": "/projects/", "users_me": "/users/me"}
+
+
+def seed(projects: int) -> str:
+    """A user with `projects` projects; returns their access token."""
+    engine = create_engine(os.environ["DATABASE_URL"])
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(email="bench@example.com", hashed_password="-", is_active=True, subscription_tier="free")
+        session.add(user)
+        session.commit()
+        if projects:
+            session.execute(insert(Project), [
+                {"name": f"Project {n}", "description": "Interviews with nurses about shift work and staffing", "owner_id": user.id}
+                for n in range(projects)
+            ])
+            session.commit()
+        user = session.scalars(select(User)).one()
+        token = create_tokens(user)["access_token"]
+    engine.dispose()
+    return token
+
+
+def wire_bytes(response: httpx.Response) -> int:
+    head = len(f"HTTP/1.1 {response.status_code} {response.reason_phrase}\r\n")
+    head += sum(len(name) + len(value) + 4 for name, value in response.headers.raw) + 2
+    return head + response.num_bytes_downloaded
+
+
+async def poll(client: httpx.AsyncClient, path: str, params: dict, headers: dict, number: int) -> tuple[float, httpx.Response]:
+    """Process CPU seconds per poll over `number` sequential polls, and the last response."""
+    start = time.process_time()
+    for _ in range(number):
+        response = await client.get(path, params=params, headers=headers)
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f"GET {path} answered {response.status_code}")
+    return (time.process_time() - start) / number, response
+
+
+async def run(args, token: str) -> dict:
+    transport = httpx.ASGITransport(app=main.app)
+    auth = {"Authorization": f"Bearer {token}"}
+    scenarios = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for endpoint, path in ENDPOINTS.items():
+            params = {"limit": args.page_size} if endpoint == "projects_list" else {}
+            etag = (await client.get(path, params=params, headers=auth)).headers["etag"]
+            variants = {
+                "full": {"Accept-Encoding": "identity"},
+                "gzip": {"Accept-Encoding": "gzip"},
+                "br": {"Accept-Encoding": "br"},
+                "not_modified": {"Accept-Encoding": "br, gzip", "If-None-Match": etag},
+            }
+            if compression.brotli is None:
+                del variants["br"]
+            for variant, headers in variants.items():
+                scenarios[f"{endpoint}_{variant}"] = (path, params, {**auth, **headers})
+
+        for path, params, headers in scenarios.values():
+            await poll(client, path, params, headers, 10) # Warm up
+        best = {name: float("inf") for name in scenarios}
+        responses = {}
+        # Scenarios take turns within each run, so drift in machine load hits them alike
+        for _ in range(args.repeat):
+            for name, (path, params, headers) in scenarios.items():
+                seconds, responses[name] = await poll(client, path, params, headers, args.number)
+                best[name] = min(best[name], seconds)
+
+    return {
+        name: {
+            "status": responses[name].status_code,
+            "wire_bytes": wire_bytes(responses[name]),
+            "mean_us": round(best[name] * 1e6, 2),
+            "ops_per_sec": round(1 / best[name], 1),
+        }
+        for name in scenarios
+    }
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=100, help="Projects of the polling user")
+    parser.add_argument("--page-size", type=int, default=100, help="limit for GET /projects/")
+    parser.add_argument("--number", type=int, default=200, help="Polls per timing run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file and exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative change before a regression")
+    args = parser.parse_args()
+
+    try:
+        token = seed(args.projects)
+        results = asyncio.run(run(args, token))
+    finally:
+        _tmpdir.cleanup()
+
+    print(f"{'scenario':>26} {'status':>6} {'bytes':>8} {'saved':>7} {'CPU us':>9} {'saved':>7}")
+    for endpoint in ENDPOINTS:
+        full = results[f"{endpoint}_full"]
+        for name, result in results.items():
+            if name.startswith(endpoint):
+                bytes_saved = 1 - result["wire_bytes"] / full["wire_bytes"]
+                cpu_saved = 1 - result["mean_us"] / full["mean_us"]
+                print(f"{name:>26} {result['status']:>6} {result['wire_bytes']:>8} {bytes_saved:>7.0%} {result['mean_us']:>9.1f} {cpu_saved:>7.0%}")
+
+    meta = {"benchmark": "http_cache", "projects": args.projects, "page_size": args.page_size, "brotli": compression.brotli is not None}
+    if args.save:
+        baseline.save(args.save, meta, results)
+    sys.exit(baseline.check(results, args.baseline, args.threshold))
+
+
+if __name__ == "__main__":
+    main_()
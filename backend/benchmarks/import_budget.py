@@ -0,0 +1,122 @@
+"""Startup cost of an API worker: time and memory to `import main`.
+
+Heavy libraries (torch, transformers, numpy/scipy, pandas, openai, openpyxl,
+pyarrow, Celery) must not be imported by `main`: the API loads them lazily on
+first use, and inference and ingestion code only runs in the Celery worker.
+This script imports `main` in fresh interpreters and checks:
+
+    - no module from FORBIDDEN was imported
+    - the import took at most --max-seconds (best of --repeat runs)
+    - the process's peak RSS stayed within --max-rss-mb
+
+and prints where the time went (`python -X importtime`, summed per top-level
+package). Exits with status 1 if a check fails, so it can gate CI.
+
+Usage (from backend/):
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --max-seconds 2 --max-rss-mb 100 --top 20
+    python benchmarks/import_budget.py --save benchmarks/results/import.json
+    python benchmarks/import_budget.py --baseline benchmarks/results/import.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import baseline # noqa: E402
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+FORBIDDEN = ("torch", "transformers", "numpy", "scipy", "pandas", "openai", "openpyxl", "pyarrow", "celery")
+
+# Runs in the child interpreter; prints its measurements as JSON
+_CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import main
+seconds = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # KiB on Linux, bytes on macOS
+print(json.dumps({
+    "seconds": seconds,
+    "rss_mb": peak / (1 << 20 if sys.platform == "darwin" else 1 << 10),
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def _env() -> dict:
+    # Settings need a database URL; nothing connects at import time
+    return {"DATABASE_URL": "sqlite://", **os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+
+
+def measure() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD], cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile() -> dict[str, float]:
+    """Cumulative import time (ms) per top-level package, from -X importtime."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True,
+    ).stderr
+    per_package: dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue # Header line
+        # Self time summed per package, so nested imports aren't counted twice
+        per_package[name.strip().split(".")[0]] += int(self_us) / 1000
+    return dict(sorted(per_package.items(), key=lambda item: -item[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-seconds", type=float, default=2.5, help="Budget for `import main`")
+    parser.add_argument("--max-rss-mb", type=float, default=120.0, help="Budget for the importing process's peak RSS")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters to time; the fastest counts")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list in the import-time report")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file and exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative change before a regression")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.repeat)]
+    seconds = min(run["seconds"] for run in runs)
+    rss_mb = max(run["rss_mb"] for run in runs)
+    loaded = set(runs[0]["modules"])
+    forbidden = sorted(name for name in FORBIDDEN if name in loaded)
+
+    print(f"{'package':>24} {'self ms':>9}")
+    for package, ms in list(import_profile().items())[:args.top]:
+        print(f"{package:>24} {ms:>9.1f}")
+    print()
+    print(f"import main: {seconds * 1000:.0f} ms (budget {args.max_seconds * 1000:.0f}), "
+          f"peak RSS {rss_mb:.1f} MB (budget {args.max_rss_mb:.0f}), {len(loaded)} modules")
+
+    failures = []
+    if forbidden:
+        failures.append(f"heavy modules imported by main: {', '.join(forbidden)}")
+    if seconds > args.max_seconds:
+        failures.append(f"import time {seconds:.2f}s over the {args.max_seconds}s budget")
+    if rss_mb > args.max_rss_mb:
+        failures.append(f"peak RSS {rss_mb:.1f} MB over the {args.max_rss_mb} MB budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    results = {"import_main": {"import_ms": round(seconds * 1000, 1), "rss_mb": round(rss_mb, 1), "modules": len(loaded)}}
+    if args.save:
+        baseline.save(args.save, {"benchmark": "import_budget"}, results)
+    status = baseline.check(results, args.baseline, args.threshold)
+    sys.exit(1 if failures else status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Local embedding throughput (segments/sec) and batch latency on CPU.
+
+Runs the worker's EmbeddingEngine over synthetic segments of varied length,
+comparing fp32 vs int8 dynamic quantization, thread counts, and dynamic
+(length-sorted) vs fixed batching. By default it builds a tiny randomly
+initialised BERT in a temporary directory, so it needs no download; pass
+--model to measure a real one (e.g. sentence-transformers/all-MiniLM-L6-v2).
+
+Usage (from backend/):
+    python benchmarks/inference.py --segments 2000 --threads 1 4
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Make the `app` package importable when run as a script, and give Settings a DB URL
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np # noqa: E402
+
+from app.inference.engine import EmbeddingEngine # noqa: E402
+
+WORDS = (
+    "price support onboarding team manager because really think the a we they it was is "
+    "slow fast good bad expensive cheap help call email product feature bug release customer"
+).split()
+
+
+def build_tiny_model(path: str):
+    """A 2-layer, 128-dim BERT with random weights and a word-level vocab."""
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w") as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", ",", "?"] + WORDS))
+    tokenizer = BertTokenizerFast.from_pretrained(path) # Reads vocab.txt
+    config = BertConfig(
+        vocab_size=tokenizer.vocab_size,
+        hidden_size=128,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=512,
+        max_position_embeddings=512,
+    )
+    BertModel(config).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+
+
+def make_segments(count: int, seed: int = 0) -> list[str]:
+    # Mostly short turns with a long tail, like interview transcripts
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=min(250, int(rng.paretovariate(1.2) * 8)))) + "." for _ in range(count)]
+
+
+def run(model: str, segments: list[str], threads: int, quantize: bool, dynamic: bool, args) -> dict:
+    engine = EmbeddingEngine(
+        model,
+        num_threads=threads,
+        quantize=quantize,
+        max_length=args.max_length,
+        max_batch_tokens=args.max_batch_tokens,
+        max_batch_size=args.max_batch_size,
+        dynamic_batching=dynamic,
+    )
+    engine.embed(segments[:args.max_batch_size]) # Load and warm up
+    engine.stats.batch_latencies.clear()
+    tokens, padded = engine.stats.tokens, engine.stats.padded_tokens
+
+    start = time.perf_counter()
+    engine.embed(segments)
+    elapsed = time.perf_counter() - start
+    latencies = np.array(engine.stats.batch_latencies) * 1000
+    return {
+        "segments_per_second": len(segments) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "padding": 1 - (engine.stats.tokens - tokens) / (engine.stats.padded_tokens - padded),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Model id or path (default: a tiny random BERT)")
+    parser.add_argument("--segments", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--max-batch-tokens", type=int, default=8192)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    from transformers.utils import logging as transformers_logging
+    transformers_logging.disable_progress_bar()
+
+    segments = make_segments(args.segments)
+    with tempfile.TemporaryDirectory() as tmp:
+        model = args.model
+        if model is None:
+            build_tiny_model(tmp)
+            model = tmp
+        print(f"model={args.model or 'tiny random BERT'}, {len(segments)} segments, {os.cpu_count()} CPUs")
+        print(f"{'threads':>7} {'weights':>7} {'batching':>8} {'seg/sec':>9} {'p50 ms':>8} {'p95 ms':>8} {'padding':>8}")
+        for threads in args.threads:
+            for quantize in (False, True):
+                for dynamic in (True, False):
+                    result = run(model, segments, threads, quantize, dynamic, args)
+                    print(
+                        f"{threads:>7} {'int8' if quantize else 'fp32':>7} {'dynamic' if dynamic else 'fixed':>8} "
+                        f"{result['segments_per_second']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                        f"{result['padding']:>8.1%}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""HTTP load test of the API: throughput and latency percentiles per scenario.
+
+Boots `main:app` under uvicorn against a database, seeds users and projects,
+then drives each scenario with a fixed number of concurrent clients:
+
+    register       POST /auth/register (one bcrypt hash each)
+    login          POST /auth/login (one bcrypt verify each)
+    users_me       GET /users/me
+    projects_list  GET /projects/
+
+With no --database-url a throwaway SQLite file is used. Against Postgres, run
+the migrations first; the benchmark only touches the users (and their projects)
+it creates, and deletes them afterwards.
+
+Usage (from backend/):
+    python benchmarks/loadtest.py --users 50 --projects 20 --concurrency 32 --requests 2000
+    python benchmarks/loadtest.py --save benchmarks/results/baseline.json
+    python benchmarks/loadtest.py --baseline benchmarks/results/baseline.json --threshold 0.15
+
+Exits with status 1 when --baseline is given and a scenario regressed beyond
+the threshold (see benchmarks/baseline.py).
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+# Make the `app` package importable when run as a script, and give Settings a DB URL
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(__file__))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx # noqa: E402
+from sqlalchemy import create_engine, delete, insert, select # noqa: E402
+
+import baseline # noqa: E402
+from app import models # noqa: E402, F401 (registers every table on Base.metadata)
+from app.database import Base # noqa: E402
+from app.hashing import make_crypt_context # noqa: E402
+from app.models.project import Project # noqa: E402
+from app.models.user import User # noqa: E402
+
+SCENARIOS = ("register", "login", "users_me", "projects_list")
+PASSWORD = "correct horse battery"
+TOKEN_USERS = 20 # Seeded users that log in up front to drive the authenticated scenarios
+
+# --- Database ---
+
+def seed(database_url: str, run_id: str, users: int, projects: int, rounds: int) -> list[str]:
+    """Insert the benchmark users (sharing one precomputed hash) and their projects."""
+    engine = create_engine(database_url)
+    if database_url.startswith("sqlite"):
+        Base.metadata.create_all(engine)
+    hashed_password = make_crypt_context(rounds).hash(PASSWORD)
+    emails = [f"bench-{run_id}-{i}@example.com" for i in range(users)]
+    with engine.begin() as conn:
+        user_ids = conn.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [{"email": email, "hashed_password": hashed_password, "is_active": True, "subscription_tier": "free"} for email in emails],
+        ).scalars().all()
+        if projects:
+            conn.execute(insert(Project), [
+                {"name": f"Project {n}", "description": "Benchmark project", "owner_id": user_id}
+                for user_id in user_ids for n in range(projects)
+            ])
+    engine.dispose()
+    return emails
+
+def cleanup(database_url: str, run_id: str):
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        bench_users = select(User.id).where(User.email.like(f"bench-{run_id}-%"))
+        conn.execute(delete(Project).where(Project.owner_id.in_(bench_users)))
+        conn.execute(delete(User).where(User.email.like(f"bench-{run_id}-%")))
+    engine.dispose()
+
+# --- Server ---
+
+# The rate limiter still runs (its cost is part of what's measured) but never rejects
+UNLIMITED_TIERS = {"free": {"requests_per_minute": 10**9, "llm_tokens_per_day": 0, "llm_tokens_per_month": 0}}
+
+def start_server(database_url: str, port: int, workers: int, rounds: int) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": database_url, "BCRYPT_ROUNDS": str(rounds), "TIER_LIMITS": json.dumps(UNLIMITED_TIERS)}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+async def wait_until_up(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not come up")
+
+# --- Scenarios ---
+
+def make_scenarios(run_id: str, emails: list[str], tokens: list[str], page_size: int):
+    """Scenario name -> function sending request number i."""
+    def auth(i: int) -> dict:
+        return {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+
+    return {
+        "register": lambda client, i: client.post(
+            "/auth/register", json={"email": f"bench-{run_id}-new-{i}@example.com", "password": PASSWORD},
+        ),
+        "login": lambda client, i: client.post(
+            "/auth/login", data={"username": emails[i % len(emails)], "password": PASSWORD},
+        ),
+        "users_me": lambda client, i: client.get("/users/me", headers=auth(i)),
+        "projects_list": lambda client, i: client.get("/projects/", params={"limit": page_size}, headers=auth(i)),
+    }
+
+async def drive(client: httpx.AsyncClient, send, requests: int, concurrency: int, offset: int = 0) -> dict:
+    """Send `requests` requests from `concurrency` concurrent clients."""
+    latencies: list[float] = []
+    errors = 0
+    next_request = iter(range(offset, offset + requests))
+
+    async def worker():
+        nonlocal errors
+        for i in next_request:
+            start = time.perf_counter()
+            try:
+                response = await send(client, i)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return baseline.summarize(latencies, time.perf_counter() - start, errors)
+
+async def run(args, run_id: str, emails: list[str]) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60.0) as client:
+        server = start_server(args.database_url, args.port, args.workers, args.bcrypt_rounds)
+        try:
+            await wait_until_up(client, server)
+            tokens = []
+            for email in emails[:TOKEN_USERS]:
+                response = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+                response.raise_for_status()
+                tokens.append(response.json()["access_token"])
+
+            scenarios = make_scenarios(run_id, emails, tokens, args.page_size)
+            results = {}
+            for name in args.scenarios:
+                # Bcrypt-bound scenarios are far slower; run fewer of them
+                requests = args.requests if name in ("users_me", "projects_list") else args.auth_requests
+                await drive(client, scenarios[name], args.warmup, args.concurrency, offset=requests)
+                results[name] = await drive(client, scenarios[name], requests, args.concurrency)
+                summary = results[name]
+                print(
+                    f"{name:>14} {summary['requests']:>8} {summary['errors']:>7} {summary['rps']:>9.1f}"
+                    f" {summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f}"
+                )
+            return results
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Sync SQLAlchemy URL (default: a temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=50, help="Users to seed")
+    parser.add_argument("--projects", type=int, default=20, help="Projects per seeded user")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per read scenario")
+    parser.add_argument("--auth-requests", type=int, default=200, help="Requests per register/login scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests before each scenario")
+    parser.add_argument("--page-size", type=int, default=100, help="limit for GET /projects/")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file and exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative change before a regression")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.database_url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.database_url = f"sqlite:///{os.path.join(tmpdir.name, 'loadtest.db')}"
+
+    run_id = uuid.uuid4().hex[:8]
+    print(f"Seeding {args.users} users x {args.projects} projects ({args.database_url.split('://')[0]})")
+    emails = seed(args.database_url, run_id, args.users, args.projects, args.bcrypt_rounds)
+    try:
+        print(f"concurrency={args.concurrency}, uvicorn workers={args.workers}, bcrypt rounds={args.bcrypt_rounds}, {os.cpu_count()} CPUs")
+        print(f"{'scenario':>14} {'requests':>8} {'errors':>7} {'req/sec':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        results = asyncio.run(run(args, run_id, emails))
+    finally:
+        cleanup(args.database_url, run_id)
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    meta = {
+        "benchmark": "loadtest",
+        "database": args.database_url.split("://")[0],
+        **{key: getattr(args, key) for key in ("users", "projects", "concurrency", "workers", "bcrypt_rounds", "page_size")},
+    }
+    if args.save:
+        baseline.save(args.save, meta, results)
+    sys.exit(baseline.check(results, args.baseline, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
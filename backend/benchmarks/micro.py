@@ -0,0 +1,93 @@
+"""Micro-benchmarks of per-request CPU work outside the database.
+
+    create_access_token   signing a JWT at login
+    jwt_decode            verifying one with python-jose
+    decode_token          verifying one the way get_current_user does (app.security)
+    serialize_projects    validating a page of Project rows into the response
+                          model and dumping it to JSON (what GET /projects/ does)
+    rate_limit_memory     one sliding-window check in the per-process limit store
+    rate_limit_redis      the same check in Redis (one Lua call; skipped without
+                          a reachable REDIS_URL)
+
+Usage (from backend/):
+    python benchmarks/micro.py --page-size 100
+    python benchmarks/micro.py --save benchmarks/results/micro.json
+    python benchmarks/micro.py --baseline benchmarks/results/micro.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+
+# Make the `app` package importable when run as a script, and give Settings a DB URL
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(__file__))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from jose import jwt # noqa: E402
+from pydantic import TypeAdapter # noqa: E402
+
+import baseline # noqa: E402
+from app import limits, security # noqa: E402
+from app.config import settings # noqa: E402
+from app.models.project import Project # noqa: E402
+from app.schemas import project as project_schemas # noqa: E402
+
+
+def measure(fn, repeat: int, number: int) -> dict:
+    """Best of `repeat` runs of `number` calls (the least disturbed by other load)."""
+    fn() # Warm up
+    best = min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+    return {"mean_us": round(best * 1e6, 2), "ops_per_sec": round(1 / best, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="Calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=100, help="Projects serialized per call")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file and exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative change before a regression")
+    args = parser.parse_args()
+
+    token = security.create_access_token({"sub": "42", "ver": 0, "email": "a@example.com", "act": True, "tier": "free"})
+    now = datetime.now(timezone.utc)
+    projects = [
+        Project(id=i, name=f"Project {i}", description="Interviews with nurses about shift work", owner_id=42, created_at=now, updated_at=now)
+        for i in range(args.page_size)
+    ]
+    page = TypeAdapter(list[project_schemas.Project])
+    memory_store = limits.InMemoryLimitStore()
+    redis_store = limits.RedisLimitStore(settings.REDIS_URL)
+    loop = asyncio.new_event_loop() # The stores are async; one loop for every call, as in an API worker
+
+    benchmarks = {
+        "create_access_token": lambda: security.create_access_token({"sub": "42"}),
+        "jwt_decode": lambda: jwt.decode(token, security.SIGNING_KEYS[security.ACTIVE_KID], algorithms=[security.ALGORITHM]),
+        "decode_token": lambda: security.decode_token(token),
+        "serialize_projects": lambda: page.dump_json(page.validate_python(projects, from_attributes=True)),
+        "rate_limit_memory": lambda: loop.run_until_complete(memory_store.hit("ratelimit:bench:GET /users/me", 10**9)),
+        "rate_limit_redis": lambda: loop.run_until_complete(redis_store.hit("ratelimit:bench:GET /users/me", 10**9)),
+    }
+    if loop.run_until_complete(redis_store.hit("ratelimit:bench:GET /users/me", 10**9)) is None:
+        del benchmarks["rate_limit_redis"]
+    # The serialization benchmark is ~page-size times heavier per call
+    numbers = {"serialize_projects": max(1, args.number // args.page_size)}
+
+    print(f"{'benchmark':>20} {'us/op':>10} {'ops/sec':>12}")
+    results = {}
+    for name, fn in benchmarks.items():
+        results[name] = measure(fn, args.repeat, numbers.get(name, args.number))
+        print(f"{name:>20} {results[name]['mean_us']:>10.2f} {results[name]['ops_per_sec']:>12.1f}")
+
+    meta = {"benchmark": "micro", "page_size": args.page_size, "algorithm": security.ALGORITHM}
+    if args.save:
+        baseline.save(args.save, meta, results)
+    sys.exit(baseline.check(results, args.baseline, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Logins/sec by hashing worker count.
+
+Simulates the CPU side of /auth/login (one bcrypt verify per login) through the
+same PasswordHasher the auth routes use.
+
+Usage (from backend/):
+    python benchmarks/password_hashing.py --workers 0 1 2 4 --logins 64 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Make the `app` package importable when run as a script, and give Settings a DB URL
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.hashing import PasswordHasher, make_crypt_context # noqa: E402
+
+
+async def run(workers: int, logins: int, rounds: int, stored_hash: str) -> float:
+    hasher = PasswordHasher(workers=workers, max_pending=logins, rounds=rounds)
+    try:
+        # Warm up so process start-up isn't counted
+        await asyncio.gather(*(hasher.verify_and_update("correct horse", stored_hash) for _ in range(max(workers, 1))))
+        start = time.perf_counter()
+        await asyncio.gather(*(hasher.verify_and_update("correct horse", stored_hash) for _ in range(logins)))
+        return logins / (time.perf_counter() - start)
+    finally:
+        hasher.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    stored_hash = make_crypt_context(args.rounds).hash("correct horse")
+    print(f"bcrypt rounds={args.rounds}, {args.logins} concurrent logins, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'logins/sec':>12}")
+    for workers in args.workers:
+        rate = asyncio.run(run(workers, args.logins, args.rounds, stored_hash))
+        label = "thread" if workers == 0 else str(workers)
+        print(f"{label:>8} {rate:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Throughput of the codebook rule engine (app/coding/rules.py) on synthetic transcripts.
+
+    keywords              Aho-Corasick scan for every keyword of the codebook
+    keywords_patterns     the same plus the codebook's regexes
+    naive_regex           one word-bounded regex per keyword, run per segment
+                          (what the automaton replaces; on a sample)
+    compile               building the automaton and regexes for the codebook
+    cached_lookup         compile_rules() for an unchanged codebook (fingerprint
+                          and cache hit, what each coding run pays)
+
+Segments are scanned in batches of RULE_SCAN_SEGMENTS, as the coding task does.
+
+Usage (from backend/):
+    python benchmarks/rules.py --segments 20000 --codes 60 --keywords 12
+    python benchmarks/rules.py --save benchmarks/results/rules.json
+    python benchmarks/rules.py --baseline benchmarks/results/rules.json --threshold 0.15
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import timeit
+
+# Make the `app` package importable when run as a script, and give Settings a DB URL
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(__file__))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import baseline # noqa: E402
+from app.coding.rules import CodeRules, RuleSet, compile_rules # noqa: E402
+from app.tasks.coding import RULE_SCAN_SEGMENTS # noqa: E402
+
+FILLER = (
+    "i think we the and it was so like you know really just that they had to get what about then but "
+    "time work home shift nurse patient day night team manager said felt always never maybe because "
+    "when there were some people who did not want much more less every week month year again"
+).split()
+
+
+def synthetic_codebook(rng: random.Random, codes: int, keywords: int, patterns: bool) -> list[CodeRules]:
+    def word() -> str:
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+
+    rules = []
+    for code_id in range(1, codes + 1):
+        phrases = []
+        for _ in range(keywords):
+            phrase = " ".join(word() for _ in range(rng.choice((1, 1, 2, 3))))
+            phrases.append(phrase + "*" if rng.random() < 0.2 else phrase)
+        regexes = (rf"\b{word()}\s+(of|for)\s+\w+", rf"\d+\s*{word()}") if patterns and code_id % 3 == 0 else ()
+        rules.append(CodeRules(code_id, tuple(phrases), regexes))
+    return rules
+
+
+def synthetic_segments(rng: random.Random, rules: list[CodeRules], segments: int, words: int, hit_rate: float) -> list[str]:
+    phrases = [keyword.rstrip("*") for rule in rules for keyword in rule.keywords]
+    texts = []
+    for _ in range(segments):
+        tokens = [rng.choice(FILLER) for _ in range(words)]
+        if rng.random() < hit_rate:
+            tokens.insert(rng.randrange(len(tokens)), rng.choice(phrases).upper() if rng.random() < 0.3 else rng.choice(phrases))
+        texts.append(" ".join(tokens).capitalize() + ".")
+    return texts
+
+
+def scan(ruleset, texts: list[str]) -> int:
+    matched = 0
+    for start in range(0, len(texts), RULE_SCAN_SEGMENTS):
+        matched += sum(1 for found in ruleset.match_many(texts[start:start + RULE_SCAN_SEGMENTS]) if found)
+    return matched
+
+
+class NaiveRules:
+    """One regex per keyword, tried on every segment."""
+
+    def __init__(self, rules: list[CodeRules]):
+        self._regexes = [
+            (rule.code_id, re.compile(rf"\b{re.escape(keyword.rstrip('*'))}" + ("" if keyword.endswith("*") else r"\b"), re.IGNORECASE))
+            for rule in rules
+            for keyword in rule.keywords
+        ]
+
+    def match_many(self, texts: list[str]) -> list[set[int]]:
+        return [{code_id for code_id, regex in self._regexes if regex.search(text)} for text in texts]
+
+
+def throughput(ruleset, texts: list[str], repeat: int) -> tuple[dict, int]:
+    size_mb = sum(len(text.encode()) for text in texts) / 1e6
+    matched = scan(ruleset, texts) # Warm up
+    best = min(timeit.repeat(lambda: scan(ruleset, texts), repeat=repeat, number=1))
+    return {
+        "mb_per_sec": round(size_mb / best, 2),
+        "segments_per_sec": round(len(texts) / best, 1),
+        "matched_segments": matched,
+    }, matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=60, help="Words per segment")
+    parser.add_argument("--codes", type=int, default=60)
+    parser.add_argument("--keywords", type=int, default=12, help="Keywords and synonyms per code")
+    parser.add_argument("--hit-rate", type=float, default=0.3, help="Share of segments containing a keyword")
+    parser.add_argument("--naive-sample", type=int, default=2000, help="Segments the naive baseline scans")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file and exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative change before a regression")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rules = synthetic_codebook(rng, args.codes, args.keywords, patterns=True)
+    keyword_rules = [CodeRules(rule.code_id, rule.keywords) for rule in rules]
+    texts = synthetic_segments(rng, rules, args.segments, args.words, args.hit_rate)
+    size_mb = sum(len(text.encode()) for text in texts) / 1e6
+    print(f"{len(texts)} segments ({size_mb:.1f} MB), {args.codes} codes, "
+          f"{RuleSet(rules).keyword_count} keywords, {RuleSet(rules).pattern_count} patterns")
+
+    results = {}
+    results["keywords"], matched = throughput(RuleSet(keyword_rules), texts, args.repeat)
+    results["keywords_patterns"], _ = throughput(RuleSet(rules), texts, args.repeat)
+    sample = texts[:args.naive_sample]
+    naive = NaiveRules(keyword_rules)
+    results["naive_regex"], _ = throughput(naive, sample, max(1, args.repeat // 2))
+    # The automaton and the naive regexes must agree
+    assert RuleSet(keyword_rules).match_many(sample) == naive.match_many(sample), "automaton and naive regexes disagree"
+
+    print(f"{'scenario':>20} {'MB/s':>9} {'segments/s':>12} {'matched':>9}")
+    for name, result in results.items():
+        print(f"{name:>20} {result['mb_per_sec']:>9.2f} {result['segments_per_sec']:>12.1f} {result['matched_segments']:>9}")
+
+    start = time.perf_counter()
+    RuleSet(rules)
+    results["compile"] = {"compile_ms": round((time.perf_counter() - start) * 1000, 2)}
+    compile_rules(rules)
+    best = min(timeit.repeat(lambda: compile_rules(rules), repeat=args.repeat, number=100)) / 100
+    results["cached_lookup"] = {"mean_us": round(best * 1e6, 2), "ops_per_sec": round(1 / best, 1)}
+    print(f"compile {results['compile']['compile_ms']:.1f} ms, cached lookup {results['cached_lookup']['mean_us']:.1f} us")
+
+    meta = {
+        "benchmark": "rules", "segments": args.segments, "words": args.words, "codes": args.codes,
+        "keywords": args.keywords, "hit_rate": args.hit_rate, "seed": args.seed,
+    }
+    if args.save:
+        baseline.save(args.save, meta, results)
+    sys.exit(baseline.check(results, args.baseline, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,39 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware # Import CORS Middleware
 
+from app.compression import CompressionMiddleware
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.hashing import password_hasher
+from app.job_events import job_event_hub
+from app.limits import RateLimitHeadersMiddleware
+from app.metrics import MetricsMiddleware, metrics_endpoint
+from app.revocation import restore_denylist
+
 # Import routers
 from app.routers import auth
 from app.routers import users # Import the new users router
 from app.routers import projects # Import the new projects router
+from app.routers import codes, jobs # Project codebook and background jobs (LLM coding runs)
+from app.routers import sources # Transcript uploads
+from app.routers import search, kwic # Semantic and keyword-in-context search over segments
+from app.routers import segments, analytics # Manual coding and code analytics
+from app.routers import export # Coded data downloads (CSV/XLSX/Parquet)
 
-app = FastAPI(title="QDAS Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: reload logged-out tokens into the per-process revocation store
+    async with AsyncSessionLocal() as db:
+        await restore_denylist(db)
+    yield
+    # Shutdown: stop the password hashing worker processes and close pooled DB and Redis connections
+    password_hasher.shutdown()
+    await job_event_hub.close()
+    await engine.dispose()
+
+app = FastAPI(title="QDAS Backend", lifespan=lifespan)
 
 # CORS Configuration
 origins = [
@@ -21,12 +48,39 @@ app.add_middleware(
     allow_credentials=True, # Allow cookies
     allow_methods=["*"], # Allow all methods (GET, POST, OPTIONS, etc.)
     allow_headers=["*"], # Allow all headers
+    expose_headers=[ # Response headers readable by the frontend
+        "X-Next-Cursor", "X-Total-Count", "ETag", "Server-Timing",
+        "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After",
+    ],
 )
+app.add_middleware(RateLimitHeadersMiddleware)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_BYTES,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        brotli_enabled=settings.COMPRESSION_BROTLI_ENABLED,
+    )
+
+# Outermost, so timings cover everything below it (CORS included)
+if settings.METRICS_ENABLED or settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(MetricsMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+if settings.METRICS_ENABLED:
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 # Include routers
 app.include_router(auth.router, prefix="/auth")
 app.include_router(users.router) # Include the users router (prefix is defined in the router itself)
 app.include_router(projects.router) # Include the projects router (prefix is defined in the router itself)
+app.include_router(codes.router)
+app.include_router(jobs.router)
+app.include_router(sources.router)
+app.include_router(search.router)
+app.include_router(kwic.router)
+app.include_router(segments.router)
+app.include_router(analytics.router)
+app.include_router(export.router)
 
 @app.get("/")
 async def read_root():
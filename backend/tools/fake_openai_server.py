@@ -0,0 +1,64 @@
+"""A tiny OpenAI-compatible chat completions server for exercising the coding
+pipeline locally without API keys or cost.
+
+It applies every codebook code whose name appears in a segment's text, so
+results are deterministic. FAKE_OPENAI_LATENCY_MS adds a per-request delay.
+
+Usage (from backend/):
+    uvicorn tools.fake_openai_server:app --port 8080
+    OPENAI_BASE_URL=http://localhost:8080/v1 OPENAI_API_KEY=fake celery -A app.celery_app worker
+"""
+import asyncio
+import json
+import os
+import re
+import time
+
+from fastapi import FastAPI, Request
+
+app = FastAPI(title="Fake OpenAI")
+
+LATENCY_SECONDS = int(os.environ.get("FAKE_OPENAI_LATENCY_MS", "0")) / 1000
+request_count = 0
+
+_SEGMENT = re.compile(r"^\[(\d+)\] (.*?)(?=\n\n\[\d+\] |\Z)", re.S | re.M)
+
+def _parse_prompt(content: str) -> tuple[list[str], list[tuple[int, str]]]:
+    codebook_part, _, segments_part = content.partition("\n\nSegments:\n")
+    names = [line[2:].split(":", 1)[0].strip() for line in codebook_part.splitlines() if line.startswith("- ")]
+    segments = [(int(m.group(1)), m.group(2)) for m in _SEGMENT.finditer(segments_part)]
+    return names, segments
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    global request_count
+    request_count += 1
+    body = await request.json()
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+
+    prompt = "\n".join(message["content"] for message in body["messages"])
+    names, segments = _parse_prompt(body["messages"][-1]["content"])
+    reply = {
+        "segments": [
+            {"id": segment_id, "codes": [name for name in names if name.lower() in text.lower()]}
+            for segment_id, text in segments
+        ]
+    }
+    content = json.dumps(reply)
+    return {
+        "id": f"chatcmpl-fake-{request_count}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        },
+    }
+
+@app.get("/stats")
+async def stats():
+    return {"requests": request_count}